@@ -3,34 +3,276 @@ IQES Themes Configuration
 Thematische Zuordnungen und Konfigurationen für IQES-Fragen
 """
 
-# Strategische Themen-Mappings basierend auf IQES-Fragenstruktur
-IQES_THEMES = {
-    # Schulatmosphäre, Umgang und Unterstützung (5.1-5.5)
-    '5.1': {'theme': '🏫 Schulatmosphäre', 'color': '#3498db', 'priority': 1, 'strategic': True},
-    '5.2': {'theme': '🏫 Schulatmosphäre', 'color': '#3498db', 'priority': 1, 'strategic': True},
-    '5.3': {'theme': '🏫 Schulatmosphäre', 'color': '#3498db', 'priority': 1, 'strategic': True},
-    '5.4': {'theme': '🏫 Schulatmosphäre', 'color': '#3498db', 'priority': 1, 'strategic': True},
-    '5.5': {'theme': '🏫 Schulatmosphäre', 'color': '#3498db', 'priority': 1, 'strategic': True},
-    
-    # Unterricht (7.1-7.13)
-    '7.1': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-    '7.2': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-    '7.3': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-    '7.4': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-    '7.5': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-    '7.6': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-    '7.7': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-    '7.8': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-    '7.9': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-    '7.10': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-    '7.11': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-    '7.12': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-    '7.13': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-    
-    # Feedback und Kommunikation (9.1-9.3)
-    '9.1': {'theme': '💬 Feedback', 'color': '#f39c12', 'priority': 2, 'strategic': True},
-    '9.2': {'theme': '💬 Feedback', 'color': '#f39c12', 'priority': 2, 'strategic': True},
-    '9.3': {'theme': '💬 Feedback', 'color': '#f39c12', 'priority': 2, 'strategic': True},
+import bisect
+import hashlib
+import json
+import os
+import re
+import warnings
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Fragen-zu-Themen-Index: Bereiche ('range'), Hauptfragen-Präfixe ('prefix', z.B. alle 7.*)
+# und Einzelfragen ('question'). Bei Überschneidungen gewinnt die spezifischste Regel.
+THEME_INDEX_RULES = [
+    # Schulatmosphäre, Umgang und Unterstützung (5.1-5.5, weitere 5.x)
+    {'range': ['5.1', '5.5'], 'theme': '🏫 Schulatmosphäre', 'color': '#3498db', 'priority': 1, 'strategic': True},
+    {'prefix': '5', 'theme': '🏫 Schulatmosphäre', 'color': '#3498db', 'priority': 1, 'strategic': True},
+    
+    # Unterricht (7.1-7.13, weitere 7.x)
+    {'range': ['7.1', '7.13'], 'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
+    {'prefix': '7', 'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
+    
+    # Feedback und Kommunikation (9.1-9.3, weitere 9.x)
+    {'range': ['9.1', '9.3'], 'theme': '💬 Feedback', 'color': '#f39c12', 'priority': 2, 'strategic': True},
+    {'prefix': '9', 'theme': '💬 Feedback', 'color': '#f39c12', 'priority': 2, 'strategic': True},
+    
+    # Demografische Fragen (1.x-2.x) - nicht in Trends
+    {'prefix': '1', 'theme': '📊 Demografie', 'color': '#95a5a6', 'priority': 5, 'strategic': False},
+    {'prefix': '2', 'theme': '📊 Demografie', 'color': '#95a5a6', 'priority': 5, 'strategic': False},
+    
+    # Offene Fragen (4.x, 6.x, 8.x) - qualitative Auswertung
+    {'prefix': '4', 'theme': '💭 Offene Antworten', 'color': '#34495e', 'priority': 4, 'strategic': False},
+    {'prefix': '6', 'theme': '💭 Offene Antworten', 'color': '#34495e', 'priority': 4, 'strategic': False},
+    {'prefix': '8', 'theme': '💭 Offene Antworten', 'color': '#34495e', 'priority': 4, 'strategic': False},
+    
+    # Sonstige Einzelfragen - separate Behandlung
+    {'question': '9', 'theme': '📋 Sonstige Bereiche', 'color': '#7f8c8d', 'priority': 3, 'strategic': False},
+    {'prefix': '10', 'theme': '📋 Sonstige Bereiche', 'color': '#7f8c8d', 'priority': 3, 'strategic': False},
+    {'prefix': '11', 'theme': '📋 Sonstige Bereiche', 'color': '#7f8c8d', 'priority': 3, 'strategic': False},
+    {'prefix': '12', 'theme': '📋 Sonstige Bereiche', 'color': '#7f8c8d', 'priority': 3, 'strategic': False},
+]
+
+# Optionale Ergänzungen für neue Fragebogen-Versionen ohne Codeänderung (JSON-Liste im Format oben)
+THEME_INDEX_OVERRIDE_PATH = os.environ.get(
+    'IQES_THEME_INDEX', os.path.join(os.path.dirname(__file__), 'theme_index.json')
+)
+
+THEME_ATTRIBUTES = ['theme', 'color', 'priority', 'strategic']
+
+# Unterfragen-Obergrenze für Präfix-Regeln ("7.*")
+_MAX_SUBQUESTION = 10 ** 6
+
+def _question_key(question_number: str) -> Optional[Tuple[int, int]]:
+    """
+    Übersetzt eine Fragenummer in einen sortierbaren Schlüssel
+    
+    Args:
+        question_number: Fragenummer (z.B. "7.13" oder "7")
+        
+    Returns:
+        Tuple (Hauptfrage, Unterfrage) mit -1 für reine Hauptfragen, None wenn nicht numerisch
+    """
+    match = re.match(r'^\s*(\d+)(?:\.(\d+))?', str(question_number))
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2)) if match.group(2) is not None else -1
+
+def _rule_interval(rule: Dict) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    """
+    Geschlossenes Schlüssel-Intervall einer Index-Regel
+    
+    Args:
+        rule: Regel mit 'question', 'range' oder 'prefix'
+        
+    Returns:
+        Tuple (Start-Schlüssel, End-Schlüssel)
+    """
+    if 'question' in rule:
+        key = _question_key(rule['question'])
+        return key, key
+    if 'range' in rule:
+        return _question_key(rule['range'][0]), _question_key(rule['range'][1])
+    main = int(rule['prefix'])
+    return (main, -1), (main, _MAX_SUBQUESTION)
+
+def _rule_error(rule) -> Optional[str]:
+    """
+    Prüft eine Index-Regel aus der JSON-Ergänzung
+    
+    Args:
+        rule: Regel im Format von THEME_INDEX_RULES
+        
+    Returns:
+        Fehlerbeschreibung oder None, wenn die Regel gültig ist
+    """
+    if not isinstance(rule, dict):
+        return "keine JSON-Objekt-Regel"
+    missing = [key for key in THEME_ATTRIBUTES if key not in rule]
+    if missing:
+        return f"fehlende Attribute {missing}"
+    if not isinstance(rule['priority'], int) or isinstance(rule['priority'], bool):
+        return "'priority' ist keine Ganzzahl"
+    if 'question' in rule:
+        if _question_key(rule['question']) is None:
+            return f"ungültige Fragenummer {rule['question']!r}"
+    elif 'range' in rule:
+        bounds = rule['range']
+        if not isinstance(bounds, list) or len(bounds) != 2:
+            return "'range' braucht genau zwei Fragenummern"
+        start, end = _question_key(bounds[0]), _question_key(bounds[1])
+        if start is None or end is None or start > end:
+            return f"ungültiger Bereich {bounds!r}"
+    elif 'prefix' in rule:
+        if not re.fullmatch(r'\s*\d+\s*', str(rule['prefix'])):
+            return f"ungültiges Präfix {rule['prefix']!r}"
+    else:
+        return "weder 'question' noch 'range' noch 'prefix'"
+    return None
+
+def load_theme_index_rules(path: str = THEME_INDEX_OVERRIDE_PATH) -> List[Dict]:
+    """
+    Lädt die Index-Regeln inkl. optionaler JSON-Ergänzungen
+    
+    Args:
+        path: Pfad zur JSON-Datei mit zusätzlichen Regeln
+        
+    Returns:
+        Regelliste (JSON-Regeln zuerst, damit sie bei gleicher Spezifität gewinnen);
+        ungültige JSON-Regeln werden mit Warnung übersprungen, bei unlesbarer Datei
+        nur die eingebauten Regeln
+    """
+    if path and os.path.exists(path):
+        try:
+            with open(path, encoding='utf-8') as handle:
+                extra_rules = json.load(handle)
+        except (json.JSONDecodeError, OSError) as error:
+            warnings.warn(f"Themen-Index {path} nicht lesbar, eingebaute Regeln werden verwendet: {error}")
+            return list(THEME_INDEX_RULES)
+        if not isinstance(extra_rules, list):
+            warnings.warn(f"Themen-Index {path} ist keine JSON-Liste, eingebaute Regeln werden verwendet")
+            return list(THEME_INDEX_RULES)
+        valid_rules = []
+        for position, rule in enumerate(extra_rules):
+            error = _rule_error(rule)
+            if error:
+                warnings.warn(f"Themen-Index {path}: Regel {position + 1} übersprungen ({error})")
+            else:
+                valid_rules.append(rule)
+        return valid_rules + THEME_INDEX_RULES
+    return list(THEME_INDEX_RULES)
+
+def compile_theme_index(rules: List[Dict]) -> Tuple[list, list, list]:
+    """
+    Kompiliert überlappende Regeln zu sortierten, disjunkten Intervallen
+    
+    Für jedes Elementar-Segment wird die spezifischste (schmalste) Regel gewählt,
+    bei gleicher Breite die zuerst definierte.
+    
+    Args:
+        rules: Index-Regeln
+        
+    Returns:
+        Tuple (Segment-Starts, Segment-Enden exklusiv, Regel-Index je Segment)
+    """
+    intervals = []
+    for order, rule in enumerate(rules):
+        start, end = _rule_interval(rule)
+        span = (end[0] - start[0]) * (_MAX_SUBQUESTION + 2) + (end[1] - start[1])
+        intervals.append((start, (end[0], end[1] + 1), span, order))
+    
+    boundaries = sorted({start for start, _, _, _ in intervals} | {stop for _, stop, _, _ in intervals})
+    
+    starts, stops, rule_ids = [], [], []
+    for segment_start, segment_stop in zip(boundaries[:-1], boundaries[1:]):
+        covering = [(span, order) for start, stop, span, order in intervals if start <= segment_start < stop]
+        if not covering:
+            continue
+        rule_id = min(covering)[1]
+        # Angrenzende Segmente derselben Regel zusammenfassen
+        if rule_ids and rule_ids[-1] == rule_id and stops[-1] == segment_start:
+            stops[-1] = segment_stop
+        else:
+            starts.append(segment_start)
+            stops.append(segment_stop)
+            rule_ids.append(rule_id)
+    
+    return starts, stops, rule_ids
+
+_ACTIVE_INDEX_RULES = load_theme_index_rules()
+_THEME_INDEX = compile_theme_index(_ACTIVE_INDEX_RULES)
+_THEME_INDEX_ATTRIBUTES = [{key: rule[key] for key in THEME_ATTRIBUTES} for rule in _ACTIVE_INDEX_RULES]
+
+@lru_cache(maxsize=None)
+def lookup_theme(question_number: str) -> Optional[dict]:
+    """
+    Sucht das Thema einer Fragenummer im Intervall-Index (Binärsuche, je Nummer gecacht)
+    
+    Args:
+        question_number: Fragenummer (z.B. "7.14")
+        
+    Returns:
+        Themen-Dictionary oder None, wenn keine Regel greift
+    """
+    key = _question_key(question_number)
+    if key is None:
+        return None
+    
+    starts, stops, rule_ids = _THEME_INDEX
+    position = bisect.bisect_right(starts, key) - 1
+    if position >= 0 and key < stops[position]:
+        return _THEME_INDEX_ATTRIBUTES[rule_ids[position]]
+    return None
+
+def _expand_strategic_questions(rules: List[Dict]) -> Dict[str, dict]:
+    """
+    Listet alle explizit definierten strategischen Unterfragen auf
+    
+    Args:
+        rules: Index-Regeln
+        
+    Returns:
+        Dictionary Fragenummer -> Themen-Dictionary (Kompatibilität zu IQES_THEMES)
+    """
+    themes = {}
+    for rule in rules:
+        if not rule.get('strategic') or 'prefix' in rule:
+            continue
+        start, end = _rule_interval(rule)
+        if start[1] < 0 or start[0] != end[0]:
+            continue
+        for sub in range(start[1], end[1] + 1):
+            themes.setdefault(f"{start[0]}.{sub}", {key: rule[key] for key in THEME_ATTRIBUTES})
+    return themes
+
+# Strategische Themen-Mappings je Unterfrage (abgeleitet aus dem Index)
+IQES_THEMES = _expand_strategic_questions(_ACTIVE_INDEX_RULES)
+
+# Regeltabellen für die textbasierte Themenzuordnung (erste passende Regel gewinnt)
+# Farbzuordnung für Themen-Überschriften aus den Excel-Sheets (Spalte 'Thema')
+THEMA_COLOR_RULES = [
+    {'rule': 'schulatmosphaere', 'keywords': ['schulatmosphäre', 'umgang', 'unterstützung'], 'color': '#3498db'},
+    {'rule': 'unterricht', 'keywords': ['unterricht'], 'color': '#e74c3c'},
+    {'rule': 'feedback', 'keywords': ['feedback'], 'color': '#f39c12'},
+    {'rule': 'beschwerdemanagement', 'keywords': ['beschwerdemanagement', 'ideen'], 'color': '#27ae60'},
+    {'rule': 'staerken_schwaechen', 'keywords': ['stärken', 'schwächen'], 'color': '#9b59b6'},
+    {'rule': 'zufriedenheit', 'keywords': ['zufriedenheit'], 'color': '#2ecc71'},
+]
+THEMA_COLOR_DEFAULT = {'rule': 'standard', 'color': '#95a5a6'}
+
+# Themenzuordnung über den Bereichstext, wenn die Fragenummer unbekannt ist
+BEREICH_THEME_RULES = [
+    {
+        'rule': 'schulatmosphaere',
+        'keywords': ['schulgemeinschaft', 'vertrauen', 'respekt', 'unterstützung', 'hilfe',
+                     'umgang', 'atmosphäre', 'gemeinschaft', 'ort', 'geschätzt', 'kultur'],
+        'theme': '🏫 Schulatmosphäre', 'color': '#3498db', 'priority': 1, 'strategic': True
+    },
+    {
+        'rule': 'unterricht',
+        'keywords': ['unterricht', 'beruflich', 'ziele', 'inhalte', 'methodisch', 'lernen',
+                     'lernbedürfnisse', 'arbeitsaufträge', 'anspruchsvoll', 'kompetent',
+                     'begeistern', 'leistungsbeurteilung', 'lernumgebung', 'fehler'],
+        'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True
+    },
+    {
+        'rule': 'feedback',
+        'keywords': ['rückmeldung', 'feedback', 'auswertung', 'vereinbarung', 'maßnahmen'],
+        'theme': '💬 Feedback', 'color': '#f39c12', 'priority': 2, 'strategic': True
+    },
+]
+BEREICH_THEME_DEFAULT = {
+    'rule': 'standard', 'theme': '❓ Unbekannt', 'color': '#7f8c8d', 'priority': 5, 'strategic': False
 }
 
 # Bildungsgang-Konfiguration
@@ -61,6 +303,91 @@ BILDUNGSGANG_CONFIG = {
     }
 }
 
+# Schuljahres-Modell für die Zeitraum-Bündelung
+SCHULJAHR_CONFIG = {
+    'start_month': 8,           # Schuljahr beginnt im August
+    'second_half_month': 2,     # 2. Halbjahr beginnt im Februar
+    'granularities': {
+        'Datum': 'Exaktes Datum',
+        'Monat': 'Monat',
+        'Quartal': 'Quartal',
+        'Halbjahr': 'Schulhalbjahr',
+        'Schuljahr': 'Schuljahr'
+    }
+}
+
+# Kohorten-Modell: Zwischenevaluation und Abschlussevaluation desselben Jahrgangs
+KOHORTEN_CONFIG = {
+    'expected_months': 12,      # Erwarteter Abstand Zwischen- -> Abschlussevaluation
+    'min_months': 3,            # Frühester zulässiger Abstand
+    'max_months': 24            # Spätester zulässiger Abstand
+}
+
+# Persistenter Antwort-Cache für KI-Aufrufe (Gemini/OpenAI)
+LLM_CACHE_CONFIG = {
+    'path': os.environ.get(
+        'IQES_LLM_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'iqes', 'llm_responses.sqlite')
+    ),
+    'ttl_hours': 24 * 14,       # Antworten nach zwei Wochen neu anfragen
+    'max_entries': 500,         # Älteste (zuletzt ungenutzte) Einträge darüber hinaus verwerfen
+    'max_mb': 20                # Obergrenze für die gespeicherten Antworttexte
+}
+
+# Parallele KI-Anfragen (eine Anfrage je offene Frage)
+LLM_DISPATCH_CONFIG = {
+    'max_concurrency': 4,       # Gleichzeitig laufende Anfragen
+    'requests_per_minute': 60,  # Token-Bucket: Nachfüllrate
+    'burst': 5,                 # Token-Bucket: Kapazität
+    'max_retries': 3,           # Wiederholungen nach Fehler oder Timeout
+    'backoff_seconds': 1.0,     # Basis für exponentielles Backoff (1s, 2s, 4s ...)
+    'timeout_seconds': 30       # Zeitlimit je Einzelanfrage
+}
+
+# KI-Anbieter: Verbindungsstatus und Circuit Breaker
+AI_CLIENT_CONFIG = {
+    'providers': ['gemini', 'openai'],  # Reihenfolge: primär, Fallback
+    'failure_threshold': 3,     # Aufeinanderfolgende Fehler bis zur Sperre
+    'reset_seconds': 120,       # Sperrdauer, danach ein Probeaufruf
+    'health_ttl_seconds': 300   # Gültigkeit des zuletzt beobachteten Status
+}
+
+# Map-Reduce-Zusammenfassung großer Mengen offener Antworten
+LLM_SUMMARY_CONFIG = {
+    'chunk_tokens': 2000,       # Token-Budget je Teilstück
+    'boundary_every': 12,       # Inhaltsabhängige Grenze im Mittel alle n Antworten
+    'reduce_fan_in': 8,         # Teilzusammenfassungen je Reduce-Schritt
+    'chars_per_token': 4        # Grobe Schätzung für deutsche Texte
+}
+
+# Volltextsuche über offene Antworten (SQLite FTS5, bleibt über Sitzungen erhalten)
+TEXT_SEARCH_CONFIG = {
+    'path': os.environ.get(
+        'IQES_TEXT_SEARCH', os.path.join(os.path.expanduser('~'), '.cache', 'iqes', 'text_search.sqlite')
+    ),
+    'tokenizer': 'unicode61 remove_diacritics 2',  # Umlaute/Akzente gleichsetzen (ä = a)
+    'prefix_lengths': '2 3 4',  # Präfix-Indizes für Wortanfangs-Suche (Flexion, Komposita)
+    'max_results': 50,          # Angezeigte Treffer je Suche
+    'ttl_days': 365,            # Quellen, die so lange nicht mehr geladen wurden, werden entfernt (None = nie)
+    'max_sources': 500          # Höchstzahl Quellen im Index, älteste zuerst entfernt (None = unbegrenzt)
+}
+
+# Zusammenfassen nahezu gleicher Textantworten je Frage (Repräsentant + Anzahl)
+TEXT_DEDUP_CONFIG = {
+    'enabled': True,
+    'threshold': 0.7            # Mindest-Jaccard-Ähnlichkeit der normalisierten Antworten (MinHash)
+}
+
+# Themen-Clustering offener Antworten (Hashing-Merkmale + MiniBatchKMeans, inkrementell je Quelle)
+TOPIC_MODEL_CONFIG = {
+    'n_topics': 8,              # Themen beim ersten Training
+    'max_topics': 12,           # Obergrenze inklusive später neu entdeckter Themen
+    'novelty_similarity': 0.15, # Kosinus-Ähnlichkeit, unter der eine Antwort keinem Thema nahe ist
+    'min_new_topic_share': 0.05,  # Mindestanteil neuartiger Antworten für ein zusätzliches Thema
+    'n_features': 2 ** 16,      # Größe des Hashing-Merkmalsraums
+    'batch_size': 1024,         # Antworten je MiniBatchKMeans-Schritt
+    'top_terms': 4              # Begriffe in der Themenbezeichnung
+}
+
 # IQES-Bewertungsskala
 IQES_SCALE = {
     1: {'label': 'trifft nicht zu', 'color': '#e74c3c', 'level': 'kritisch'},
@@ -77,6 +404,20 @@ RATING_CATEGORIES = {
     'sehr_gut': {'min': 3.5, 'max': 4.0, 'color': '#27ae60', 'icon': '✅'}
 }
 
+# Verbesserungsbedarf je Bewertung (Werte außerhalb 1-4 fallen in die Randklassen)
+IMPROVEMENT_NEED_LEVELS = {
+    'HOCH': {'min': 1.0, 'max': 2.5},
+    'MITTEL': {'min': 2.5, 'max': 3.0},
+    'NIEDRIG': {'min': 3.0, 'max': 4.0}
+}
+
+# Trend-Einstufung je Bewertung
+TREND_LEVELS = {
+    '↓ Negativ': {'min': 1.0, 'max': 2.5},
+    '→ Stabil': {'min': 2.5, 'max': 3.5},
+    '↑ Positiv': {'min': 3.5, 'max': 4.0}
+}
+
 def get_theme_for_question(question_number: str) -> dict:
     """
     Ermittelt Thema für eine Fragenummer
@@ -87,8 +428,9 @@ def get_theme_for_question(question_number: str) -> dict:
     Returns:
         Themen-Dictionary oder Default-Werte
     """
-    if question_number in IQES_THEMES:
-        return IQES_THEMES[question_number]
+    theme = lookup_theme(question_number)
+    if theme is not None:
+        return theme
     
     # Default für unbekannte Fragen
     return {
@@ -147,4 +489,28 @@ def get_theme_summary() -> dict:
             }
         themes[theme_name]['questions'].append(question_num)
     
-    return themes
\ No newline at end of file
+    return themes
+
+def get_config_version() -> str:
+    """
+    Fingerabdruck aller Regeln und Stufen, aus denen abgeleitete Spalten berechnet werden
+    
+    Ändert sich bei jeder Anpassung von Themen-Index, Farb-/Themenregeln oder
+    Einstufungsgrenzen und dient als Schlüssel für den Cache der Ableitungsstufe.
+    
+    Returns:
+        Kurzer SHA-256-Hash der Konfiguration
+    """
+    relevant = {
+        'theme_index': _ACTIVE_INDEX_RULES,
+        'thema_colors': [THEMA_COLOR_RULES, THEMA_COLOR_DEFAULT],
+        'bereich_themes': [BEREICH_THEME_RULES, BEREICH_THEME_DEFAULT],
+        'scale': IQES_SCALE,
+        'rating_categories': RATING_CATEGORIES,
+        'improvement_need': IMPROVEMENT_NEED_LEVELS,
+        'trend': TREND_LEVELS
+    }
+    payload = json.dumps(relevant, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+CONFIG_VERSION = get_config_version()
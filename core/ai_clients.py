@@ -0,0 +1,193 @@
+"""
+IQES AI Clients - Gemeinsame KI-Clients mit Circuit Breaker
+Verbindet erst bei der ersten echten Anfrage und sperrt nicht erreichbare Anbieter vorübergehend
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from config.themes import AI_CLIENT_CONFIG
+
+
+class IQESProviderUnavailable(RuntimeError):
+    """Anbieter ist nicht konfiguriert oder durch den Circuit Breaker gesperrt"""
+
+
+class IQESCircuitBreaker:
+    """
+    Circuit Breaker je Anbieter
+    
+    Nach failure_threshold aufeinanderfolgenden Fehlern wird der Anbieter für
+    reset_seconds gesperrt ('offen'); Anfragen scheitern dann sofort. Danach ist
+    genau ein Probeaufruf erlaubt ('halboffen'): Erfolg schließt den Breaker,
+    ein Fehler sperrt erneut.
+    """
+    
+    def __init__(self, failure_threshold: int = AI_CLIENT_CONFIG['failure_threshold'],
+                 reset_seconds: float = AI_CLIENT_CONFIG['reset_seconds'],
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        """'geschlossen', 'offen' oder 'halboffen'"""
+        if self.opened_at is None:
+            return 'geschlossen'
+        if self.clock() - self.opened_at < self.reset_seconds:
+            return 'offen'
+        return 'halboffen'
+    
+    def allow(self) -> bool:
+        """
+        Prüft, ob eine Anfrage gestartet werden darf
+        
+        Returns:
+            False, solange gesperrt oder bereits ein Probeaufruf läuft
+        """
+        with self._lock:
+            state = self.state
+            if state == 'geschlossen':
+                return True
+            if state == 'halboffen' and not self._probing:
+                self._probing = True
+                return True
+            return False
+    
+    def record_success(self):
+        """Erfolgreiche Anfrage: Breaker schließen"""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+    
+    def record_failure(self):
+        """Fehlgeschlagene Anfrage: ab Schwelle (oder nach fehlgeschlagener Probe) sperren"""
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._probing = False
+
+
+class IQESAIClientManager:
+    """
+    Verwaltet die KI-Clients aller Anbieter
+    
+    Clients werden erst beim ersten Zugriff über ihre Factory erzeugt; eine
+    Testanfrage beim Start entfällt. Der Verbindungsstatus ergibt sich aus den
+    echten Anfragen und verfällt nach health_ttl_seconds. Eine Instanz ist für die
+    gemeinsame Nutzung über Sessions gedacht (z.B. per st.cache_resource) und
+    threadsicher.
+    """
+    
+    def __init__(self, factories: Dict[str, Callable[[], object]],
+                 providers: List[str] = AI_CLIENT_CONFIG['providers'],
+                 health_ttl_seconds: float = AI_CLIENT_CONFIG['health_ttl_seconds'],
+                 failure_threshold: int = AI_CLIENT_CONFIG['failure_threshold'],
+                 reset_seconds: float = AI_CLIENT_CONFIG['reset_seconds'],
+                 clock: Callable[[], float] = time.monotonic):
+        self.factories = factories
+        self.providers = [provider for provider in providers if provider in factories]
+        self.health_ttl_seconds = health_ttl_seconds
+        self.clock = clock
+        self.breakers = {
+            provider: IQESCircuitBreaker(failure_threshold, reset_seconds, clock) for provider in self.providers
+        }
+        self._clients: Dict[str, object] = {}
+        self._health: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+    
+    def client(self, provider: str) -> Optional[object]:
+        """
+        Client eines Anbieters (wird beim ersten Zugriff erzeugt)
+        
+        Args:
+            provider: z.B. 'gemini' oder 'openai'
+            
+        Returns:
+            Client oder None (nicht konfiguriert, Erzeugung fehlgeschlagen oder gesperrt)
+        """
+        if provider not in self.breakers or self.breakers[provider].state == 'offen':
+            return None
+        
+        with self._lock:
+            if provider not in self._clients:
+                try:
+                    self._clients[provider] = self.factories[provider]()
+                except Exception as error:
+                    self._clients[provider] = None
+                    self._set_health(provider, 'fehler', str(error))
+            return self._clients[provider]
+    
+    def active_provider(self) -> Optional[str]:
+        """
+        Erster nutzbarer Anbieter in der konfigurierten Reihenfolge
+        
+        Returns:
+            Anbietername oder None (KI-freier Pfad)
+        """
+        for provider in self.providers:
+            if self.client(provider) is not None:
+                return provider
+        return None
+    
+    def call(self, provider: str, request: Callable[[object], object]):
+        """
+        Führt eine Anfrage über den Circuit Breaker aus
+        
+        Args:
+            provider: Anbietername
+            request: Funktion, die den Client erhält und die Anfrage ausführt
+            
+        Returns:
+            Ergebnis von request
+            
+        Raises:
+            IQESProviderUnavailable: Anbieter nicht verfügbar oder gesperrt
+        """
+        client = self.client(provider)
+        if client is None or not self.breakers[provider].allow():
+            raise IQESProviderUnavailable(f"{provider} ist derzeit nicht erreichbar")
+        
+        try:
+            result = request(client)
+        except Exception as error:
+            self.breakers[provider].record_failure()
+            self._set_health(provider, 'fehler', str(error))
+            raise
+        
+        self.breakers[provider].record_success()
+        self._set_health(provider, 'ok')
+        return result
+    
+    def _set_health(self, provider: str, status: str, error: Optional[str] = None):
+        """Speichert den beobachteten Status mit Zeitstempel"""
+        self._health[provider] = {'status': status, 'error': error, 'checked': self.clock()}
+    
+    def health(self, provider: str) -> Dict:
+        """
+        Zuletzt beobachteter Status eines Anbieters
+        
+        Args:
+            provider: Anbietername
+            
+        Returns:
+            Dictionary mit 'status' ('ok', 'fehler', 'gesperrt', 'unbekannt',
+            'nicht konfiguriert') und 'error'
+        """
+        if provider not in self.breakers:
+            return {'status': 'nicht konfiguriert', 'error': None}
+        if self.breakers[provider].state == 'offen':
+            return {'status': 'gesperrt', 'error': self._health.get(provider, {}).get('error')}
+        
+        health = self._health.get(provider)
+        if health is None or self.clock() - health['checked'] > self.health_ttl_seconds:
+            return {'status': 'unbekannt', 'error': None}
+        return {'status': health['status'], 'error': health['error']}
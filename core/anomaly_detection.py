@@ -0,0 +1,260 @@
+"""
+IQES Anomaly Detection - Auffälligkeiten und Strukturbrüche über Evaluationszeiträume
+Robuste z-Werte gegen die eigene Historie und die Bildungsgang-Peers, vektorisiert über alle Reihen
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+from core.series_panel import build_series_panel
+
+
+# Umrechnungsfaktor MAD -> Standardabweichung bei Normalverteilung
+MAD_SCALE = 1.4826
+
+
+class IQESAnomalyDetector:
+    """
+    Bewertet jede Fragen-/Bildungsgang-Reihe auf Ausreißer und Niveauwechsel
+    Alle Reihen werden als (n_reihen × n_zeiträume) Matrix gemeinsam ausgewertet
+    """
+    
+    def __init__(self, z_threshold: float = 3.0, min_scale: float = 0.1,
+                 min_history: int = 3, min_peers: int = 3,
+                 min_shift: float = 0.3, min_segment: int = 2):
+        self.z_threshold = z_threshold    # Ab diesem |z| gilt ein Wert als auffällig
+        self.min_scale = min_scale        # Untergrenze der robusten Streuung (Skalenpunkte)
+        self.min_history = min_history    # Mindestanzahl Zeiträume für den Historien-Vergleich
+        self.min_peers = min_peers        # Mindestanzahl Bildungsgänge für den Peer-Vergleich
+        self.min_shift = min_shift        # Mindest-Niveauänderung für einen Strukturbruch
+        self.min_segment = min_segment    # Mindestanzahl Zeiträume je Segment
+    
+    def _robust_z(self, values: np.ndarray, axis: int, min_count: int,
+                  scale_floor: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Robuste z-Werte (Median/MAD) entlang einer Achse, NaN wenn zu wenig Werte
+        
+        Args:
+            values: Array mit NaN für fehlende Werte
+            axis: Achse, entlang der Median und MAD bestimmt werden
+            min_count: Mindestanzahl beobachteter Werte
+            scale_floor: Optionale zusätzliche Untergrenze der Streuung (broadcastbar)
+            
+        Returns:
+            Array gleicher Form mit robusten z-Werten
+        """
+        count = (~np.isnan(values)).sum(axis=axis, keepdims=True)
+        
+        # Reihen ohne Werte erzeugen "All-NaN slice"-Warnungen und werden unten maskiert
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            median = np.nanmedian(values, axis=axis, keepdims=True)
+            mad = np.nanmedian(np.abs(values - median), axis=axis, keepdims=True)
+        
+        scale = np.maximum(MAD_SCALE * mad, self.min_scale)
+        if scale_floor is not None:
+            scale = np.fmax(scale, scale_floor)
+        z = (values - median) / scale
+        return np.where(count >= min_count, z, np.nan)
+    
+    def history_scores(self, values: np.ndarray) -> np.ndarray:
+        """
+        Robuste z-Werte jedes Zeitraums gegen die eigene Reihe
+        
+        Args:
+            values: Matrix (n_reihen, n_zeiträume) mit NaN für fehlende Werte
+            
+        Returns:
+            Matrix gleicher Form mit z-Werten
+        """
+        return self._robust_z(values, axis=1, min_count=self.min_history)
+    
+    def peer_scores(self, series_keys: pd.DataFrame, values: np.ndarray,
+                    change_position: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Robuste z-Werte jedes Bildungsgangs gegen die anderen Bildungsgänge derselben Frage
+        
+        Verglichen wird die Abweichung vom eigenen Niveau, damit dauerhaft
+        unterschiedliche Niveaus der Bildungsgänge nicht als Auffälligkeit zählen.
+        Bei einem Strukturbruch ist das Niveau der Median des jeweiligen Segments
+        (vor bzw. ab dem Bruch), sonst der Median der ganzen Reihe. Die Streuung
+        ist nach unten durch die gepoolte Streuung aller Abweichungen der Frage
+        (über Bildungsgänge und Zeiträume) begrenzt. Die Reihen werden dafür in
+        einen Würfel (Frage × Bildungsgang × Zeitraum) einsortiert.
+        
+        Args:
+            series_keys: Schlüssel je Reihe mit 'Fragenummer' und 'Bildungsgang'
+            values: Matrix (n_reihen, n_zeiträume) mit NaN für fehlende Werte
+            change_position: Optional erster Zeitraum nach dem Bruch je Reihe (0 = kein Bruch)
+            
+        Returns:
+            Matrix (n_reihen, n_zeiträume) mit Peer-z-Werten
+        """
+        question_codes, _ = pd.factorize(series_keys['Fragenummer'])
+        program_codes, _ = pd.factorize(series_keys['Bildungsgang'])
+        # Reihen ohne Frage oder Bildungsgang (Code -1) haben keine Peers
+        keyed = (question_codes >= 0) & (program_codes >= 0)
+        result = np.full(values.shape, np.nan)
+        if not keyed.any():
+            return result
+        question_codes, program_codes = question_codes[keyed], program_codes[keyed]
+        
+        if change_position is None:
+            change_position = np.zeros(len(values), dtype=np.int64)
+        after_break = np.arange(values.shape[1])[None, :] >= change_position[keyed, None]
+        keyed_values = values[keyed]
+        
+        cube = np.full((question_codes.max() + 1, program_codes.max() + 1, values.shape[1]), np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            level_before = np.nanmedian(np.where(after_break, np.nan, keyed_values), axis=1, keepdims=True)
+            level_after = np.nanmedian(np.where(after_break, keyed_values, np.nan), axis=1, keepdims=True)
+            cube[question_codes, program_codes] = keyed_values - np.where(after_break, level_after, level_before)
+            
+            median = np.nanmedian(cube, axis=1, keepdims=True)
+            pooled_mad = np.nanmedian(np.abs(cube - median), axis=(1, 2), keepdims=True)
+        
+        peer_z = self._robust_z(cube, axis=1, min_count=self.min_peers, scale_floor=MAD_SCALE * pooled_mad)
+        result[keyed] = peer_z[question_codes, program_codes]
+        return result
+    
+    def change_points(self, values: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Sucht je Reihe den stärksten einzelnen Niveauwechsel (Mittelwert-Sprung)
+        
+        Alle Trennstellen werden über kumulierte Summen gleichzeitig bewertet.
+        
+        Args:
+            values: Matrix (n_reihen, n_zeiträume) mit NaN für fehlende Werte
+            
+        Returns:
+            Dictionary mit Index des ersten Zeitraums nach dem Bruch, Niveau vorher/nachher,
+            t-Statistik und Flag je Reihe
+        """
+        if values.shape[1] <= 1:
+            # Ein einzelner Zeitraum hat keine Trennstelle
+            return {
+                'position': np.zeros(len(values), dtype=np.int64),
+                'before': np.full(len(values), np.nan),
+                'after': np.full(len(values), np.nan),
+                't_stat': np.zeros(len(values)),
+                'detected': np.zeros(len(values), dtype=bool)
+            }
+        
+        weights = (~np.isnan(values)).astype(float)
+        y = np.nan_to_num(values)
+        
+        n = weights.sum(axis=1, keepdims=True)
+        left_n = np.cumsum(weights, axis=1)[:, :-1]
+        left_sum = np.cumsum(y, axis=1)[:, :-1]
+        left_sq = np.cumsum(y ** 2, axis=1)[:, :-1]
+        right_n = n - left_n
+        right_sum = y.sum(axis=1, keepdims=True) - left_sum
+        right_sq = (y ** 2).sum(axis=1, keepdims=True) - left_sq
+        
+        # Trennstelle nur gültig, wenn beide Segmente genug Werte haben
+        # und direkt danach ein Wert beobachtet wurde
+        valid = (left_n >= self.min_segment) & (right_n >= self.min_segment) & (weights[:, 1:] > 0)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            left_mean = left_sum / left_n
+            right_mean = right_sum / right_n
+            within = (left_sq - left_n * left_mean ** 2) + (right_sq - right_n * right_mean ** 2)
+            pooled_var = np.clip(within, 0, None) / (n - 2)
+            pooled_var = np.maximum(pooled_var, self.min_scale ** 2)
+            t_stat = (right_mean - left_mean) / np.sqrt(pooled_var * (1 / left_n + 1 / right_n))
+        
+        t_stat = np.where(valid, t_stat, 0.0)
+        best = np.argmax(np.abs(t_stat), axis=1)
+        rows = np.arange(len(values))
+        
+        best_t = t_stat[rows, best]
+        before = left_mean[rows, best]
+        after = right_mean[rows, best]
+        shift = after - before
+        
+        detected = valid[rows, best] & (np.abs(best_t) >= self.z_threshold) & (np.abs(shift) >= self.min_shift)
+        
+        return {
+            'position': best + 1,
+            'before': before,
+            'after': after,
+            't_stat': best_t,
+            'detected': detected
+        }
+    
+    def detect_anomalies(self, data: pd.DataFrame, flagged_only: bool = True) -> pd.DataFrame:
+        """
+        Bewertet alle Fragen-/Bildungsgang-Reihen und listet Auffälligkeiten
+        
+        Args:
+            data: IQES-Daten (Antwortskala) mit 'Fragenummer', 'Bildungsgang', 'Datum', 'Bewertung'
+            flagged_only: Nur auffällige Zeilen zurückgeben
+            
+        Returns:
+            DataFrame mit einer Zeile je auffälligem Wert bzw. Strukturbruch
+        """
+        series_keys, periods, values = build_series_panel(data, ['Fragenummer', 'Bildungsgang'])
+        
+        if values.size == 0:
+            return pd.DataFrame()
+        
+        changes = self.change_points(values)
+        history_z = self.history_scores(values)
+        
+        # Reihen mit Strukturbruch je Segment bewerten: Werte, die der Bruch bereits
+        # erklärt, zählen nicht zusätzlich als Ausreißer
+        detected = changes['detected']
+        break_position = np.where(detected, changes['position'], 0)
+        if detected.any():
+            after_break = np.arange(values.shape[1])[None, :] >= break_position[detected, None]
+            history_z[detected] = np.where(
+                after_break,
+                self.history_scores(np.where(after_break, values[detected], np.nan)),
+                self.history_scores(np.where(after_break, np.nan, values[detected]))
+            )
+        peer_z = self.peer_scores(series_keys, values, break_position)
+        
+        # Punkt-Auffälligkeiten: eine Zeile je beobachteter (Reihe, Zeitraum)
+        series_idx, period_idx = np.nonzero(~np.isnan(values))
+        point_history = history_z[series_idx, period_idx]
+        point_peer = peer_z[series_idx, period_idx]
+        score = np.fmax(np.abs(point_history), np.abs(point_peer))
+        signed = np.where(np.abs(point_history) >= np.nan_to_num(np.abs(point_peer)), point_history, point_peer)
+        
+        points = series_keys.iloc[series_idx].reset_index(drop=True)
+        points['Datum'] = periods[period_idx]
+        points['Bewertung'] = np.round(values[series_idx, period_idx], 2)
+        points['Z_Verlauf'] = np.round(point_history, 2)
+        points['Z_Peers'] = np.round(point_peer, 2)
+        points['Score'] = np.round(score, 2)
+        points['Veraenderung'] = np.nan
+        points['Typ'] = np.where(signed < 0, 'Ausreißer ↓', 'Ausreißer ↑')
+        points['Auffaellig'] = np.nan_to_num(score) >= self.z_threshold
+        
+        # Strukturbrüche: höchstens eine Zeile je Reihe
+        breaks = series_keys.copy()
+        breaks['Datum'] = periods[np.minimum(changes['position'], len(periods) - 1)]
+        breaks['Bewertung'] = np.round(changes['after'], 2)
+        breaks['Z_Verlauf'] = np.nan
+        breaks['Z_Peers'] = np.nan
+        breaks['Score'] = np.round(np.abs(changes['t_stat']), 2)
+        breaks['Veraenderung'] = np.round(changes['after'] - changes['before'], 2)
+        breaks['Typ'] = np.where(changes['t_stat'] < 0, 'Strukturbruch ↓', 'Strukturbruch ↑')
+        breaks['Auffaellig'] = changes['detected']
+        
+        result = pd.concat([points, breaks], ignore_index=True)
+        
+        if flagged_only:
+            result = result[result['Auffaellig']]
+        
+        # Fragetext und Thema für die Anzeige ergänzen
+        for column in ['Thema', 'Frage']:
+            if column in data.columns:
+                lookup = data.drop_duplicates('Fragenummer').set_index('Fragenummer')[column]
+                result[column] = result['Fragenummer'].map(lookup)
+        
+        return result.sort_values('Score', ascending=False).reset_index(drop=True)
@@ -0,0 +1,103 @@
+"""
+IQES Categorization - Vektorisierte Einstufung von Bewertungen
+Leitet Bewertungskategorie, Verbesserungsbedarf und Trend per np.digitize aus config/themes.py ab
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Tuple
+
+from config.themes import RATING_CATEGORIES, IMPROVEMENT_NEED_LEVELS, TREND_LEVELS
+
+
+# Zielspalte -> (Stufen-Konfiguration, fehlende Werte und Werte außerhalb der Skala als 'unbekannt' markieren)
+CATEGORY_COLUMNS = {
+    'Bewertungskategorie': (RATING_CATEGORIES, True),
+    'Verbesserungsbedarf': (IMPROVEMENT_NEED_LEVELS, False),
+    'Trend': (TREND_LEVELS, False)
+}
+
+UNKNOWN_LABEL = 'unbekannt'
+NOT_APPLICABLE_LABEL = 'N/A'
+
+
+class IQESCategorizer:
+    """
+    Einstufung aller Bewertungen in einem Aufruf
+    Die Klassengrenzen werden aus den Stufen-Dictionaries (min/max) der Konfiguration erzeugt
+    """
+    
+    def __init__(self):
+        self.bins = {column: self.build_bins(levels) for column, (levels, _) in CATEGORY_COLUMNS.items()}
+    
+    def build_bins(self, levels: Dict[str, Dict]) -> Tuple[np.ndarray, list, float, float]:
+        """
+        Erzeugt innere Klassengrenzen und Labels aus einer Stufen-Konfiguration
+        
+        Args:
+            levels: Dictionary {label: {'min': ..., 'max': ...}}
+            
+        Returns:
+            Tuple (innere Grenzen, Labels aufsteigend, Skalen-Minimum, Skalen-Maximum)
+        """
+        ordered = sorted(levels.items(), key=lambda item: item[1]['min'])
+        labels = [label for label, _ in ordered]
+        inner_edges = np.array([config['min'] for _, config in ordered[1:]], dtype=float)
+        return inner_edges, labels, ordered[0][1]['min'], ordered[-1][1]['max']
+    
+    def categorize(self, values: pd.Series, column: str) -> pd.Categorical:
+        """
+        Stuft Bewertungen für eine Zielspalte ein
+        
+        Intervalle sind links geschlossen ([min, max)), der Skalen-Höchstwert
+        gehört zur obersten Stufe.
+        
+        Args:
+            values: Bewertungen
+            column: Zielspalte aus CATEGORY_COLUMNS
+            
+        Returns:
+            Geordnete Kategorie (NaN-Bewertungen -> 'N/A' bzw. 'unbekannt' bei strikter Skala,
+            wie get_rating_category)
+        """
+        inner_edges, labels, scale_min, scale_max = self.bins[column]
+        strict_range = CATEGORY_COLUMNS[column][1]
+        
+        ratings = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+        codes = np.digitize(ratings, inner_edges)
+        
+        missing = np.isnan(ratings)
+        categories = labels + [UNKNOWN_LABEL if strict_range else NOT_APPLICABLE_LABEL]
+        codes = np.where(missing, len(labels), codes)
+        
+        if strict_range:
+            outside = ~missing & ((ratings < scale_min) | (ratings > scale_max))
+            codes = np.where(outside, len(labels), codes)
+        
+        return pd.Categorical.from_codes(codes, categories=categories, ordered=True)
+    
+    def add_category_columns(self, data: pd.DataFrame, columns: Tuple[str, ...] = None) -> pd.DataFrame:
+        """
+        Ergänzt die Daten um alle Kategorie-Spalten in einem Durchlauf
+        
+        Args:
+            data: IQES-Daten mit Spalte 'Bewertung'
+            columns: Optional nur diese Zielspalten berechnen
+            
+        Returns:
+            Kopie der Daten mit kategorialen Spalten
+        """
+        if data.empty or 'Bewertung' not in data.columns:
+            return data.copy()
+        
+        result = data.copy()
+        ratings = result['Bewertung']
+        
+        # Nur Antwortskala-Fragen haben eine Einstufung
+        if 'Fragentyp' in result.columns:
+            ratings = ratings.where(result['Fragentyp'] == 'Antwortskala')
+        
+        for column in columns or CATEGORY_COLUMNS.keys():
+            result[column] = self.categorize(ratings, column)
+        
+        return result
@@ -0,0 +1,257 @@
+"""
+IQES Clustering - Fragen-Cluster aus Verteilungen, Trends und Gaps
+Inkrementelles MiniBatchKMeans/IncrementalPCA mit Modell-Cache je Datenstand
+"""
+
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import Dict, MutableMapping, Optional, Tuple
+
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import IncrementalPCA
+from sklearn.preprocessing import StandardScaler
+
+from core.distribution_stats import IQESDistributionStats
+
+
+FEATURE_COLUMNS = [
+    'Anteil_1', 'Anteil_2', 'Anteil_3', 'Anteil_4',
+    'Bewertung', 'Trend', 'Gap'
+]
+
+
+class IQESQuestionClusterer:
+    """
+    Gruppiert Frage-Zeitraum-Zeilen nach ähnlichem Antwortmuster
+    
+    Merkmale je Zeile (Frage × Bildungsgang × Zeitraum):
+    - Antwortanteile 1-4 aus der Antwortverteilung
+    - mittlere Bewertung
+    - Trend: Veränderung gegenüber dem vorigen Zeitraum derselben Frage im Bildungsgang
+    - Gap: Abweichung vom Mittel aller Bildungsgänge für dieselbe Frage und denselben Zeitraum
+    
+    Skalierung, Clustering und Projektion werden batchweise per partial_fit
+    trainiert. Die Modelle werden je Datenstand (Hash der Merkmalsmatrix) in einem
+    Cache (z.B. st.session_state) abgelegt, sodass Reruns sie unverändert nutzen.
+    """
+    
+    def __init__(self, n_clusters: int = 4, n_components: int = 2, batch_size: int = 2048,
+                 n_epochs: int = 5, random_state: int = 42, cache_size: int = 3):
+        self.n_clusters = n_clusters
+        self.n_components = n_components
+        self.batch_size = batch_size
+        self.n_epochs = n_epochs
+        self.random_state = random_state
+        self.cache_size = cache_size
+        self.distribution_stats = IQESDistributionStats()
+    
+    def build_features(self, data: pd.DataFrame, question_key: Optional[str] = None) -> pd.DataFrame:
+        """
+        Merkmalsmatrix je Frage-Zeitraum-Zeile
+        
+        Args:
+            data: IQES-Daten (Antwortskala)
+            question_key: Fragen-Spalte (Standard: 'Frage_ID' falls vorhanden, sonst 'Fragenummer')
+            
+        Returns:
+            DataFrame mit FEATURE_COLUMNS (gleicher Index wie die verwendeten Zeilen)
+        """
+        if data.empty or 'Bewertung' not in data.columns:
+            return pd.DataFrame(columns=FEATURE_COLUMNS)
+        
+        question_key = question_key or ('Frage_ID' if 'Frage_ID' in data.columns else 'Fragenummer')
+        data = data[data['Bewertung'].notna()]
+        if data.empty:
+            return pd.DataFrame(columns=FEATURE_COLUMNS)
+        
+        counts = self.distribution_stats.extract_count_matrix(data)
+        totals = counts.sum(axis=1, keepdims=True)
+        shares = np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+        
+        # Ohne Antwortverteilung: Bewertung auf die beiden nächsten Skalenpunkte aufteilen
+        missing = totals[:, 0] == 0
+        if missing.any():
+            rating = np.clip(data['Bewertung'].to_numpy(dtype=float)[missing], 1, 4)
+            lower = np.floor(rating).astype(int)
+            upper_weight = rating - lower
+            rows = np.flatnonzero(missing)
+            shares[rows, lower - 1] = 1 - upper_weight
+            shares[rows, np.minimum(lower, 3)] += upper_weight
+        
+        features = pd.DataFrame(shares, index=data.index, columns=FEATURE_COLUMNS[:4])
+        features['Bewertung'] = data['Bewertung'].astype(float)
+        
+        series_keys = [col for col in [question_key, 'Bildungsgang'] if col in data.columns]
+        if series_keys and 'Datum' in data.columns:
+            ordered = data.sort_values('Datum')
+            features['Trend'] = ordered.groupby(series_keys)['Bewertung'].diff().reindex(data.index).fillna(0.0)
+        else:
+            features['Trend'] = 0.0
+        
+        peer_keys = [col for col in [question_key, 'Datum'] if col in data.columns]
+        if peer_keys:
+            features['Gap'] = data['Bewertung'] - data.groupby(peer_keys)['Bewertung'].transform('mean')
+        else:
+            features['Gap'] = 0.0
+        
+        return features[FEATURE_COLUMNS]
+    
+    def dataset_version(self, features: pd.DataFrame) -> str:
+        """
+        Hash über Merkmalsmatrix und Modellparameter
+        
+        Args:
+            features: Merkmalsmatrix
+            
+        Returns:
+            Kurzer SHA-1-Hash als Cache-Schlüssel
+        """
+        digest = hashlib.sha1(np.ascontiguousarray(features.to_numpy(dtype=float)).tobytes())
+        digest.update(f"{self.n_clusters}|{self.n_components}|{self.random_state}".encode())
+        return digest.hexdigest()[:16]
+    
+    def _batches(self, n_rows: int, rng: np.random.Generator):
+        """Zufällig gemischte Index-Batches über alle Zeilen"""
+        order = rng.permutation(n_rows)
+        for start in range(0, n_rows, self.batch_size):
+            yield order[start:start + self.batch_size]
+    
+    def fit(self, features: pd.DataFrame) -> Dict:
+        """
+        Trainiert Skalierung, MiniBatchKMeans und IncrementalPCA batchweise
+        
+        Args:
+            features: Merkmalsmatrix
+            
+        Returns:
+            Modell-Dictionary (scaler, kmeans, pca, label_order)
+        """
+        matrix = features.to_numpy(dtype=float)
+        n_rows = len(matrix)
+        n_clusters = min(self.n_clusters, n_rows)
+        n_components = min(self.n_components, matrix.shape[1], n_rows)
+        rng = np.random.default_rng(self.random_state)
+        
+        scaler = StandardScaler()
+        for batch in self._batches(n_rows, rng):
+            scaler.partial_fit(matrix[batch])
+        scaled = scaler.transform(matrix)
+        
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, batch_size=self.batch_size,
+                                 random_state=self.random_state, n_init=3)
+        pca = IncrementalPCA(n_components=n_components)
+        
+        # Erster Batch muss mindestens n_clusters bzw. n_components Zeilen enthalten
+        min_batch = max(n_clusters, n_components)
+        for epoch in range(self.n_epochs):
+            for batch in self._batches(n_rows, rng):
+                if len(batch) < min_batch:
+                    continue
+                kmeans.partial_fit(scaled[batch])
+                if epoch == 0:
+                    pca.partial_fit(scaled[batch])
+        
+        if not hasattr(kmeans, 'cluster_centers_'):
+            kmeans.partial_fit(scaled)
+        if not hasattr(pca, 'components_'):
+            pca.partial_fit(scaled)
+        
+        # Cluster-Nummern stabil nach mittlerer Bewertung des Zentrums ordnen (1 = niedrigste)
+        centers = scaler.inverse_transform(kmeans.cluster_centers_)
+        rating_column = FEATURE_COLUMNS.index('Bewertung')
+        label_order = np.empty(n_clusters, dtype=np.int64)
+        label_order[np.argsort(centers[:, rating_column], kind='stable')] = np.arange(1, n_clusters + 1)
+        
+        return {'scaler': scaler, 'kmeans': kmeans, 'pca': pca, 'label_order': label_order}
+    
+    def fit_cached(self, features: pd.DataFrame, store: Optional[MutableMapping] = None) -> Dict:
+        """
+        Liefert die Modelle zum aktuellen Datenstand, trainiert nur bei Bedarf
+        
+        Args:
+            features: Merkmalsmatrix
+            store: Cache (z.B. st.session_state); None = ohne Cache
+            
+        Returns:
+            Modell-Dictionary
+        """
+        if store is None:
+            return self.fit(features)
+        
+        version = self.dataset_version(features)
+        cache = store.get('cluster_models', {})
+        if version not in cache:
+            cache[version] = self.fit(features)
+            # Nur die zuletzt verwendeten Datenstände behalten
+            while len(cache) > self.cache_size:
+                cache.pop(next(iter(cache)))
+            store['cluster_models'] = cache
+        return cache[version]
+    
+    def predict(self, features: pd.DataFrame, models: Dict) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cluster-Nummer und Projektion batchweise
+        
+        Args:
+            features: Merkmalsmatrix
+            models: Modell-Dictionary aus fit/fit_cached
+            
+        Returns:
+            Tuple (Cluster-Nummern ab 1, Koordinaten (n_zeilen, n_components))
+        """
+        matrix = features.to_numpy(dtype=float)
+        labels = np.empty(len(matrix), dtype=np.int64)
+        coordinates = np.empty((len(matrix), models['pca'].n_components_))
+        
+        for start in range(0, len(matrix), self.batch_size):
+            scaled = models['scaler'].transform(matrix[start:start + self.batch_size])
+            labels[start:start + len(scaled)] = models['label_order'][models['kmeans'].predict(scaled)]
+            coordinates[start:start + len(scaled)] = models['pca'].transform(scaled)
+        
+        return labels, coordinates
+    
+    def assign_clusters(self, data: pd.DataFrame, store: Optional[MutableMapping] = None) -> pd.DataFrame:
+        """
+        Ergänzt die Daten um die Spalten 'Cluster', 'Cluster_PC1', 'Cluster_PC2'
+        
+        Args:
+            data: IQES-Daten (Antwortskala)
+            store: Optionaler Modell-Cache
+            
+        Returns:
+            Kopie der Daten; Zeilen ohne Bewertung erhalten kein Cluster
+        """
+        result = data.copy()
+        features = self.build_features(data)
+        
+        if len(features) < 2:
+            result['Cluster'] = pd.array([pd.NA] * len(result), dtype='Int64')
+            return result
+        
+        models = self.fit_cached(features, store)
+        labels, coordinates = self.predict(features, models)
+        
+        result['Cluster'] = pd.Series(labels, index=features.index).reindex(result.index).astype('Int64')
+        for component in range(coordinates.shape[1]):
+            result[f'Cluster_PC{component + 1}'] = pd.Series(coordinates[:, component], index=features.index)
+        return result
+    
+    def cluster_profiles(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Mittleres Merkmalsprofil je Cluster
+        
+        Args:
+            data: Daten mit Spalte 'Cluster' (aus assign_clusters)
+            
+        Returns:
+            DataFrame je Cluster mit Anzahl und mittleren Merkmalen
+        """
+        if 'Cluster' not in data.columns or data['Cluster'].isna().all():
+            return pd.DataFrame()
+        
+        features = self.build_features(data)
+        features['Cluster'] = data.loc[features.index, 'Cluster']
+        profiles = features.groupby('Cluster')[FEATURE_COLUMNS].mean().round(3)
+        profiles.insert(0, 'Anzahl', features.groupby('Cluster').size())
+        return profiles
@@ -0,0 +1,171 @@
+"""
+IQES Cohorts - Zwischen-/Abschlussevaluation je Jahrgang
+Verknüpft die Zwischenevaluation eines Jahrgangs mit seiner Abschlussevaluation über einen vorberechneten Join-Index
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Tuple
+
+from config.themes import KOHORTEN_CONFIG
+
+
+class IQESCohortIndex:
+    """
+    Join-Index zwischen Zwischen- und Abschlussevaluationen
+    
+    Eine Evaluation ist die Kombination aus Bildungsgang, Datum und Evaluationstyp.
+    Beim Aufbau erhält jede Zeile einmalig ihre Evaluations-Nummer, und je
+    Bildungsgang wird jede Zwischenevaluation der Abschlussevaluation zugeordnet,
+    deren Abstand dem erwarteten Kohortenzeitraum am nächsten liegt (1:1).
+    
+    Mittelwerte je Evaluation und Frage/Thema werden als Matrix
+    (n_evaluationen, n_werte) einmal je Dimension aggregiert. Pre/Post-Deltas sind
+    danach reine Zeilen-Lookups über die Paar-Indizes, ohne Merge der Rohdaten.
+    """
+    
+    def __init__(self, data: pd.DataFrame, expected_months: int = KOHORTEN_CONFIG['expected_months'],
+                 min_months: int = KOHORTEN_CONFIG['min_months'],
+                 max_months: int = KOHORTEN_CONFIG['max_months']):
+        self.expected_months = expected_months
+        self.min_months = min_months
+        self.max_months = max_months
+        self._cubes: Dict[str, Tuple[pd.Index, np.ndarray]] = {}
+        
+        required = ['Bildungsgang', 'Datum', 'Evaluationstyp', 'Bewertung']
+        if data.empty or any(col not in data.columns for col in required):
+            self.data = pd.DataFrame()
+            self.evaluations = pd.DataFrame()
+            self.row_evaluation = np.empty(0, dtype=np.int64)
+            self.pairs = pd.DataFrame()
+            return
+        
+        keys = ['Bildungsgang', 'Datum', 'Evaluationstyp']
+        # Zeilen ohne vollständigen Evaluations-Schlüssel gehören zu keiner Evaluation
+        self.data = data[data['Bewertung'].notna() & data[keys].notna().all(axis=1)]
+        self.row_evaluation = self.data.groupby(keys, sort=True).ngroup().to_numpy()
+        self.evaluations = self.data[keys].drop_duplicates().sort_values(keys).reset_index(drop=True)
+        
+        dates = pd.to_datetime(self.evaluations['Datum'])
+        self.evaluations['Monat'] = dates.dt.year * 12 + dates.dt.month - 1
+        self.evaluations['Abschluss'] = self.evaluations['Evaluationstyp'].astype(str).str.contains('Abschluss')
+        
+        self.pairs = self._pair_evaluations()
+    
+    def _pair_evaluations(self) -> pd.DataFrame:
+        """
+        Ordnet Zwischen- und Abschlussevaluationen je Bildungsgang einander zu
+        
+        Returns:
+            DataFrame je Kohorte mit Evaluations-Nummern 'Pre'/'Post', Daten und Abstand
+        """
+        evaluations = self.evaluations.reset_index().rename(columns={'index': 'Evaluation'})
+        interim = evaluations[~evaluations['Abschluss']]
+        final = evaluations[evaluations['Abschluss']]
+        
+        candidates = interim.merge(final, on='Bildungsgang', suffixes=('_Pre', '_Post'))
+        candidates['Abstand_Monate'] = candidates['Monat_Post'] - candidates['Monat_Pre']
+        candidates = candidates[candidates['Abstand_Monate'].between(self.min_months, self.max_months)]
+        
+        if candidates.empty:
+            return pd.DataFrame()
+        
+        # Nächster Abstand zum erwarteten Kohortenzeitraum zuerst, jede Evaluation höchstens einmal
+        candidates = candidates.assign(
+            Abweichung=(candidates['Abstand_Monate'] - self.expected_months).abs()
+        ).sort_values(['Abweichung', 'Abstand_Monate', 'Bildungsgang', 'Monat_Pre'])
+        
+        used_pre, used_post, chosen = set(), set(), []
+        for row in candidates.itertuples(index=False):
+            if row.Evaluation_Pre in used_pre or row.Evaluation_Post in used_post:
+                continue
+            used_pre.add(row.Evaluation_Pre)
+            used_post.add(row.Evaluation_Post)
+            chosen.append(row)
+        
+        pairs = pd.DataFrame(chosen).sort_values(['Bildungsgang', 'Monat_Pre']).reset_index(drop=True)
+        pairs['Kohorte'] = (
+            pairs['Bildungsgang'].astype(str) + ' ' +
+            pd.to_datetime(pairs['Datum_Pre']).dt.strftime('%Y-%m') + ' → ' +
+            pd.to_datetime(pairs['Datum_Post']).dt.strftime('%Y-%m')
+        )
+        
+        return pairs.rename(columns={
+            'Evaluation_Pre': 'Pre', 'Evaluation_Post': 'Post',
+            'Datum_Pre': 'Datum_Zwischen', 'Datum_Post': 'Datum_Abschluss'
+        })[['Kohorte', 'Bildungsgang', 'Datum_Zwischen', 'Datum_Abschluss', 'Abstand_Monate', 'Pre', 'Post']]
+    
+    def mean_cube(self, dimension: str) -> Tuple[pd.Index, np.ndarray]:
+        """
+        Mittelwert je Evaluation und Dimensionswert (einmal je Dimension berechnet)
+        
+        Args:
+            dimension: z.B. 'Thema', 'Fragenummer' oder 'Frage_ID'
+            
+        Returns:
+            Tuple (Dimensionswerte, Matrix (n_evaluationen, n_werte) mit NaN)
+        """
+        if dimension in self._cubes:
+            return self._cubes[dimension]
+        
+        if self.data.empty or dimension not in self.data.columns:
+            return pd.Index([]), np.empty((len(self.evaluations), 0))
+        
+        item_codes, items = pd.factorize(self.data[dimension], sort=True)
+        valid = item_codes >= 0
+        n_items = len(items)
+        flat = self.row_evaluation[valid] * n_items + item_codes[valid]
+        size = len(self.evaluations) * n_items
+        
+        ratings = self.data['Bewertung'].to_numpy(dtype=float)[valid]
+        sums = np.bincount(flat, weights=ratings, minlength=size)
+        counts = np.bincount(flat, minlength=size)
+        means = np.divide(sums, counts, out=np.full(size, np.nan), where=counts > 0)
+        
+        self._cubes[dimension] = (pd.Index(items), means.reshape(len(self.evaluations), n_items))
+        return self._cubes[dimension]
+    
+    def delta_matrix(self, dimension: str) -> pd.DataFrame:
+        """
+        Pre/Post-Deltas aller Kohorten als Matrix
+        
+        Args:
+            dimension: Vergleichsdimension
+            
+        Returns:
+            DataFrame (Kohorte × Dimensionswert), Abschluss minus Zwischen
+        """
+        if self.pairs.empty:
+            return pd.DataFrame()
+        
+        items, means = self.mean_cube(dimension)
+        pre, post = self.pairs['Pre'].to_numpy(), self.pairs['Post'].to_numpy()
+        return pd.DataFrame(means[post] - means[pre], index=self.pairs['Kohorte'], columns=items)
+    
+    def deltas(self, dimension: str) -> pd.DataFrame:
+        """
+        Pre/Post-Deltas je Kohorte und Dimensionswert in Langform
+        
+        Args:
+            dimension: Vergleichsdimension
+            
+        Returns:
+            DataFrame mit Kohorte, Bildungsgang, Dimension, Bewertung_Zwischen/Abschluss und Delta
+        """
+        if self.pairs.empty:
+            return pd.DataFrame()
+        
+        items, means = self.mean_cube(dimension)
+        pre, post = self.pairs['Pre'].to_numpy(), self.pairs['Post'].to_numpy()
+        before, after = means[pre], means[post]
+        
+        pair_idx, item_idx = np.nonzero(~np.isnan(after - before))
+        
+        return pd.DataFrame({
+            'Kohorte': self.pairs['Kohorte'].to_numpy()[pair_idx],
+            'Bildungsgang': self.pairs['Bildungsgang'].to_numpy()[pair_idx],
+            dimension: items[item_idx],
+            'Bewertung_Zwischen': np.round(before[pair_idx, item_idx], 2),
+            'Bewertung_Abschluss': np.round(after[pair_idx, item_idx], 2),
+            'Delta': np.round(after[pair_idx, item_idx] - before[pair_idx, item_idx], 3)
+        })
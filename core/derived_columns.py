@@ -0,0 +1,89 @@
+"""
+IQES Derived Columns - Versionierte Ableitungsstufe
+Trennt geparste Basisdaten von konfigurationsabhängigen Spalten (Themen, Farben, Kategorien)
+"""
+
+import pandas as pd
+from typing import Callable, MutableMapping, Optional, Tuple
+
+
+class IQESDerivedStage:
+    """
+    Zweistufiger Daten-Cache (z.B. in st.session_state)
+    
+    Die Basisdaten (teures Excel-Parsing) werden je Datei-Hash gehalten. Die daraus
+    abgeleiteten Spalten bilden eine eigene, günstige Stufe, die an die
+    Konfigurationsversion gebunden ist. Ändert sich config/themes.py, wird nur
+    diese Stufe neu berechnet, die Basisdaten bleiben erhalten.
+    """
+    
+    def __init__(self, derive: Callable[[pd.DataFrame], pd.DataFrame], version: str,
+                 base_key: str = 'base_data', derived_key: str = 'processed_data',
+                 version_key: str = 'derived_config_version', source_key: str = 'last_file_hash'):
+        self.derive = derive
+        self.version = version
+        self.base_key = base_key
+        self.derived_key = derived_key
+        self.version_key = version_key
+        self.source_key = source_key
+    
+    def store_base(self, store: MutableMapping, data: pd.DataFrame, source_hash: str):
+        """
+        Legt neue Basisdaten ab und verwirft die bisherige Ableitungsstufe
+        
+        Args:
+            store: Cache (z.B. st.session_state)
+            data: Bereinigte Basisdaten ohne abgeleitete Spalten
+            source_hash: Hash der hochgeladenen Dateien
+        """
+        store[self.base_key] = data
+        store[self.source_key] = source_hash
+        store.pop(self.derived_key, None)
+        store.pop(self.version_key, None)
+    
+    def has_base(self, store: MutableMapping, source_hash: str) -> bool:
+        """
+        Prüft, ob Basisdaten zu den hochgeladenen Dateien vorliegen
+        
+        Args:
+            store: Cache (z.B. st.session_state)
+            source_hash: Hash der hochgeladenen Dateien
+            
+        Returns:
+            True, wenn die Basisdaten wiederverwendet werden können
+        """
+        base = store.get(self.base_key)
+        return base is not None and not base.empty and store.get(self.source_key) == source_hash
+    
+    def resolve(self, store: MutableMapping) -> Tuple[Optional[pd.DataFrame], bool]:
+        """
+        Liefert die abgeleiteten Daten zur aktuellen Konfigurationsversion
+        
+        Args:
+            store: Cache (z.B. st.session_state)
+            
+        Returns:
+            Tuple (Daten mit abgeleiteten Spalten oder None, True wenn neu berechnet)
+        """
+        base = store.get(self.base_key)
+        if base is None or base.empty:
+            return None, False
+        
+        derived = store.get(self.derived_key)
+        if store.get(self.version_key) == self.version and derived is not None and not derived.empty:
+            return derived, False
+        
+        derived = self.derive(base)
+        store[self.derived_key] = derived
+        store[self.version_key] = self.version
+        return derived, True
+    
+    def clear(self, store: MutableMapping):
+        """
+        Leert beide Stufen
+        
+        Args:
+            store: Cache (z.B. st.session_state)
+        """
+        for key in (self.base_key, self.derived_key, self.version_key, self.source_key):
+            store.pop(key, None)
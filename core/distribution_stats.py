@@ -0,0 +1,157 @@
+"""
+IQES Distribution Stats - Exakte Verteilungsstatistiken
+Berechnet Kennzahlen aus den Antworthäufigkeiten (antwort_1..antwort_4) statt aus dem Mittelwert
+"""
+
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Union
+
+from config.themes import IQES_SCALE
+
+
+# Skalenpunkte der IQES-Antwortskala (1 = trifft nicht zu ... 4 = trifft zu)
+SCALE_POINTS = np.array(sorted(IQES_SCALE.keys()), dtype=float)
+COUNT_COLUMNS = [f'antwort_{int(point)}' for point in SCALE_POINTS]
+
+
+class IQESDistributionStats:
+    """
+    Batch-Statistiken über Antwortverteilungen
+    Alle Berechnungen laufen als NumPy-Operationen auf einer (n_fragen × 4) Häufigkeitsmatrix
+    """
+    
+    def __init__(self):
+        self.scale_points = SCALE_POINTS
+        self.count_columns = COUNT_COLUMNS
+        # "trifft eher zu" und "trifft zu" gelten als Zustimmung
+        self.agreement_mask = self.scale_points >= 3
+        self.top_box_mask = self.scale_points == self.scale_points.max()
+        self.bottom_box_mask = self.scale_points == self.scale_points.min()
+    
+    def extract_count_matrix(self, data: pd.DataFrame) -> np.ndarray:
+        """
+        Baut die Häufigkeitsmatrix aus den Antwortverteilungen
+        
+        Args:
+            data: IQES-Daten mit Spalte 'Antwortverteilung' (Dict) oder Spalten antwort_1..antwort_4
+            
+        Returns:
+            Array der Form (n_zeilen, 4) mit Antworthäufigkeiten (fehlende Werte = 0)
+        """
+        if data.empty:
+            return np.zeros((0, len(self.scale_points)))
+        
+        if all(col in data.columns for col in self.count_columns):
+            counts = data[self.count_columns]
+        elif 'Antwortverteilung' in data.columns:
+            records = [dist if isinstance(dist, dict) else {} for dist in data['Antwortverteilung']]
+            counts = pd.DataFrame.from_records(records, index=data.index, columns=self.count_columns)
+        else:
+            return np.zeros((len(data), len(self.scale_points)))
+        
+        counts = counts.apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(dtype=float)
+        return np.clip(counts, 0, None)
+    
+    def compute_statistics(self, counts: np.ndarray) -> pd.DataFrame:
+        """
+        Berechnet Verteilungskennzahlen für alle Zeilen der Häufigkeitsmatrix
+        
+        Args:
+            counts: Array der Form (n, 4) mit Antworthäufigkeiten
+            
+        Returns:
+            DataFrame mit N, Mittelwert, Median, Standardabweichung und Box-Anteilen (NaN ohne Antworten)
+        """
+        counts = np.asarray(counts, dtype=float).reshape(-1, len(self.scale_points))
+        n = counts.sum(axis=1)
+        valid = n > 0
+        safe_n = np.where(valid, n, 1.0)
+        
+        shares = counts / safe_n[:, None]
+        mean = shares @ self.scale_points
+        
+        # Stichproben-Standardabweichung (ddof=1) aus Summe der Abweichungsquadrate
+        squared_dev = counts @ (self.scale_points ** 2) - n * mean ** 2
+        std = np.sqrt(np.clip(squared_dev, 0, None) / np.where(n > 1, n - 1, 1.0))
+        std = np.where(n > 1, std, np.nan)
+        
+        # Median über kumulierte Anteile: liegt die 50%-Grenze exakt auf einer
+        # Kategoriengrenze, wird zwischen beiden Skalenpunkten gemittelt
+        cumulative = np.cumsum(shares, axis=1)
+        tolerance = 1e-9
+        lower = np.argmax(cumulative >= 0.5 - tolerance, axis=1)
+        upper = np.argmax(cumulative > 0.5 + tolerance, axis=1)
+        median = (self.scale_points[lower] + self.scale_points[upper]) / 2
+        
+        statistics = pd.DataFrame({
+            'N_Verteilung': n,
+            'Mittelwert_Verteilung': mean,
+            'Median': median,
+            'Standardabweichung': std,
+            'Zustimmung_Anteil': shares[:, self.agreement_mask].sum(axis=1),
+            'Top_Box_Anteil': shares[:, self.top_box_mask].sum(axis=1),
+            'Bottom_Box_Anteil': shares[:, self.bottom_box_mask].sum(axis=1),
+        })
+        
+        statistics.loc[~valid, statistics.columns.drop('N_Verteilung')] = np.nan
+        return statistics
+    
+    def add_distribution_statistics(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Ergänzt jede Frage um exakte Verteilungskennzahlen
+        
+        Args:
+            data: IQES-Daten mit Antwortverteilungen
+            
+        Returns:
+            Kopie der Daten mit zusätzlichen Statistik-Spalten
+        """
+        if data.empty:
+            return data.copy()
+        
+        statistics = self.compute_statistics(self.extract_count_matrix(data))
+        statistics.index = data.index
+        
+        result = data.drop(columns=[col for col in statistics.columns if col in data.columns])
+        return pd.concat([result, statistics], axis=1)
+    
+    def pool_distributions(self, data: pd.DataFrame, group_by: Union[str, List[str]],
+                           counts: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        Poolt Antwortverteilungen über Gruppen durch Addition der Häufigkeiten
+        
+        Anders als ein Mittelwert der Mittelwerte gewichtet das Poolen jede
+        Einzelantwort gleich, unabhängig von der Gruppengröße.
+        
+        Args:
+            data: IQES-Daten mit Antwortverteilungen
+            group_by: Gruppierungs-Spalte(n), z.B. 'Fragenummer' oder ['Thema', 'Datum']
+            counts: Optional bereits extrahierte Häufigkeitsmatrix zu data
+            
+        Returns:
+            DataFrame mit Gruppenschlüsseln, gepoolten Häufigkeiten und Kennzahlen
+        """
+        group_cols = [group_by] if isinstance(group_by, str) else list(group_by)
+        
+        if data.empty or any(col not in data.columns for col in group_cols):
+            return pd.DataFrame()
+        
+        if counts is None:
+            counts = self.extract_count_matrix(data)
+        
+        grouper = data.groupby(group_cols, sort=True, dropna=False)
+        codes = grouper.ngroup().to_numpy()
+        
+        pooled = np.zeros((grouper.ngroups, len(self.scale_points)))
+        np.add.at(pooled, codes, counts)
+        
+        keys = grouper.size().index.to_frame(index=False)
+        
+        result = pd.concat([
+            keys,
+            pd.DataFrame(pooled, columns=self.count_columns),
+            self.compute_statistics(pooled)
+        ], axis=1)
+        
+        return result
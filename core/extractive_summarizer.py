@@ -0,0 +1,203 @@
+"""
+IQES Extractive Summarizer - Lokale Zusammenfassung offener Antworten
+TF-IDF-Satzvektoren mit TextRank-Zentralität über dünn besetzte Matrizen, ohne Netzwerkzugriff
+"""
+
+import re
+import numpy as np
+from scipy import sparse
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+
+class IQESExtractiveSummarizer:
+    """
+    Wählt die repräsentativsten Aussagen einer Antwortmenge aus
+    
+    Antworten werden in Sätze zerlegt und identische Sätze zusammengefasst. Die
+    Sätze bilden einen Graphen mit der Kosinus-Ähnlichkeit ihrer TF-IDF-Vektoren
+    als Kantengewicht; der PageRank dieses Graphen (TextRank) misst, wie zentral
+    eine Aussage ist. Häufig wiederholte Sätze erhalten eine höhere
+    Sprungwahrscheinlichkeit. Bei der Auswahl werden nahezu gleiche Sätze
+    übersprungen.
+    
+    Das Ergebnis hat dieselbe Gliederung wie die KI-Insights (Hauptthemen,
+    positive Aspekte, Problembereiche, Aussagen) und dient als Fallback ohne
+    KI-Anbieter.
+    """
+    
+    def __init__(self, stop_words: Optional[Iterable[str]] = None,
+                 sentiment: Optional[Callable[[List[str]], List[float]]] = None,
+                 max_sentences: int = 3, n_themes: int = 5, damping: float = 0.85,
+                 similarity_threshold: float = 0.05, redundancy_threshold: float = 0.6,
+                 max_iter: int = 100, tol: float = 1e-6):
+        self.stop_words = sorted(stop_words) if stop_words else None
+        self.sentiment = sentiment
+        self.max_sentences = max_sentences
+        self.n_themes = n_themes
+        self.damping = damping
+        self.similarity_threshold = similarity_threshold
+        self.redundancy_threshold = redundancy_threshold
+        self.max_iter = max_iter
+        self.tol = tol
+    
+    def split_sentences(self, texts: Iterable[str], weights: Optional[Iterable[float]] = None) -> Tuple[List[str], np.ndarray]:
+        """
+        Zerlegt Antworten in eindeutige Sätze
+        
+        Args:
+            texts: Textantworten
+            weights: Optionales Gewicht je Antwort (z.B. Anzahl zusammengefasster Duplikate)
+            
+        Returns:
+            Tuple (eindeutige Sätze, Häufigkeit je Satz)
+        """
+        texts = list(texts)
+        weights = [1] * len(texts) if weights is None else list(weights)
+        counts: Dict[str, float] = {}
+        for text, weight in zip(texts, weights):
+            for sentence in re.split(r'(?<=[.!?])\s+|\n+', str(text)):
+                sentence = sentence.strip(' -•*\t')
+                if len(sentence) > 2:
+                    counts[sentence] = counts.get(sentence, 0) + weight
+        return list(counts), np.array(list(counts.values()), dtype=float)
+    
+    def rank_sentences(self, sentences: List[str], weights: np.ndarray) -> Tuple[np.ndarray, sparse.csr_matrix, np.ndarray]:
+        """
+        TextRank-Zentralität je Satz
+        
+        Args:
+            sentences: Eindeutige Sätze
+            weights: Häufigkeit je Satz (Sprungverteilung)
+            
+        Returns:
+            Tuple (Scores (Summe 1), normierte TF-IDF-Matrix, Vokabular)
+        """
+        vectorizer = TfidfVectorizer(
+            stop_words=self.stop_words, token_pattern=r'(?u)\b[^\W\d_]{4,}\b', sublinear_tf=True
+        )
+        try:
+            matrix = vectorizer.fit_transform(sentences).tocsr()
+        except ValueError:
+            # Nur Stoppwörter oder zu kurze Wörter: keine Zentralität berechenbar
+            return weights / weights.sum(), sparse.csr_matrix((len(sentences), 0)), np.array([])
+        
+        similarity = (matrix @ matrix.T).tocsr()
+        similarity.setdiag(0)
+        similarity.data[similarity.data < self.similarity_threshold] = 0
+        similarity.eliminate_zeros()
+        
+        row_sums = np.asarray(similarity.sum(axis=1)).ravel()
+        inverse = np.divide(1.0, row_sums, out=np.zeros_like(row_sums), where=row_sums > 0)
+        transition_t = (sparse.diags(inverse) @ similarity).T.tocsr()
+        dangling = row_sums == 0
+        
+        teleport = weights / weights.sum()
+        scores = teleport.copy()
+        for _ in range(self.max_iter):
+            # Sätze ohne Kanten verteilen ihr Gewicht gemäß der Sprungverteilung
+            updated = (1 - self.damping) * teleport + self.damping * (
+                transition_t @ scores + scores[dangling].sum() * teleport
+            )
+            converged = np.abs(updated - scores).sum() < self.tol
+            scores = updated
+            if converged:
+                break
+        
+        return scores, matrix, vectorizer.get_feature_names_out()
+    
+    def _select(self, order: np.ndarray, matrix: sparse.csr_matrix, limit: int) -> List[int]:
+        """Beste Sätze in Score-Reihenfolge, ohne nahezu gleiche Aussagen"""
+        chosen: List[int] = []
+        for index in order:
+            if len(chosen) >= limit:
+                break
+            if chosen and matrix.shape[1] > 0:
+                overlap = (matrix[chosen] @ matrix[index].T).toarray().ravel()
+                if overlap.max() > self.redundancy_threshold:
+                    continue
+            chosen.append(int(index))
+        return chosen
+    
+    def summarize(self, texts: Iterable[str], weights: Optional[Iterable[float]] = None) -> Dict:
+        """
+        Extraktive Zusammenfassung einer Antwortmenge
+        
+        Args:
+            texts: Textantworten
+            weights: Optionales Gewicht je Antwort (z.B. Anzahl zusammengefasster Duplikate)
+            
+        Returns:
+            Dictionary mit 'themes', 'representative', 'positive', 'negative'
+            (Listen von Sätzen bzw. Begriffen), 'n_answers' und 'n_sentences'
+        """
+        texts = [str(text) for text in texts]
+        answer_weights = np.ones(len(texts)) if weights is None else np.asarray(list(weights), dtype=float)
+        keep = [index for index, text in enumerate(texts) if text.strip()]
+        texts, answer_weights = [texts[index] for index in keep], answer_weights[keep]
+        
+        sentences, weights = self.split_sentences(texts, answer_weights)
+        summary = {
+            'themes': [], 'representative': [], 'positive': [], 'negative': [],
+            'n_answers': int(answer_weights.sum()), 'n_sentences': int(weights.sum())
+        }
+        if not sentences:
+            return summary
+        
+        scores, matrix, vocabulary = self.rank_sentences(sentences, weights)
+        order = np.argsort(-scores, kind='stable')
+        
+        if len(vocabulary):
+            # Begriffsgewicht: TF-IDF gewichtet mit der Zentralität der Sätze
+            term_weights = np.asarray(matrix.T @ (scores * weights)).ravel()
+            top_terms = np.argsort(-term_weights, kind='stable')[:self.n_themes]
+            summary['themes'] = [vocabulary[index] for index in top_terms if term_weights[index] > 0]
+        
+        summary['representative'] = [sentences[i] for i in self._select(order, matrix, self.max_sentences)]
+        
+        if self.sentiment is not None:
+            polarity = np.asarray(self.sentiment(sentences), dtype=float)
+            for key, mask in [('positive', polarity > 0), ('negative', polarity < 0)]:
+                subset = order[mask[order]]
+                summary[key] = [sentences[i] for i in self._select(subset, matrix, self.max_sentences)]
+        
+        return summary
+    
+    def format_insights(self, summary: Dict) -> Optional[str]:
+        """
+        Text in der Gliederung der KI-Insights
+        
+        Args:
+            summary: Ergebnis von summarize
+            
+        Returns:
+            Markdown-Text oder None, wenn keine Aussagen vorliegen
+        """
+        if not summary['representative']:
+            return None
+        
+        def bullets(sentences: List[str]) -> str:
+            return '\n'.join(f'- „{sentence}“' for sentence in sentences) if sentences else '- keine eindeutigen Aussagen'
+        
+        sections = [
+            f"1. 📊 HAUPTTHEMEN: {', '.join(summary['themes']) or 'keine eindeutigen Begriffe'}",
+            f"2. 😊 POSITIVE ASPEKTE:\n{bullets(summary['positive'])}",
+            f"3. ⚠️ PROBLEMBEREICHE:\n{bullets(summary['negative'])}",
+            f"4. 🎯 REPRÄSENTATIVE AUSSAGEN:\n{bullets(summary['representative'])}"
+        ]
+        footer = f"_Lokale Zusammenfassung aus {summary['n_answers']} Antworten ({summary['n_sentences']} Sätze), ohne KI-Anbieter._"
+        return '\n\n'.join(sections + [footer])
+    
+    def insights(self, texts: Iterable[str], weights: Optional[Iterable[float]] = None) -> Optional[str]:
+        """
+        Zusammenfassung als Insights-Text
+        
+        Args:
+            texts: Textantworten
+            weights: Optionales Gewicht je Antwort
+            
+        Returns:
+            Markdown-Text oder None
+        """
+        return self.format_insights(self.summarize(texts, weights))
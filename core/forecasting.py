@@ -0,0 +1,187 @@
+"""
+IQES Forecasting - Batch-Prognosen für alle Zeitreihen
+Lineare und gedämpfte Trendmodelle über der echten Zeitachse, für alle Reihen gleichzeitig
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from typing import List, Union
+
+from core.series_panel import build_series_panel, period_positions
+
+
+class IQESTrendForecaster:
+    """
+    Prognostiziert den nächsten Evaluationszeitraum für jede Fragen-/Themen-/Bildungsgang-Reihe
+    Die lineare Regression aller Reihen wird als ein gestapeltes 2×2-Gleichungssystem gelöst
+    """
+    
+    def __init__(self, damping: float = 0.95, alpha: float = 0.5, beta: float = 0.3,
+                 confidence: float = 0.95):
+        self.damping = damping        # Dämpfungsfaktor phi des Trends
+        self.alpha = alpha            # Glättung des Niveaus
+        self.beta = beta              # Glättung des Trends
+        self.confidence = confidence
+        self.scale_min = 1.0
+        self.scale_max = 4.0
+    
+    def fit_linear(self, values: np.ndarray, x: np.ndarray) -> dict:
+        """
+        Gewichtete kleinste Quadrate für alle Reihen in einem Batch
+        
+        Args:
+            values: Matrix (n_reihen, n_zeiträume) mit NaN für fehlende Werte
+            x: Zeitachse (n_zeiträume,) in Jahren
+            
+        Returns:
+            Dictionary mit Achsenabschnitt, Steigung, Residuen-Streuung und Hilfsgrößen je Reihe
+        """
+        weights = (~np.isnan(values)).astype(float)
+        y = np.nan_to_num(values)
+        
+        s0 = weights.sum(axis=1)
+        s1 = weights @ x
+        s2 = weights @ (x ** 2)
+        
+        # Normalgleichungen (X^T W X) beta = X^T W y für alle Reihen gestapelt
+        lhs = np.stack([np.stack([s0, s1], axis=-1), np.stack([s1, s2], axis=-1)], axis=1)
+        rhs = np.stack([y.sum(axis=1), y @ x], axis=-1)
+        
+        sxx = s2 - np.divide(s1 ** 2, s0, out=np.zeros_like(s1), where=s0 > 0)
+        solvable = (s0 >= 2) & (sxx > 1e-12)
+        
+        # Nicht lösbare Reihen erhalten eine Einheitsmatrix und werden danach ersetzt
+        lhs[~solvable] = np.eye(2)
+        coefficients = np.linalg.solve(lhs, rhs[..., None])[..., 0]
+        
+        mean = np.divide(rhs[:, 0], s0, out=np.full_like(s0, np.nan), where=s0 > 0)
+        intercept = np.where(solvable, coefficients[:, 0], mean)
+        slope = np.where(solvable, coefficients[:, 1], 0.0)
+        
+        fitted = intercept[:, None] + slope[:, None] * x[None, :]
+        sse = (weights * (y - fitted) ** 2).sum(axis=1)
+        dof = s0 - 2
+        sigma = np.sqrt(np.divide(sse, dof, out=np.full_like(sse, np.nan), where=dof > 0))
+        
+        return {
+            'intercept': intercept,
+            'slope': slope,
+            'sigma': sigma,
+            'n': s0,
+            'x_mean': np.divide(s1, s0, out=np.zeros_like(s1), where=s0 > 0),
+            'sxx': sxx,
+            'solvable': solvable
+        }
+    
+    def fit_damped(self, values: np.ndarray, initial_level: np.ndarray,
+                   initial_trend: np.ndarray) -> dict:
+        """
+        Gedämpftes Holt-Trendmodell, vektorisiert über alle Reihen
+        
+        Jede Reihe startet bei ihrer ersten Beobachtung: Niveau und Trend bleiben
+        bis dahin unverändert, damit später beginnende Reihen nicht vorab gedämpft werden.
+        
+        Args:
+            values: Matrix (n_reihen, n_zeiträume) mit NaN für fehlende Werte
+            initial_level: Startniveau je Reihe
+            initial_trend: Starttrend je Reihe (pro Zeitraum)
+            
+        Returns:
+            Dictionary mit Ein-Schritt-Prognose und Streuung der Ein-Schritt-Fehler je Reihe
+        """
+        level = initial_level.copy()
+        trend = initial_trend.copy()
+        errors = np.full(values.shape, np.nan)
+        first_observed = np.argmax(~np.isnan(values), axis=1)
+        
+        for t in range(values.shape[1]):
+            observed = ~np.isnan(values[:, t])
+            started = t >= first_observed
+            forecast = level + self.damping * trend
+            error = np.where(observed, values[:, t] - forecast, 0.0)
+            
+            errors[:, t] = np.where(observed, error, np.nan)
+            level = np.where(started, forecast + self.alpha * error, level)
+            trend = np.where(started, self.damping * trend + self.alpha * self.beta * error, trend)
+        
+        # Der erste Fehler ist durch die Initialisierung verzerrt
+        errors[np.arange(len(values)), first_observed] = np.nan
+        n_errors = (~np.isnan(errors)).sum(axis=1)
+        
+        with np.errstate(invalid='ignore'):
+            sigma = np.where(n_errors >= 2, np.sqrt(np.nanmean(errors ** 2, axis=1)), np.nan)
+        
+        return {
+            'forecast': level + self.damping * trend,
+            'sigma': sigma
+        }
+    
+    def forecast(self, data: pd.DataFrame, group_by: Union[str, List[str]]) -> pd.DataFrame:
+        """
+        Erstellt Prognosen für den nächsten Evaluationszeitraum für alle Reihen
+        
+        Args:
+            data: IQES-Daten (Antwortskala) mit 'Datum' und 'Bewertung'
+            group_by: Spalte(n), die eine Reihe definieren (z.B. 'Thema' oder ['Fragenummer', 'Bildungsgang'])
+            
+        Returns:
+            DataFrame mit linearer und gedämpfter Prognose inkl. Prognoseintervallen je Reihe
+        """
+        series_keys, periods, values = build_series_panel(data, group_by)
+        
+        if values.size == 0 or len(periods) < 2:
+            return pd.DataFrame()
+        
+        x = period_positions(periods)
+        step = float(np.median(np.diff(x)))
+        x_next = x[-1] + step
+        next_date = pd.Timestamp(periods[-1]) + pd.Timedelta(days=round(step * 365.25))
+        
+        n_observed = (~np.isnan(values)).sum(axis=1)
+        keep = n_observed >= 2
+        series_keys = series_keys[keep].reset_index(drop=True)
+        values = values[keep]
+        n_observed = n_observed[keep]
+        
+        if len(values) == 0:
+            return pd.DataFrame()
+        
+        # Lineares Modell mit Prognoseintervall (t-Verteilung)
+        linear = self.fit_linear(values, x)
+        linear_forecast = linear['intercept'] + linear['slope'] * x_next
+        dof = linear['n'] - 2
+        t_quantile = np.full_like(dof, np.nan)
+        t_quantile[dof > 0] = stats.t.ppf(0.5 + self.confidence / 2, dof[dof > 0])
+        leverage = 1 + 1 / linear['n'] + np.divide(
+            (x_next - linear['x_mean']) ** 2, linear['sxx'],
+            out=np.full_like(linear['sxx'], np.nan), where=linear['sxx'] > 0
+        )
+        linear_margin = t_quantile * linear['sigma'] * np.sqrt(leverage)
+        
+        # Gedämpftes Trendmodell, initialisiert aus der linearen Anpassung
+        first_observed = np.argmax(~np.isnan(values), axis=1)
+        initial_level = linear['intercept'] + linear['slope'] * x[first_observed] - self.damping * linear['slope'] * step
+        damped = self.fit_damped(values, initial_level, linear['slope'] * step)
+        z_quantile = stats.norm.ppf(0.5 + self.confidence / 2)
+        damped_margin = z_quantile * damped['sigma']
+        
+        last_observed = values.shape[1] - 1 - np.argmax(~np.isnan(values[:, ::-1]), axis=1)
+        last_value = values[np.arange(len(values)), last_observed]
+        
+        lower_bound, upper_bound = self.scale_min, self.scale_max
+        
+        result = series_keys.copy()
+        result['Letzte_Bewertung'] = np.round(last_value, 2)
+        result['Anzahl_Zeitraeume'] = n_observed
+        result['Steigung_pro_Jahr'] = np.round(linear['slope'], 3)
+        result['Prognose_Datum'] = next_date
+        result['Prognose_Linear'] = np.round(np.clip(linear_forecast, lower_bound, upper_bound), 2)
+        result['PI_Linear_Unten'] = np.round(np.clip(linear_forecast - linear_margin, lower_bound, upper_bound), 2)
+        result['PI_Linear_Oben'] = np.round(np.clip(linear_forecast + linear_margin, lower_bound, upper_bound), 2)
+        result['Prognose_Gedaempft'] = np.round(np.clip(damped['forecast'], lower_bound, upper_bound), 2)
+        result['PI_Gedaempft_Unten'] = np.round(np.clip(damped['forecast'] - damped_margin, lower_bound, upper_bound), 2)
+        result['PI_Gedaempft_Oben'] = np.round(np.clip(damped['forecast'] + damped_margin, lower_bound, upper_bound), 2)
+        result['Prognose_Veraenderung'] = np.round(result['Prognose_Gedaempft'] - result['Letzte_Bewertung'], 2)
+        
+        return result
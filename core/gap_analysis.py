@@ -0,0 +1,151 @@
+"""
+IQES Gap Analysis - Paarweise Bildungsgang-Vergleiche
+Berechnet den vollständigen Differenz-Tensor Bildungsgang × Bildungsgang × Thema/Frage per Broadcasting
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Tuple
+
+
+class IQESGapAnalyzer:
+    """
+    Paarweise Performance-Gaps zwischen allen Bildungsgängen
+    Grundlage sind die aggregierten Mittelwerte je Bildungsgang und Thema/Frage
+    """
+    
+    def __init__(self, top_k: int = 3):
+        self.top_k = top_k
+    
+    def build_mean_matrix(self, data: pd.DataFrame, dimension: str,
+                          value_column: str = 'Bewertung') -> Tuple[pd.Index, pd.Index, np.ndarray]:
+        """
+        Aggregiert die Mittelwerte je Bildungsgang und Dimension
+        
+        Args:
+            data: IQES-Daten (Antwortskala)
+            dimension: Vergleichsdimension, z.B. 'Thema' oder 'Fragenummer'
+            value_column: Bewertungs-Spalte
+            
+        Returns:
+            Tuple (Bildungsgänge, Dimensionswerte, Matrix (n_bildungsgänge, n_werte) mit NaN)
+        """
+        if data.empty or any(col not in data.columns for col in ['Bildungsgang', dimension, value_column]):
+            return pd.Index([]), pd.Index([]), np.empty((0, 0))
+        
+        means = data.groupby(['Bildungsgang', dimension])[value_column].mean().unstack(dimension)
+        return means.index, means.columns, means.to_numpy(dtype=float)
+    
+    def gap_tensor(self, means: np.ndarray) -> np.ndarray:
+        """
+        Differenz-Tensor aller Bildungsgang-Paare
+        
+        Args:
+            means: Matrix (n_bildungsgänge, n_werte)
+            
+        Returns:
+            Tensor (n_bildungsgänge, n_bildungsgänge, n_werte) mit gap[a, b, i] = means[a, i] - means[b, i]
+        """
+        return means[:, None, :] - means[None, :, :]
+    
+    def pair_matrix(self, data: pd.DataFrame, dimension: str) -> pd.DataFrame:
+        """
+        Mittlerer Gap je Bildungsgang-Paar über alle gemeinsamen Themen/Fragen
+        
+        Args:
+            data: IQES-Daten (Antwortskala)
+            dimension: Vergleichsdimension
+            
+        Returns:
+            Quadratische Matrix (Zeile minus Spalte) als DataFrame
+        """
+        programs, _, means = self.build_mean_matrix(data, dimension)
+        
+        if len(programs) < 2:
+            return pd.DataFrame()
+        
+        gaps = self.gap_tensor(means)
+        shared = (~np.isnan(gaps)).sum(axis=2)
+        mean_gap = np.divide(np.nansum(gaps, axis=2), shared,
+                             out=np.full(shared.shape, np.nan), where=shared > 0)
+        
+        return pd.DataFrame(np.round(mean_gap, 3), index=programs, columns=programs)
+    
+    def pair_gaps(self, data: pd.DataFrame, dimension: str) -> pd.DataFrame:
+        """
+        Gaps aller Bildungsgang-Paare (a < b) je Thema/Frage in Langform
+        
+        Args:
+            data: IQES-Daten (Antwortskala)
+            dimension: Vergleichsdimension
+            
+        Returns:
+            DataFrame mit Bildungsgang_A, Bildungsgang_B, Dimension, Bewertung_A/B, Gap, Abs_Gap
+        """
+        programs, items, means = self.build_mean_matrix(data, dimension)
+        
+        if len(programs) < 2:
+            return pd.DataFrame()
+        
+        first, second = np.triu_indices(len(programs), k=1)
+        gaps = self.gap_tensor(means)[first, second]  # (n_paare, n_werte)
+        
+        pair_idx, item_idx = np.nonzero(~np.isnan(gaps))
+        
+        return pd.DataFrame({
+            'Bildungsgang_A': programs[first[pair_idx]],
+            'Bildungsgang_B': programs[second[pair_idx]],
+            dimension: items[item_idx],
+            'Bewertung_A': np.round(means[first[pair_idx], item_idx], 2),
+            'Bewertung_B': np.round(means[second[pair_idx], item_idx], 2),
+            'Gap': np.round(gaps[pair_idx, item_idx], 3),
+            'Abs_Gap': np.round(np.abs(gaps[pair_idx, item_idx]), 3)
+        })
+    
+    def top_gaps(self, data: pd.DataFrame, dimension: str, k: int = None) -> pd.DataFrame:
+        """
+        Größte Gaps je Bildungsgang-Paar per Teilsortierung (argpartition)
+        
+        Args:
+            data: IQES-Daten (Antwortskala)
+            dimension: Vergleichsdimension
+            k: Anzahl Gaps je Paar (Standard: self.top_k)
+            
+        Returns:
+            DataFrame mit den k größten absoluten Gaps je Paar, inkl. Rang
+        """
+        k = k or self.top_k
+        programs, items, means = self.build_mean_matrix(data, dimension)
+        
+        if len(programs) < 2 or len(items) == 0:
+            return pd.DataFrame()
+        
+        first, second = np.triu_indices(len(programs), k=1)
+        gaps = self.gap_tensor(means)[first, second]
+        
+        # Fehlende Vergleiche ans Ende sortieren
+        magnitude = np.where(np.isnan(gaps), -np.inf, np.abs(gaps))
+        k = min(k, magnitude.shape[1])
+        
+        candidates = np.argpartition(-magnitude, k - 1, axis=1)[:, :k]
+        candidate_values = np.take_along_axis(magnitude, candidates, axis=1)
+        order = np.argsort(-candidate_values, axis=1, kind='stable')
+        top_items = np.take_along_axis(candidates, order, axis=1)  # (n_paare, k)
+        
+        pair_idx = np.repeat(np.arange(len(first)), k)
+        item_idx = top_items.ravel()
+        valid = np.isfinite(magnitude[pair_idx, item_idx])
+        pair_idx, item_idx = pair_idx[valid], item_idx[valid]
+        
+        result = pd.DataFrame({
+            'Bildungsgang_A': programs[first[pair_idx]],
+            'Bildungsgang_B': programs[second[pair_idx]],
+            dimension: items[item_idx],
+            'Bewertung_A': np.round(means[first[pair_idx], item_idx], 2),
+            'Bewertung_B': np.round(means[second[pair_idx], item_idx], 2),
+            'Gap': np.round(gaps[pair_idx, item_idx], 3),
+            'Abs_Gap': np.round(np.abs(gaps[pair_idx, item_idx]), 3)
+        })
+        result['Rang'] = result.groupby(['Bildungsgang_A', 'Bildungsgang_B']).cumcount() + 1
+        
+        return result
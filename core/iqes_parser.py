@@ -89,6 +89,44 @@ class IQESParser:
             return sheet_name.split("Frage")[1].split("(")[0].strip()
         return ""
     
+    def extract_response_distribution(self, row: pd.Series) -> Dict[str, int]:
+        """
+        Extrahiert die Antworthäufigkeiten einer Unterfrage
+        
+        Args:
+            row: Datenzeile eines Antwortskala-Sheets
+            
+        Returns:
+            Dictionary {'antwort_1': n, ..., 'antwort_4': n} (Spalten B, D, F, H)
+        """
+        distribution = {}
+        
+        for scale_point, col_index in zip([1, 2, 3, 4], [1, 3, 5, 7]):
+            if len(row) > col_index and pd.notna(row.iloc[col_index]):
+                try:
+                    distribution[f'antwort_{scale_point}'] = int(row.iloc[col_index])
+                except (ValueError, TypeError):
+                    distribution[f'antwort_{scale_point}'] = 0
+        
+        return distribution
+    
+    def extract_response_count(self, row: pd.Series) -> int:
+        """
+        Extrahiert die Anzahl Antworten (N) einer Unterfrage aus Spalte K (Index 10)
+        
+        Args:
+            row: Datenzeile eines Antwortskala-Sheets
+            
+        Returns:
+            Anzahl Antworten oder 0
+        """
+        if len(row) > 10 and pd.notna(row.iloc[10]):
+            try:
+                return int(row.iloc[10])
+            except (ValueError, TypeError):
+                pass
+        return 0
+    
     def process_rating_scale_sheet(self, df: pd.DataFrame, sheet_name: str, 
                                  eval_date: pd.Timestamp, bildungsgang: str, 
                                  eval_type: str, filename: str) -> List[Dict]:
@@ -155,6 +193,8 @@ class IQESParser:
                             'Fragenummer': unterfrage_num,  # z.B. "7.1"
                             'Frage': question_text,
                             'Bewertung': rating,
+                            'Anzahl_Antworten': self.extract_response_count(row),
+                            'Antwortverteilung': self.extract_response_distribution(row),
                             'Fragentyp': 'Antwortskala',
                             'Quelldatei': filename,
                             'Sheet': sheet_name
@@ -0,0 +1,208 @@
+"""
+IQES Keyword Index - Schlagwort-Index über alle offenen Antworten
+Dünn besetzte Term × Gruppe-Zählmatrix (Frage × Zeitraum × Bildungsgang) mit TF-IDF-Gewichtung
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from typing import Dict, Iterable, List, Optional, Set
+
+from core.text_corpus import CLAUSE_BOUNDARY, IQESTextCorpus, document_term_matrix, tokenize
+
+
+def keyword_terms(tokens: List[str], stop_words: Set[str], min_length: int = 4,
+                  bigrams: bool = True) -> List[str]:
+    """
+    Schlagwort-Terme einer Token-Liste
+    
+    Args:
+        tokens: Tokens aus tokenize
+        stop_words: Auszulassende Wörter
+        min_length: Mindestlänge eines Worts
+        bigrams: Wortpaare direkt aufeinanderfolgender Terme ergänzen
+        
+    Returns:
+        Wörter und (optional) Wortpaare
+    """
+    result = []
+    previous: Optional[str] = None
+    for token in tokens:
+        if token == CLAUSE_BOUNDARY or len(token) < min_length or token in stop_words:
+            # Satzzeichen, kurze Wörter und Stoppwörter trennen Wortpaare
+            previous = None
+            continue
+        result.append(token)
+        if bigrams and previous is not None:
+            result.append(f'{previous} {token}')
+        previous = token
+    return result
+
+
+def count_keywords(texts: Iterable[str], stop_words: Set[str], k: int = 15, min_length: int = 4,
+                   bigrams: bool = False, weights: Optional[Iterable[float]] = None) -> Dict[str, int]:
+    """
+    Top-k Begriffe beliebiger Texte ohne Index (z.B. für einzelne Antwortlisten)
+    
+    Args:
+        texts: Texte
+        stop_words: Auszulassende Wörter
+        k: Anzahl Begriffe
+        min_length: Mindestlänge eines Worts
+        bigrams: Wortpaare berücksichtigen
+        weights: Optionales Gewicht je Text (z.B. Anzahl zusammengefasster Duplikate)
+        
+    Returns:
+        Dictionary Begriff -> Häufigkeit, absteigend sortiert
+    """
+    texts = list(texts)
+    matrix, vocabulary = document_term_matrix(
+        [tokenize(text) for text in texts],
+        lambda tokens: keyword_terms(tokens, stop_words, min_length, bigrams)
+    )
+    if len(vocabulary) == 0:
+        return {}
+    if weights is None:
+        totals = np.asarray(matrix.sum(axis=0)).ravel()
+    else:
+        totals = matrix.T @ np.asarray(list(weights), dtype=float)
+    order = sorted(np.flatnonzero(totals), key=lambda index: (-totals[index], vocabulary[index]))[:k]
+    return {vocabulary[index]: int(round(totals[index])) for index in order}
+
+
+class IQESKeywordIndex:
+    """
+    Schlagwörter je Frage, Zeitraum und Bildungsgang
+    
+    Der Index wird einmal je Datenstand aus den Tokens des Text-Korpus gebaut:
+    Terme sind Wörter ab min_length Zeichen ohne Stoppwörter sowie optional
+    Wortpaare direkt aufeinanderfolgender Terme innerhalb eines Satzglieds.
+    Die Antworten werden zu Gruppen (Frage × Datum × Bildungsgang, falls
+    vorhanden auch × Evaluationstyp) zusammengefasst, also in der Feinheit der
+    Dashboard-Filter. Die Top-Begriffe eines Filters sind damit eine Summe über
+    die ausgewählten Spalten der Matrix, ohne die Texte erneut zu lesen.
+    
+    Jede Antwort zählt mit ihrem Gewicht aus dem Korpus ('Anzahl'), sodass
+    zusammengefasste Duplikate die Häufigkeiten nicht verändern.
+    
+    Die IDF wird über die Gruppen berechnet: Begriffe, die in fast allen Fragen
+    und Zeiträumen vorkommen, werden bei TF-IDF-Gewichtung abgewertet.
+    """
+    
+    def __init__(self, corpus: IQESTextCorpus, stop_words: Iterable[str] = (),
+                 min_length: int = 4, bigrams: bool = True):
+        self.stop_words = set(stop_words)
+        self.min_length = min_length
+        self.bigrams = bigrams
+        
+        matrix, self.vocabulary = corpus.document_term_matrix(
+            'keywords_bigrams' if bigrams else 'keywords', self.terms
+        )
+        self.is_bigram = np.array([' ' in term for term in self.vocabulary], dtype=bool)
+        
+        answers = corpus.answers
+        question_key = 'Frage_ID' if 'Frage_ID' in answers.columns else 'Fragenummer'
+        self.group_columns = [col for col in (question_key, 'Datum', 'Bildungsgang', 'Evaluationstyp')
+                              if col in answers.columns]
+        
+        if answers.empty:
+            codes = np.zeros(0, dtype=np.int64)
+            self.groups = pd.DataFrame(columns=self.group_columns)
+        elif self.group_columns:
+            codes = answers.groupby(self.group_columns, sort=False, dropna=False).ngroup().to_numpy()
+            self.groups = answers[self.group_columns].groupby(codes).first().reset_index(drop=True)
+        else:
+            codes = np.zeros(len(answers), dtype=np.int64)
+            self.groups = pd.DataFrame(index=[0])
+        
+        # Quellzeile -> Gruppe, um gefilterte Daten über ihren Index abzubilden
+        self._row_groups = pd.Series(codes, index=answers['Zeile'].to_numpy() if len(answers) else [])
+        self._row_groups = self._row_groups[~self._row_groups.index.duplicated()]
+        
+        n_groups = len(self.groups)
+        membership = sparse.csr_matrix(
+            (corpus.weights, (codes, np.arange(len(codes)))), shape=(n_groups, len(codes))
+        )
+        # Term × Gruppe; spaltenweise gespeichert, damit Gruppen-Auswahlen günstig sind
+        self.counts = (membership @ matrix).T.tocsc()
+        
+        group_frequency = np.asarray((self.counts > 0).sum(axis=1)).ravel()
+        self.idf = np.log((1 + n_groups) / (1 + group_frequency)) + 1
+    
+    def __len__(self) -> int:
+        return len(self.vocabulary)
+    
+    def terms(self, tokens: List[str]) -> List[str]:
+        """Schlagwort-Terme einer Token-Liste (siehe keyword_terms)"""
+        return keyword_terms(tokens, self.stop_words, self.min_length, self.bigrams)
+    
+    def group_mask(self, data: Optional[pd.DataFrame] = None) -> np.ndarray:
+        """
+        Gruppen, deren Fragezeilen in den (gefilterten) Daten enthalten sind
+        
+        Args:
+            data: Gefilterte IQES-Daten (Index der Quelldaten); None = alle Gruppen
+            
+        Returns:
+            Boolesche Maske über groups
+        """
+        mask = np.zeros(len(self.groups), dtype=bool)
+        if data is None:
+            mask[:] = True
+        else:
+            mask[self._row_groups[self._row_groups.index.isin(data.index)].unique()] = True
+        return mask
+    
+    def select(self, **criteria) -> np.ndarray:
+        """
+        Gruppen nach Spaltenwerten, z.B. select(Bildungsgang='BM', Datum=[d1, d2])
+        
+        Args:
+            **criteria: Gruppenspalte -> Wert oder Liste von Werten
+            
+        Returns:
+            Boolesche Maske über groups
+        """
+        mask = np.ones(len(self.groups), dtype=bool)
+        for column, values in criteria.items():
+            if column not in self.groups.columns:
+                raise KeyError(f"Unbekannte Gruppenspalte: {column}")
+            if isinstance(values, (str, bytes)) or not isinstance(values, Iterable):
+                values = [values]
+            mask &= self.groups[column].isin(list(values)).to_numpy()
+        return mask
+    
+    def top_keywords(self, mask: Optional[np.ndarray] = None, k: int = 15,
+                     weighting: str = 'count', include_bigrams: bool = True) -> Dict[str, float]:
+        """
+        Top-k Begriffe einer Gruppen-Auswahl
+        
+        Args:
+            mask: Boolesche Maske über groups (None = alle Gruppen)
+            k: Anzahl Begriffe
+            weighting: 'count' (Häufigkeit) oder 'tfidf'
+            include_bigrams: Wortpaare berücksichtigen
+            
+        Returns:
+            Dictionary Begriff -> Häufigkeit bzw. TF-IDF-Gewicht, absteigend sortiert
+        """
+        if weighting not in ('count', 'tfidf'):
+            raise ValueError(f"Unbekannte Gewichtung: {weighting}")
+        if len(self.vocabulary) == 0:
+            return {}
+        
+        selected = self.counts if mask is None else self.counts[:, np.flatnonzero(mask)]
+        totals = np.asarray(selected.sum(axis=1)).ravel()
+        scores = totals * self.idf if weighting == 'tfidf' else totals.astype(float)
+        if not include_bigrams:
+            scores[self.is_bigram] = 0
+        
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        # Gleichstand: alphabetisch, damit die Reihenfolge stabil bleibt
+        order = sorted(candidates, key=lambda index: (-scores[index], self.vocabulary[index]))
+        
+        if weighting == 'count':
+            return {self.vocabulary[index]: int(round(totals[index])) for index in order}
+        return {self.vocabulary[index]: round(float(scores[index]), 3) for index in order}
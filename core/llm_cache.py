@@ -0,0 +1,266 @@
+"""
+IQES LLM Cache - Persistenter Antwort-Cache für KI-Aufrufe
+Inhaltsadressierte SQLite-Ablage je Anbieter, Modell, Prompt-Version und Eingabetexten
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from config.themes import LLM_CACHE_CONFIG
+
+
+class IQESLLMCache:
+    """
+    Antwort-Cache für Gemini-/OpenAI-Aufrufe
+    
+    Der Schlüssel ist ein SHA-256-Hash über Anbieter, Modell, Version der
+    Prompt-Vorlage, Aufrufparameter und die Eingabetexte. Gleiche Daten mit
+    gleicher Vorlage liefern damit ohne erneuten API-Aufruf dieselbe Antwort;
+    jede Änderung an Texten oder Vorlagen-Version ergibt einen neuen Schlüssel.
+    
+    Einträge verfallen nach ttl_hours. Über max_entries bzw. max_mb hinaus werden
+    die am längsten nicht gelesenen Einträge verworfen. Ist der Cache-Pfad nicht
+    beschreibbar, wird ein Cache im Arbeitsspeicher verwendet.
+    """
+    
+    def __init__(self, path: str = LLM_CACHE_CONFIG['path'], ttl_hours: float = LLM_CACHE_CONFIG['ttl_hours'],
+                 max_entries: int = LLM_CACHE_CONFIG['max_entries'], max_mb: float = LLM_CACHE_CONFIG['max_mb'],
+                 clock: Callable[[], float] = time.time):
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.clock = clock
+        self._lock = threading.Lock()
+        
+        try:
+            if path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._create_table()
+            self.path = path
+        except (OSError, sqlite3.Error):
+            self._connection = sqlite3.connect(':memory:', check_same_thread=False)
+            self._create_table()
+            self.path = ':memory:'
+    
+    def _create_table(self):
+        """Legt die Cache-Tabelle an, falls sie noch nicht existiert"""
+        with self._connection:
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    template_version TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)"
+            )
+    
+    @staticmethod
+    def texts_hash(texts: Iterable[str]) -> str:
+        """
+        Hash über die Eingabetexte (Reihenfolge relevant)
+        
+        Args:
+            texts: Texte, die in den Prompt eingehen
+            
+        Returns:
+            SHA-256-Hash als Hex-String
+        """
+        digest = hashlib.sha256()
+        for text in texts:
+            encoded = str(text).encode('utf-8')
+            # Längenpräfix verhindert Kollisionen durch verschobene Textgrenzen
+            digest.update(len(encoded).to_bytes(8, 'big'))
+            digest.update(encoded)
+        return digest.hexdigest()
+    
+    def make_key(self, provider: str, model: str, template_version: str,
+                 texts: Iterable[str], params: Optional[Dict] = None) -> str:
+        """
+        Inhaltsadressierter Cache-Schlüssel
+        
+        Args:
+            provider: Anbieter (z.B. 'gemini', 'openai')
+            model: Modellname
+            template_version: Name und Version der Prompt-Vorlage
+            texts: Eingabetexte
+            params: Weitere Aufrufparameter (z.B. max_tokens, temperature)
+            
+        Returns:
+            SHA-256-Hash als Hex-String
+        """
+        payload = json.dumps(
+            [provider, model, template_version, params or {}, self.texts_hash(texts)],
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        Gespeicherte Antwort, sofern vorhanden und nicht abgelaufen
+        
+        Args:
+            key: Cache-Schlüssel aus make_key
+            
+        Returns:
+            Antworttext oder None
+        """
+        now = self.clock()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            return row[0]
+    
+    def put(self, key: str, response: str, provider: str, model: str, template_version: str):
+        """
+        Speichert eine Antwort und verwirft bei Bedarf alte Einträge
+        
+        Args:
+            key: Cache-Schlüssel aus make_key
+            response: Antworttext
+            provider: Anbieter
+            model: Modellname
+            template_version: Name und Version der Prompt-Vorlage
+        """
+        now = self.clock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, template_version, response,
+                 len(response.encode('utf-8')), now, now)
+            )
+            self._evict(now)
+    
+    def _evict(self, now: float):
+        """Entfernt abgelaufene Einträge und hält Anzahl- und Größengrenze ein (Lock gehalten)"""
+        self._connection.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        
+        count, total = self._connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        
+        # Am längsten ungenutzte Einträge verwerfen, bis beide Grenzen eingehalten sind
+        stale = []
+        for key, size in self._connection.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            stale.append((key,))
+            count -= 1
+            total -= size
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", stale)
+    
+    def get_or_generate(self, provider: str, model: str, template_version: str, texts: Iterable[str],
+                        generate: Callable[[], Optional[str]],
+                        params: Optional[Dict] = None) -> Tuple[Optional[str], bool]:
+        """
+        Antwort aus dem Cache oder per API-Aufruf
+        
+        Leere Antworten werden nicht gespeichert. Ausnahmen aus generate werden
+        unverändert weitergereicht, damit die bestehende Fehlerbehandlung greift.
+        
+        Args:
+            provider: Anbieter
+            model: Modellname
+            template_version: Name und Version der Prompt-Vorlage
+            texts: Eingabetexte
+            generate: Funktion ohne Argumente, die den API-Aufruf ausführt
+            params: Weitere Aufrufparameter
+            
+        Returns:
+            Tuple (Antworttext oder None, True wenn aus dem Cache)
+        """
+        texts = list(texts)
+        key = self.make_key(provider, model, template_version, texts, params)
+        
+        cached = self.get(key)
+        if cached is not None:
+            return cached, True
+        
+        response = generate()
+        if response:
+            self.put(key, response, provider, model, template_version)
+        return response, False
+    
+    def clear(self):
+        """Leert den Cache vollständig"""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses")
+    
+    def stats(self) -> Dict:
+        """
+        Kennzahlen des Caches
+        
+        Returns:
+            Dictionary mit Pfad, Anzahl Einträgen und Größe in Bytes
+        """
+        with self._lock:
+            count, total = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {'path': self.path, 'entries': count, 'bytes': total}
+
+
+class IQESFakeLLMProvider:
+    """
+    Lokaler Ersatz für den Gemini-Client ohne Netzwerkzugriff
+    
+    Bildet die genutzte Schnittstelle (models.generate_content(...).text) nach
+    und liefert deterministische Antworten im erwarteten Format. Gedacht für
+    Entwicklung und Tests des Caches (IQES_LLM_PROVIDER=fake); calls zählt die
+    tatsächlich ausgeführten Aufrufe.
+    """
+    
+    class _Response:
+        def __init__(self, text: str):
+            self.text = text
+    
+    def __init__(self, delay_seconds: float = 0.0):
+        self.delay_seconds = delay_seconds
+        self.calls = 0
+        self.models = self
+    
+    def generate_content(self, model: str, contents: str) -> '_Response':
+        """
+        Deterministische Antwort auf einen Prompt
+        
+        Args:
+            model: Modellname (nur zur Anzeige)
+            contents: Prompt
+            
+        Returns:
+            Antwortobjekt mit Attribut text
+        """
+        self.calls += 1
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        
+        digest = hashlib.sha256(str(contents).encode('utf-8')).hexdigest()[:8]
+        return self._Response(
+            f"[{model} · lokal {digest}]\n"
+            "1. PRIORITÄT: MITTEL\n"
+            "   TITEL: Rückmeldungen besprechen\n"
+            "   MASSNAHME: Ergebnisse in der Klassenkonferenz auswerten\n"
+            "   ZEITRAHMEN: Nächstes Quartal\n"
+            "   BEGRÜNDUNG: Testantwort ohne KI-Anbieter"
+        )
@@ -0,0 +1,197 @@
+"""
+IQES LLM Dispatcher - Parallele KI-Anfragen mit Ratenbegrenzung
+asyncio-Fan-out mit Parallelitätsgrenze, Token-Bucket, Wiederholungen mit Backoff und Zeitlimit je Anfrage
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, Hashable, Optional, Tuple
+
+from config.themes import LLM_DISPATCH_CONFIG
+
+
+class IQESTokenBucket:
+    """
+    Token-Bucket für die Anfragerate
+    
+    Der Bucket füllt sich mit rate_per_second Token bis zur Kapazität auf; jede
+    Anfrage verbraucht ein Token. Der Füllstand bleibt über mehrere Dispatch-Läufe
+    erhalten, sodass auch schnelle Reruns das Limit einhalten.
+    """
+    
+    def __init__(self, rate_per_second: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self._lock = threading.Lock()
+    
+    def reserve(self) -> float:
+        """
+        Entnimmt ein Token, falls verfügbar
+        
+        Returns:
+            0.0 bei Erfolg, sonst Wartezeit in Sekunden bis zum nächsten Token
+        """
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+    
+    async def acquire(self):
+        """Wartet, bis ein Token verfügbar ist"""
+        while True:
+            wait = self.reserve()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class IQESLLMDispatcher:
+    """
+    Führt viele KI-Anfragen gleichzeitig aus
+    
+    Jede Anfrage ist eine Funktion ohne Argumente (z.B. ein Aufruf des
+    Gemini-/OpenAI-Clients); synchrone Funktionen laufen je Versuch in einem
+    eigenen Thread, Coroutine-Funktionen direkt in der Event-Loop. Höchstens
+    max_concurrency Anfragen laufen gleichzeitig, gestartet wird nur mit Token aus
+    dem Bucket. Das Zeitlimit zählt ab dem Start des Versuchs; eine abgelaufene
+    Anfrage gibt ihren Platz sofort frei, auch wenn ihr Thread noch auf die
+    Antwort wartet. Fehler und Zeitüberschreitungen werden mit exponentiellem
+    Backoff wiederholt, außer bei Fehlertypen aus fail_fast. Ergebnisse werden in
+    Abschlussreihenfolge geliefert.
+    
+    Für Tests gegen einen lokalen Stub-Server genügt es, den Client auf dessen
+    Adresse zu richten (z.B. OPENAI_BASE_URL=http://127.0.0.1:8080/v1).
+    """
+    
+    def __init__(self, max_concurrency: int = LLM_DISPATCH_CONFIG['max_concurrency'],
+                 requests_per_minute: float = LLM_DISPATCH_CONFIG['requests_per_minute'],
+                 burst: float = LLM_DISPATCH_CONFIG['burst'],
+                 max_retries: int = LLM_DISPATCH_CONFIG['max_retries'],
+                 backoff_seconds: float = LLM_DISPATCH_CONFIG['backoff_seconds'],
+                 timeout_seconds: float = LLM_DISPATCH_CONFIG['timeout_seconds'],
+                 retry_on: Tuple[type, ...] = (Exception,), fail_fast: Tuple[type, ...] = ()):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout_seconds = timeout_seconds
+        self.retry_on = retry_on
+        self.fail_fast = fail_fast
+        self.bucket = IQESTokenBucket(requests_per_minute / 60.0, burst)
+    
+    async def _invoke(self, job: Callable):
+        """
+        Führt eine Anfrage aus (Coroutine direkt, sonst in einem eigenen Thread)
+        
+        Ein eigener Thread je Versuch statt eines festen Pools: hängende, bereits
+        abgelaufene Aufrufe belegen sonst Worker, und spätere Anfragen warten in
+        der Pool-Warteschlange, während ihr Zeitlimit schon läuft.
+        """
+        if asyncio.iscoroutinefunction(job):
+            return await job()
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        
+        def deliver(method, value):
+            if not future.done():
+                method(value)
+        
+        def run():
+            try:
+                outcome = (future.set_result, job())
+            except BaseException as error:
+                outcome = (future.set_exception, error)
+            try:
+                loop.call_soon_threadsafe(deliver, *outcome)
+            except RuntimeError:
+                # Event-Loop bereits beendet (Anfrage wurde aufgegeben)
+                pass
+        
+        threading.Thread(target=run, name='iqes-llm', daemon=True).start()
+        return await future
+    
+    async def _run_job(self, key: Hashable, job: Callable,
+                       semaphore: asyncio.Semaphore) -> Tuple[Hashable, object, Optional[Exception]]:
+        """
+        Eine Anfrage inklusive Wiederholungen
+        
+        Returns:
+            Tuple (Schlüssel, Ergebnis oder None, letzter Fehler oder None)
+        """
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with semaphore:
+                    await self.bucket.acquire()
+                    result = await asyncio.wait_for(self._invoke(job), self.timeout_seconds)
+                return key, result, None
+            except self.retry_on as error:
+                last_error = error
+                # z.B. gesperrter Anbieter: Wiederholen wäre sinnlos
+                if isinstance(error, self.fail_fast):
+                    break
+            
+            if attempt < self.max_retries:
+                # Backoff außerhalb des Semaphors, damit andere Anfragen weiterlaufen
+                delay = self.backoff_seconds * (2 ** attempt)
+                await asyncio.sleep(delay * random.uniform(1.0, 1.25))
+        
+        return key, None, last_error
+    
+    async def stream(self, jobs: Dict[Hashable, Callable]) -> AsyncIterator[Tuple[Hashable, object, Optional[Exception]]]:
+        """
+        Startet alle Anfragen und liefert Ergebnisse, sobald sie vorliegen
+        
+        Args:
+            jobs: Dictionary {Schlüssel: Funktion ohne Argumente}
+            
+        Yields:
+            Tuple (Schlüssel, Ergebnis oder None, Fehler oder None)
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = [asyncio.ensure_future(self._run_job(key, job, semaphore)) for key, job in jobs.items()]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # Abgelaufene Anfragen, die im Thread noch laufen, werden nicht abgewartet
+            for task in tasks:
+                task.cancel()
+    
+    def dispatch(self, jobs: Dict[Hashable, Callable],
+                 on_result: Optional[Callable[[Hashable, object, Optional[Exception]], None]] = None
+                 ) -> Dict[Hashable, Tuple[object, Optional[Exception]]]:
+        """
+        Synchroner Einstieg für Streamlit
+        
+        on_result wird im aufrufenden Thread aufgerufen, sobald eine Anfrage
+        abgeschlossen ist, und kann daher direkt Streamlit-Elemente aktualisieren.
+        
+        Args:
+            jobs: Dictionary {Schlüssel: Funktion ohne Argumente}
+            on_result: Optionaler Callback (Schlüssel, Ergebnis, Fehler)
+            
+        Returns:
+            Dictionary {Schlüssel: (Ergebnis oder None, Fehler oder None)}
+        """
+        if not jobs:
+            return {}
+        
+        async def collect():
+            results = {}
+            async for key, result, error in self.stream(jobs):
+                results[key] = (result, error)
+                if on_result is not None:
+                    on_result(key, result, error)
+            return results
+        
+        return asyncio.run(collect())
@@ -0,0 +1,154 @@
+"""
+IQES MinHash - Ähnlichkeitssignaturen für Texte
+MinHash-Signaturen über Zeichen-Shingles und Kandidatensuche per Locality-Sensitive Hashing
+"""
+
+import re
+import numpy as np
+from typing import Iterable, List, Optional, Tuple
+
+
+# Mersenne-Primzahl für die universellen Hashfunktionen (a * h + b) mod p
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+class IQESMinHasher:
+    """
+    MinHash-Signaturen und LSH-Banding
+    
+    Texte werden normalisiert und in überlappende Zeichen-Shingles zerlegt.
+    Der Anteil übereinstimmender Signaturpositionen schätzt die Jaccard-Ähnlichkeit
+    der Shingle-Mengen. Für die Kandidatensuche wird die Signatur in Bänder geteilt;
+    nur Texte mit mindestens einem identischen Band werden überhaupt verglichen.
+    Alle Hashwerte sind deterministisch (unabhängig von PYTHONHASHSEED).
+    """
+    
+    def __init__(self, num_perm: int = 128, bands: int = 32, shingle_size: int = 4, seed: int = 1):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm muss ein Vielfaches von bands sein")
+        
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _MAX_HASH, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _MAX_HASH, size=num_perm, dtype=np.uint64)
+    
+    def normalize(self, text: str) -> str:
+        """
+        Vereinheitlicht Schreibweise, Satzzeichen und Leerraum
+        
+        Args:
+            text: Rohtext
+            
+        Returns:
+            Normalisierter Text
+        """
+        text = re.sub(r'[^\w\s]', ' ', str(text).lower())
+        return re.sub(r'\s+', ' ', text).strip()
+    
+    def shingle_hashes(self, text: str) -> np.ndarray:
+        """
+        32-Bit-Hashes aller Zeichen-Shingles eines normalisierten Texts
+        
+        Die Shingles werden als Polynom-Hash über die UTF-8-Bytes in einem
+        vektorisierten Schritt berechnet.
+        
+        Args:
+            text: Normalisierter Text
+            
+        Returns:
+            Eindeutige Shingle-Hashes (uint64 im 32-Bit-Bereich)
+        """
+        data = np.frombuffer(text.encode('utf-8'), dtype=np.uint8).astype(np.uint64)
+        if len(data) == 0:
+            return np.empty(0, dtype=np.uint64)
+        if len(data) < self.shingle_size:
+            data = np.pad(data, (0, self.shingle_size - len(data)))
+        
+        windows = np.lib.stride_tricks.sliding_window_view(data, self.shingle_size)
+        powers = np.uint64(257) ** np.arange(self.shingle_size, dtype=np.uint64)
+        return np.unique((windows * powers).sum(axis=1) & _MAX_HASH)
+    
+    def signature(self, text: str) -> np.ndarray:
+        """
+        MinHash-Signatur eines Texts
+        
+        Args:
+            text: Rohtext
+            
+        Returns:
+            Signatur der Länge num_perm (leerer Text: alle Positionen = Maximalwert)
+        """
+        hashes = self.shingle_hashes(self.normalize(text))
+        if len(hashes) == 0:
+            return np.full(self.num_perm, _MERSENNE_PRIME, dtype=np.uint64)
+        
+        permuted = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1)
+    
+    def signatures(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Signatur-Matrix für mehrere Texte
+        
+        Args:
+            texts: Rohtexte
+            
+        Returns:
+            Matrix (n_texte, num_perm)
+        """
+        rows = [self.signature(text) for text in texts]
+        if not rows:
+            return np.empty((0, self.num_perm), dtype=np.uint64)
+        return np.vstack(rows)
+    
+    def estimate_similarity(self, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        """
+        Geschätzte Jaccard-Ähnlichkeit (zeilenweise)
+        
+        Args:
+            first: Signatur(en)
+            second: Signatur(en) gleicher Form
+            
+        Returns:
+            Anteil übereinstimmender Signaturpositionen
+        """
+        return (first == second).mean(axis=-1)
+    
+    def candidate_pairs(self, signatures: np.ndarray,
+                        blocks: Optional[np.ndarray] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Kandidatenpaare aus den LSH-Bändern
+        
+        Je Band werden Texte mit identischem Bandabschnitt in einen Bucket sortiert.
+        Jedes Bucket-Mitglied wird mit dem ersten Mitglied des Buckets gepaart;
+        transitive Verbindungen ergeben sich beim anschließenden Clustern.
+        
+        Args:
+            signatures: Matrix (n_texte, num_perm)
+            blocks: Optional Block-Nummer je Text; Kandidaten nur innerhalb eines Blocks
+            
+        Returns:
+            Liste (Mitglieder, Bucket-Erste) je Band als Index-Arrays
+        """
+        pairs = []
+        for band in range(self.bands):
+            block = signatures[:, band * self.rows:(band + 1) * self.rows]
+            if blocks is not None:
+                # Block-Nummer als Teil des Bucket-Schlüssels
+                block = np.column_stack([np.asarray(blocks).astype(np.uint64), block])
+            _, bucket = np.unique(block, axis=0, return_inverse=True)
+            bucket = bucket.ravel()
+            
+            order = np.argsort(bucket, kind='stable')
+            sorted_bucket = bucket[order]
+            starts = np.r_[True, sorted_bucket[1:] != sorted_bucket[:-1]]
+            leaders = order[np.flatnonzero(starts)][np.cumsum(starts) - 1]
+            
+            members = order != leaders
+            if members.any():
+                pairs.append((order[members], leaders[members]))
+        return pairs
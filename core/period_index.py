@@ -0,0 +1,184 @@
+"""
+IQES Period Index - Schuljahres-Zeitraummodell
+Bündelt Evaluationsdaten nach Monat, Quartal, Schulhalbjahr oder Schuljahr
+"""
+
+import numpy as np
+import pandas as pd
+
+from config.themes import SCHULJAHR_CONFIG
+
+
+# Spalten mit vorberechneten ganzzahligen Zeitraum-Codes je Granularität
+PERIOD_CODE_COLUMNS = {
+    'Monat': 'Periode_Monat',
+    'Quartal': 'Periode_Quartal',
+    'Halbjahr': 'Periode_Halbjahr',
+    'Schuljahr': 'Periode_Schuljahr'
+}
+
+
+class IQESPeriodIndex:
+    """
+    Zeitraum-Index für IQES-Daten
+    
+    Die Datumswerte werden einmalig in ganzzahlige Codes je Granularität
+    übersetzt. Jede spätere Bündelung arbeitet nur noch auf diesen Codes.
+    """
+    
+    def __init__(self, start_month: int = SCHULJAHR_CONFIG['start_month'],
+                 second_half_month: int = SCHULJAHR_CONFIG['second_half_month']):
+        self.start_month = start_month
+        self.second_half_month = second_half_month
+        self.granularities = SCHULJAHR_CONFIG['granularities']
+    
+    def compute_period_codes(self, dates: pd.Series) -> pd.DataFrame:
+        """
+        Berechnet die Zeitraum-Codes aller Granularitäten in einem Durchlauf
+        
+        Args:
+            dates: Datumswerte
+            
+        Returns:
+            DataFrame mit einer Code-Spalte je Granularität (gleicher Index wie dates)
+        """
+        timestamps = pd.to_datetime(dates)
+        missing = timestamps.isna()
+        year = timestamps.dt.year.fillna(0).to_numpy(dtype=np.int64)
+        month = timestamps.dt.month.fillna(1).to_numpy(dtype=np.int64)
+        
+        # Schuljahr = Kalenderjahr des Schuljahresbeginns (z.B. 2024 für 2024/25)
+        school_year = year - (month < self.start_month)
+        months_into_year = (month - self.start_month) % 12
+        second_half_offset = (self.second_half_month - self.start_month) % 12
+        half = (months_into_year >= second_half_offset).astype(int)
+        
+        codes = pd.DataFrame({
+            'Periode_Monat': year * 12 + (month - 1),
+            'Periode_Quartal': year * 4 + (month - 1) // 3,
+            'Periode_Halbjahr': school_year * 2 + half,
+            'Periode_Schuljahr': school_year
+        }, index=dates.index)
+        
+        codes = codes.astype('Int64')
+        codes.loc[missing] = pd.NA
+        return codes
+    
+    def add_period_columns(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Ergänzt die Daten einmalig um Zeitraum-Codes
+        
+        Args:
+            data: IQES-Daten mit Spalte 'Datum'
+            
+        Returns:
+            Kopie der Daten mit Code-Spalten je Granularität
+        """
+        if data.empty or 'Datum' not in data.columns:
+            return data.copy()
+        
+        codes = self.compute_period_codes(data['Datum'])
+        result = data.drop(columns=[col for col in codes.columns if col in data.columns])
+        return pd.concat([result, codes], axis=1)
+    
+    def period_start(self, codes: np.ndarray, granularity: str) -> pd.DatetimeIndex:
+        """
+        Übersetzt Zeitraum-Codes in das Startdatum des jeweiligen Zeitraums
+        
+        Args:
+            codes: Ganzzahlige Zeitraum-Codes
+            granularity: 'Monat', 'Quartal', 'Halbjahr' oder 'Schuljahr'
+            
+        Returns:
+            Startdaten der Zeiträume
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        
+        if granularity == 'Monat':
+            year, month = codes // 12, codes % 12 + 1
+        elif granularity == 'Quartal':
+            year, month = codes // 4, (codes % 4) * 3 + 1
+        elif granularity == 'Halbjahr':
+            school_year, half = codes // 2, codes % 2
+            offset = np.where(half == 1, (self.second_half_month - self.start_month) % 12, 0)
+            month_index = self.start_month - 1 + offset
+            year, month = school_year + month_index // 12, month_index % 12 + 1
+        elif granularity == 'Schuljahr':
+            year, month = codes, np.full_like(codes, self.start_month)
+        else:
+            raise ValueError(f"Unbekannte Granularität: {granularity}")
+        
+        return pd.DatetimeIndex(pd.to_datetime(pd.DataFrame({'year': year, 'month': month, 'day': 1})))
+    
+    def period_label(self, codes: np.ndarray, granularity: str) -> np.ndarray:
+        """
+        Erzeugt lesbare Bezeichnungen für Zeitraum-Codes
+        
+        Args:
+            codes: Ganzzahlige Zeitraum-Codes
+            granularity: 'Monat', 'Quartal', 'Halbjahr' oder 'Schuljahr'
+            
+        Returns:
+            Array mit Bezeichnungen (z.B. "2024/25", "2024/25 2. HJ", "2024-Q4", "2024-11")
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        
+        if granularity == 'Monat':
+            return np.array([f"{c // 12}-{c % 12 + 1:02d}" for c in codes], dtype=object)
+        if granularity == 'Quartal':
+            return np.array([f"{c // 4}-Q{c % 4 + 1}" for c in codes], dtype=object)
+        if granularity == 'Halbjahr':
+            return np.array([f"{c // 2}/{(c // 2 + 1) % 100:02d} {c % 2 + 1}. HJ" for c in codes], dtype=object)
+        if granularity == 'Schuljahr':
+            return np.array([f"{c}/{(c + 1) % 100:02d}" for c in codes], dtype=object)
+        
+        raise ValueError(f"Unbekannte Granularität: {granularity}")
+    
+    def resample(self, data: pd.DataFrame, granularity: str) -> pd.DataFrame:
+        """
+        Bündelt die Daten auf die gewählte Granularität
+        
+        'Datum' wird durch das Startdatum des Zeitraums ersetzt, das ursprüngliche
+        Datum bleibt in 'Datum_Original' erhalten. 'Zeitraum' enthält die Bezeichnung
+        als geordnete Kategorie. Bezeichnungen und Startdaten werden nur für die
+        eindeutigen Codes berechnet.
+        
+        Args:
+            data: IQES-Daten (idealerweise bereits mit add_period_columns ergänzt)
+            granularity: 'Datum', 'Monat', 'Quartal', 'Halbjahr' oder 'Schuljahr'
+            
+        Returns:
+            Kopie der Daten mit gebündeltem 'Datum'
+        """
+        if data.empty or 'Datum' not in data.columns or granularity == 'Datum':
+            return data
+        
+        if granularity not in PERIOD_CODE_COLUMNS:
+            raise ValueError(f"Unbekannte Granularität: {granularity}")
+        
+        code_column = PERIOD_CODE_COLUMNS[granularity]
+        if code_column not in data.columns:
+            data = self.add_period_columns(data)
+        
+        result = data.copy()
+        if 'Datum_Original' not in result.columns:
+            result['Datum_Original'] = result['Datum']
+        
+        codes = result[code_column]
+        if codes.isna().all():
+            return result
+        
+        unique_codes = np.sort(codes.dropna().unique().astype(np.int64))
+        positions = np.searchsorted(unique_codes, codes.fillna(-1).to_numpy(dtype=np.int64))
+        positions = np.clip(positions, 0, len(unique_codes) - 1)
+        observed = codes.notna().to_numpy()
+        
+        starts = self.period_start(unique_codes, granularity)
+        labels = self.period_label(unique_codes, granularity)
+        
+        result['Datum'] = pd.Series(starts[positions], index=result.index).where(observed)
+        result['Zeitraum'] = pd.Categorical.from_codes(
+            np.where(observed, positions, -1), categories=labels, ordered=True
+        )
+        
+        return result
@@ -0,0 +1,140 @@
+"""
+IQES Question Matching - Fragenidentität über Zeiträume
+Führt umnummerierte oder umformulierte Fragen per MinHash/LSH zu einer kanonischen Frage_ID zusammen
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+from core.minhash import IQESMinHasher
+
+
+class IQESQuestionMatcher:
+    """
+    Ordnet jeder Frage eine über alle Zeiträume stabile Frage_ID zu
+    
+    Verglichen werden nur die eindeutigen Fragetexte. Kandidaten kommen aus dem
+    LSH-Banding (kein paarweiser Vergleich aller Texte), bestätigt werden sie über
+    die geschätzte Jaccard-Ähnlichkeit. Texte aus derselben Quelldatei werden nie
+    zusammengeführt, da sie im selben Fragebogen unterschiedliche Fragen sind.
+    
+    Die Frage_ID ist die Fragenummer des frühesten Vorkommens des Clusters, bei
+    Mehrdeutigkeit mit Suffix ("7.3/2") in zeitlicher Reihenfolge. Ohne
+    Umnummerierung entspricht sie damit der bisherigen Fragenummer; Fragen ohne
+    Text behalten ihre Fragenummer.
+    """
+    
+    def __init__(self, threshold: float = 0.6, hasher: Optional[IQESMinHasher] = None,
+                 source_column: str = 'Quelldatei'):
+        self.threshold = threshold
+        self.hasher = hasher or IQESMinHasher()
+        self.source_column = source_column
+    
+    def cluster_texts(self, texts: List[str], sources: Optional[List[set]] = None,
+                      blocks: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Clustert Texte über LSH-Kandidaten und Union-Find
+        
+        Args:
+            texts: Eindeutige Fragetexte
+            sources: Optional Quellen je Text (Texte mit gemeinsamer Quelle bleiben getrennt)
+            blocks: Optional Block-Nummer je Text (nur Texte desselben Blocks werden verbunden)
+            
+        Returns:
+            Cluster-Nummer je Text (0..n_cluster-1, in Reihenfolge des ersten Auftretens)
+        """
+        if not texts:
+            return np.empty(0, dtype=np.int64)
+        
+        signatures = self.hasher.signatures(texts)
+        empty = np.array([not self.hasher.normalize(text) for text in texts])
+        
+        parent = list(range(len(texts)))
+        groups = [set(s) for s in sources] if sources is not None else None
+        
+        def find(node: int) -> int:
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+        
+        for members, leaders in self.hasher.candidate_pairs(signatures, blocks):
+            similar = self.hasher.estimate_similarity(signatures[members], signatures[leaders]) >= self.threshold
+            similar &= ~empty[members] & ~empty[leaders]
+            
+            for member, leader in zip(members[similar], leaders[similar]):
+                root_a, root_b = find(int(member)), find(int(leader))
+                if root_a == root_b:
+                    continue
+                if groups is not None:
+                    if groups[root_a] & groups[root_b]:
+                        continue
+                    groups[root_b] |= groups[root_a]
+                parent[root_a] = root_b
+        
+        roots = np.array([find(node) for node in range(len(texts))])
+        return pd.factorize(roots)[0]
+    
+    def assign_question_ids(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Ergänzt die Daten um die kanonische Spalte 'Frage_ID'
+        
+        Args:
+            data: IQES-Daten mit 'Frage' und 'Fragenummer'
+            
+        Returns:
+            Kopie der Daten mit 'Frage_ID'
+        """
+        if data.empty or 'Frage' not in data.columns or 'Fragenummer' not in data.columns:
+            return data.copy()
+        
+        result = data.copy()
+        # Fragen ohne Text werden nicht zugeordnet und behalten ihre Fragenummer
+        result['Frage_ID'] = result['Fragenummer'].astype(str)
+        texts = result['Frage'].fillna('').astype(str)
+        with_text = texts.map(lambda text: bool(self.hasher.normalize(text))).to_numpy(dtype=bool)
+        if not with_text.any():
+            return result
+        
+        matched = result[with_text]
+        text_codes, unique_texts = pd.factorize(texts[with_text])
+        
+        sources = None
+        if self.source_column in matched.columns:
+            source_sets = matched.groupby(text_codes)[self.source_column].agg(lambda values: set(values.dropna()))
+            sources = source_sets.reindex(range(len(unique_texts)), fill_value=set()).tolist()
+        
+        clusters = self.cluster_texts(list(unique_texts), sources)
+        row_cluster = clusters[text_codes]
+        
+        result.loc[with_text, 'Frage_ID'] = pd.Series(row_cluster, index=matched.index).map(
+            self._cluster_labels(matched, row_cluster)
+        )
+        return result
+    
+    def _cluster_labels(self, data: pd.DataFrame, row_cluster: np.ndarray) -> Dict[int, str]:
+        """
+        Lesbare, deterministische Bezeichnung je Cluster
+        
+        Args:
+            data: IQES-Daten
+            row_cluster: Cluster-Nummer je Zeile
+            
+        Returns:
+            Dictionary {Cluster-Nummer: Frage_ID}
+        """
+        frame = pd.DataFrame({
+            'Cluster': row_cluster,
+            'Fragenummer': data['Fragenummer'].astype(str).to_numpy(),
+            'Frage': data['Frage'].fillna('').astype(str).to_numpy(),
+            'Datum': data['Datum'].to_numpy() if 'Datum' in data.columns else 0
+        })
+        
+        # Frühestes Vorkommen je Cluster, Gleichstände über Nummer und Text aufgelöst;
+        # die Suffixe folgen derselben zeitlichen Reihenfolge (früheste Frage ohne Suffix)
+        first = frame.sort_values(['Datum', 'Fragenummer', 'Frage'], kind='stable').drop_duplicates('Cluster')
+        suffix = first.groupby('Fragenummer', sort=False).cumcount() + 1
+        
+        labels = first['Fragenummer'].where(suffix == 1, first['Fragenummer'] + '/' + suffix.astype(str))
+        return dict(zip(first['Cluster'], labels))
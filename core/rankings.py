@@ -0,0 +1,96 @@
+"""
+IQES Rankings - Gruppierte Top/Bottom-Ranglisten
+Ermittelt beste und schlechteste Einträge je beliebiger Gruppierung in einem Sortierdurchlauf
+"""
+
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Tuple, Union
+
+
+class IQESRankingEngine:
+    """
+    Top/Bottom-K je Gruppe (z.B. je Bildungsgang oder Thema)
+    
+    Die Daten werden einmal per np.lexsort nach (Gruppe, Wert, Tie-Breaker) sortiert.
+    Die Bottom-K sind die ersten, die Top-K die letzten K Positionen jedes Gruppenblocks.
+    Gleichstände werden über die Tie-Breaker-Spalten aufgelöst, die Reihenfolge ist
+    damit unabhängig von der Eingabereihenfolge.
+    """
+    
+    def __init__(self, tie_breakers: Optional[List[str]] = None):
+        self.tie_breakers = tie_breakers or ['Fragenummer', 'Frage']
+    
+    def _sort_order(self, data: pd.DataFrame, value_column: str,
+                    group_codes: np.ndarray) -> np.ndarray:
+        """
+        Stabile Sortierreihenfolge nach Gruppe, Wert und Tie-Breakern
+        
+        Args:
+            data: Zu sortierende Daten
+            value_column: Ranking-Spalte
+            group_codes: Gruppen-Code je Zeile
+            
+        Returns:
+            Index-Array der sortierten Reihenfolge
+        """
+        # np.lexsort sortiert nach dem letzten Schlüssel zuerst
+        keys = [
+            pd.factorize(data[col].astype(str), sort=True)[0]
+            for col in reversed(self.tie_breakers) if col in data.columns
+        ]
+        keys.append(data[value_column].to_numpy(dtype=float))
+        keys.append(group_codes)
+        return np.lexsort(keys)
+    
+    def top_bottom(self, data: pd.DataFrame, k: int = 5, value_column: str = 'Bewertung',
+                   group_by: Optional[Union[str, List[str]]] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Ermittelt die K schlechtesten und K besten Einträge je Gruppe
+        
+        Args:
+            data: Daten mit Ranking-Spalte (z.B. aggregierte Fragen)
+            k: Anzahl Einträge je Gruppe und Richtung
+            value_column: Ranking-Spalte
+            group_by: Optionale Gruppierungs-Spalte(n); None = eine globale Rangliste
+            
+        Returns:
+            Tuple (Bottom-K aufsteigend, Top-K absteigend) mit Spalte 'Rang' je Gruppe
+        """
+        if data.empty or value_column not in data.columns:
+            return pd.DataFrame(), pd.DataFrame()
+        
+        data = data[data[value_column].notna()]
+        if data.empty:
+            return pd.DataFrame(), pd.DataFrame()
+        
+        group_cols = [] if group_by is None else ([group_by] if isinstance(group_by, str) else list(group_by))
+        
+        if group_cols:
+            group_codes = data.groupby(group_cols, sort=True, dropna=False).ngroup().to_numpy()
+        else:
+            group_codes = np.zeros(len(data), dtype=np.int64)
+        
+        order = self._sort_order(data, value_column, group_codes)
+        sorted_codes = group_codes[order]
+        
+        # Position innerhalb des Gruppenblocks aus den Blockgrenzen
+        block_starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        block_sizes = np.diff(np.r_[block_starts, len(order)])
+        block_id = np.repeat(np.arange(len(block_starts)), block_sizes)
+        position = np.arange(len(order)) - block_starts[block_id]
+        from_end = block_sizes[block_id] - 1 - position
+        
+        bottom_rows = order[position < k]
+        bottom = data.iloc[bottom_rows].copy()
+        bottom['Rang'] = position[position < k] + 1
+        
+        # Top-K: letzte Positionen jedes Blocks, innerhalb der Gruppe absteigend
+        top_mask = from_end < k
+        top_positions = np.flatnonzero(top_mask)
+        top_order = np.lexsort((from_end[top_positions], block_id[top_positions]))
+        top_positions = top_positions[top_order]
+        top = data.iloc[order[top_positions]].copy()
+        top['Rang'] = from_end[top_positions] + 1
+        
+        return bottom.reset_index(drop=True), top.reset_index(drop=True)
@@ -0,0 +1,312 @@
+"""
+IQES Segmentation - Segmentierungs-Würfel für demografische Einfachauswahl-Fragen
+Hält Antwortverteilungen, Themenbewertungen und offene Rückmeldungen je Evaluation als kompakte Arrays
+"""
+
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Tuple
+
+
+class IQESSegmentationCube:
+    """
+    Vorberechnete Segment-Kreuztabellen
+    
+    IQES-Exporte enthalten je Evaluation (Bildungsgang, Datum, Evaluationstyp) nur
+    aggregierte Verteilungen, keine Einzelantworten. Der Würfel legt deshalb einmal
+    je Ladevorgang an:
+    
+    - shares/counts: (Segmentfrage, Option, Evaluation) normierte Anteile und Anzahlen
+    - ratings: (Thema, Evaluation) mittlere Bewertung
+    - open_counts: (Evaluation,) Anzahl offener Antworten
+    
+    Kreuztabellen Segment × Bildungsgang × Zeitraum und alle Vergleiche entstehen
+    daraus per Array-Reduktion. Ein Wechsel des Segments oder Filters greift nicht
+    mehr auf die Rohzeilen zu.
+    """
+    
+    def __init__(self, data: pd.DataFrame, question_key: Optional[str] = None):
+        self.evaluations = pd.DataFrame(columns=['Bildungsgang', 'Datum', 'Evaluationstyp'])
+        self.segments = pd.DataFrame(columns=['Segmentierungstyp', 'Frage_Key', 'Frage'])
+        self.options: List[List[str]] = []
+        self.shares = np.empty((0, 0, 0))
+        self.counts = np.empty((0, 0, 0))
+        self.themes = pd.Index([])
+        self.ratings = np.empty((0, 0))
+        self.rating_counts = np.empty((0, 0))
+        self.open_counts = np.empty(0)
+        
+        required = ['Bildungsgang', 'Datum', 'Evaluationstyp', 'Fragentyp']
+        if data.empty or any(col not in data.columns for col in required):
+            return
+        
+        eval_keys = ['Bildungsgang', 'Datum', 'Evaluationstyp']
+        self.evaluations = data[eval_keys].drop_duplicates().sort_values(eval_keys).reset_index(drop=True)
+        eval_lookup = pd.MultiIndex.from_frame(self.evaluations)
+        row_eval = eval_lookup.get_indexer(pd.MultiIndex.from_frame(data[eval_keys]))
+        
+        self.question_key = question_key or ('Frage_ID' if 'Frage_ID' in data.columns else 'Fragenummer')
+        self._build_segments(data, row_eval)
+        self._build_ratings(data, row_eval)
+        self._build_open_counts(data, row_eval)
+    
+    @property
+    def n_evaluations(self) -> int:
+        return len(self.evaluations)
+    
+    def _build_segments(self, data: pd.DataFrame, row_eval: np.ndarray):
+        """
+        Anteile und Anzahlen je Segmentfrage, Option und Evaluation
+        
+        Args:
+            data: IQES-Daten
+            row_eval: Evaluations-Nummer je Zeile
+        """
+        if 'Für_Segmentierung' not in data.columns or 'Antwortoptionen' not in data.columns:
+            return
+        
+        mask = ((data['Fragentyp'] == 'Einfachauswahl') & (data['Für_Segmentierung'] == True)).to_numpy()
+        choice_data = data[mask]
+        if choice_data.empty:
+            return
+        
+        choice_eval = row_eval[mask]
+        # Ohne Antwortzahlen zählt jede Zeile einfach (ungewichtete Anteile)
+        choice_responses = (choice_data['Anzahl_Antworten'].fillna(0) if 'Anzahl_Antworten' in choice_data.columns
+                            else pd.Series(1.0, index=choice_data.index))
+        segment_codes, segment_keys = pd.factorize(
+            pd.MultiIndex.from_arrays([choice_data['Segmentierungstyp'], choice_data[self.question_key].astype(str)]),
+            sort=True
+        )
+        # Optionen je Segmentfrage in Reihenfolge der Antwortnummern
+        entries = []
+        for segment, evaluation, choices, responses in zip(
+            segment_codes, choice_eval, choice_data['Antwortoptionen'], choice_responses
+        ):
+            if not isinstance(choices, dict):
+                continue
+            for number, choice in choices.items():
+                entries.append((segment, evaluation, number, choice.get('text', ''), choice.get('percentage', 0) or 0, responses))
+        
+        if not entries:
+            return
+        
+        first_text = choice_data.groupby(segment_codes)['Frage'].first()
+        self.segments = pd.DataFrame({
+            'Segmentierungstyp': segment_keys.get_level_values(0),
+            'Frage_Key': segment_keys.get_level_values(1),
+            'Frage': first_text.reindex(range(len(segment_keys))).to_numpy()
+        })
+        
+        frame = pd.DataFrame(entries, columns=['Segment', 'Evaluation', 'Nummer', 'Option', 'Anteil', 'N'])
+        ordered = frame.sort_values(['Segment', 'Nummer']).drop_duplicates(['Segment', 'Option'])
+        self.options = [ordered.loc[ordered['Segment'] == s, 'Option'].tolist() for s in range(len(self.segments))]
+        option_index = {(s, option): i for s, options in enumerate(self.options) for i, option in enumerate(options)}
+        option_codes = np.array([option_index[key] for key in zip(frame['Segment'], frame['Option'])])
+        
+        n_options = max((len(options) for options in self.options), default=0)
+        shape = (len(self.segments), n_options, self.n_evaluations)
+        raw = np.zeros(shape)
+        np.add.at(raw, (frame['Segment'].to_numpy(), option_codes, frame['Evaluation'].to_numpy()),
+                  frame['Anteil'].to_numpy(dtype=float))
+        
+        # Anteile je Segmentfrage und Evaluation auf 1 normieren (Prozent- oder Bruchangaben)
+        totals = raw.sum(axis=1, keepdims=True)
+        self.shares = np.divide(raw, totals, out=np.full(shape, np.nan), where=totals > 0)
+        
+        responses = np.zeros((len(self.segments), self.n_evaluations))
+        np.maximum.at(responses, (frame['Segment'].to_numpy(), frame['Evaluation'].to_numpy()),
+                      frame['N'].to_numpy(dtype=float))
+        self.counts = self.shares * responses[:, None, :]
+    
+    def _build_ratings(self, data: pd.DataFrame, row_eval: np.ndarray):
+        """
+        Mittlere Bewertung je Thema und Evaluation
+        
+        Args:
+            data: IQES-Daten
+            row_eval: Evaluations-Nummer je Zeile
+        """
+        if 'Thema' not in data.columns or 'Bewertung' not in data.columns:
+            return
+        
+        mask = ((data['Fragentyp'] == 'Antwortskala') & data['Bewertung'].notna() & data['Thema'].notna()).to_numpy()
+        if not mask.any():
+            return
+        
+        theme_codes, self.themes = pd.factorize(data.loc[mask, 'Thema'], sort=True)
+        self.themes = pd.Index(self.themes)
+        flat = theme_codes * self.n_evaluations + row_eval[mask]
+        size = len(self.themes) * self.n_evaluations
+        
+        sums = np.bincount(flat, weights=data.loc[mask, 'Bewertung'].to_numpy(dtype=float), minlength=size)
+        counts = np.bincount(flat, minlength=size)
+        self.rating_counts = counts.reshape(len(self.themes), self.n_evaluations)
+        self.ratings = np.divide(sums, counts, out=np.full(size, np.nan), where=counts > 0).reshape(self.rating_counts.shape)
+    
+    def _build_open_counts(self, data: pd.DataFrame, row_eval: np.ndarray):
+        """
+        Anzahl offener Antworten je Evaluation
+        
+        Args:
+            data: IQES-Daten
+            row_eval: Evaluations-Nummer je Zeile
+        """
+        mask = (data['Fragentyp'] == 'Offene Frage').to_numpy()
+        responses = data['Anzahl_Antworten'].fillna(0).to_numpy(dtype=float) if 'Anzahl_Antworten' in data.columns else np.ones(len(data))
+        self.open_counts = np.bincount(row_eval[mask], weights=responses[mask], minlength=self.n_evaluations)
+    
+    def segment_labels(self) -> List[str]:
+        """
+        Lesbare Bezeichnung je Segmentfrage
+        
+        Returns:
+            Liste "Typ: Fragetext" in Würfel-Reihenfolge
+        """
+        labels = []
+        for row in self.segments.itertuples(index=False):
+            question = str(row.Frage)
+            labels.append(f"{row.Segmentierungstyp}: {question[:60]}..." if len(question) > 60 else f"{row.Segmentierungstyp}: {question}")
+        return labels
+    
+    def evaluation_mask(self, data: pd.DataFrame) -> np.ndarray:
+        """
+        Evaluationen, die in den (gefilterten) Daten enthalten sind
+        
+        Args:
+            data: Gefilterte IQES-Daten
+            
+        Returns:
+            Boolesche Maske über die Evaluations-Achse
+        """
+        eval_keys = ['Bildungsgang', 'Datum', 'Evaluationstyp']
+        if data.empty or any(col not in data.columns for col in eval_keys) or self.n_evaluations == 0:
+            return np.zeros(self.n_evaluations, dtype=bool)
+        
+        present = pd.MultiIndex.from_frame(data[eval_keys].drop_duplicates())
+        return pd.MultiIndex.from_frame(self.evaluations).isin(present)
+    
+    def crosstab(self, segment: int, mask: np.ndarray, by: str = 'Bildungsgang') -> pd.DataFrame:
+        """
+        Gepoolte Verteilung Option × Bildungsgang bzw. Zeitraum
+        
+        Args:
+            segment: Index der Segmentfrage
+            mask: Evaluations-Maske (siehe evaluation_mask)
+            by: 'Bildungsgang' oder 'Datum'
+            
+        Returns:
+            DataFrame (Option × Gruppe) mit Anteilen, gewichtet nach Antwortzahl
+        """
+        options = self.options[segment]
+        groups, group_codes = self._group_axis(by, mask)
+        if len(groups) == 0:
+            return pd.DataFrame()
+        
+        counts = np.nan_to_num(self.counts[segment, :len(options)][:, mask])
+        pooled = np.zeros((len(options), len(groups)))
+        np.add.at(pooled.T, group_codes, counts.T)
+        
+        # Ohne Antwortzahlen: ungewichteter Mittelwert der Anteile
+        if pooled.sum() == 0:
+            shares = np.nan_to_num(self.shares[segment, :len(options)][:, mask])
+            np.add.at(pooled.T, group_codes, shares.T)
+        
+        totals = pooled.sum(axis=0, keepdims=True)
+        result = np.divide(pooled, totals, out=np.full(pooled.shape, np.nan), where=totals > 0)
+        return pd.DataFrame(result, index=pd.Index(options, name='Option'), columns=groups)
+    
+    def _group_axis(self, by: str, mask: np.ndarray) -> Tuple[pd.Index, np.ndarray]:
+        """
+        Gruppen und Gruppen-Code je (maskierter) Evaluation
+        
+        Args:
+            by: Spalte der Evaluations-Tabelle
+            mask: Evaluations-Maske
+            
+        Returns:
+            Tuple (Gruppen, Code je maskierter Evaluation)
+        """
+        codes, groups = pd.factorize(self.evaluations.loc[mask, by], sort=True)
+        return pd.Index(groups, name=by), codes
+    
+    def weighted_ratings(self, segment: int, mask: np.ndarray) -> pd.DataFrame:
+        """
+        Themenbewertung je Option, gewichtet nach Segmentgröße je Evaluation
+        
+        Näherung ohne Einzelantworten: Jede Evaluation geht mit der geschätzten Zahl
+        der Antwortenden dieser Option in den Mittelwert ein.
+        
+        Args:
+            segment: Index der Segmentfrage
+            mask: Evaluations-Maske
+            
+        Returns:
+            DataFrame (Option × Thema) mit gewichteten Mittelwerten
+        """
+        options = self.options[segment]
+        if len(self.themes) == 0 or not mask.any():
+            return pd.DataFrame()
+        
+        weights = np.nan_to_num(self.counts[segment, :len(options)][:, mask])  # (O, E)
+        if weights.sum() == 0:
+            weights = np.nan_to_num(self.shares[segment, :len(options)][:, mask])
+        
+        ratings = self.ratings[:, mask]  # (T, E)
+        observed = ~np.isnan(ratings)
+        numerator = weights @ np.nan_to_num(ratings).T  # (O, T)
+        denominator = weights @ observed.T.astype(float)
+        result = np.divide(numerator, denominator, out=np.full(numerator.shape, np.nan), where=denominator > 0)
+        return pd.DataFrame(result, index=pd.Index(options, name='Option'), columns=self.themes)
+    
+    def share_rating_correlation(self, segment: int, mask: np.ndarray, min_evaluations: int = 3) -> pd.DataFrame:
+        """
+        Korrelation zwischen Optionsanteil und Themenbewertung über Evaluationen
+        
+        Args:
+            segment: Index der Segmentfrage
+            mask: Evaluations-Maske
+            min_evaluations: Mindestanzahl gemeinsamer Evaluationen
+            
+        Returns:
+            DataFrame (Option × Thema) mit Pearson-Korrelationen (NaN bei zu wenig Daten)
+        """
+        options = self.options[segment]
+        if len(self.themes) == 0 or mask.sum() < min_evaluations:
+            return pd.DataFrame()
+        
+        shares = self.shares[segment, :len(options)][:, mask][:, None, :]  # (O, 1, E)
+        ratings = self.ratings[:, mask][None, :, :]  # (1, T, E)
+        valid = ~np.isnan(shares) & ~np.isnan(ratings)  # (O, T, E)
+        n = valid.sum(axis=2)
+        
+        x = np.where(valid, shares, 0.0)
+        y = np.where(valid, ratings, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x_mean = x.sum(axis=2) / n
+            y_mean = y.sum(axis=2) / n
+            x_dev = np.where(valid, x - x_mean[..., None], 0.0)
+            y_dev = np.where(valid, y - y_mean[..., None], 0.0)
+            correlation = (x_dev * y_dev).sum(axis=2) / np.sqrt((x_dev ** 2).sum(axis=2) * (y_dev ** 2).sum(axis=2))
+        
+        correlation = np.where(n >= min_evaluations, correlation, np.nan)
+        return pd.DataFrame(correlation, index=pd.Index(options, name='Option'), columns=self.themes)
+    
+    def evaluation_table(self, segment: int, mask: np.ndarray) -> pd.DataFrame:
+        """
+        Optionsanteile und offene Rückmeldungen je Evaluation
+        
+        Args:
+            segment: Index der Segmentfrage
+            mask: Evaluations-Maske
+            
+        Returns:
+            DataFrame je Evaluation mit Anteil je Option (%) und Anzahl offener Antworten
+        """
+        options = self.options[segment]
+        table = self.evaluations[mask].reset_index(drop=True)
+        shares = self.shares[segment, :len(options)][:, mask]
+        for i, option in enumerate(options):
+            table[f"{option} (%)"] = np.round(shares[i] * 100, 1)
+        table['Offene Antworten'] = self.open_counts[mask].astype(int)
+        return table
@@ -0,0 +1,213 @@
+"""
+IQES Sentiment - Lexikonbasierte Stimmung deutscher Textantworten
+Ein Sparse-Matrix-Vektor-Produkt über den ganzen Korpus, mit Stammformen und einfacher Negation
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from typing import Dict, Iterable, List, Tuple
+
+from core.text_corpus import CLAUSE_BOUNDARY, IQESTextCorpus, document_term_matrix, tokenize
+
+
+# Polarität je Wort (-2 .. 2); Einträge werden beim Laden auf ihre Stammform reduziert
+GERMAN_SENTIMENT_LEXICON = {
+    # positiv
+    'gut': 1, 'besser': 1, 'beste': 2, 'super': 2, 'toll': 2, 'schön': 1, 'prima': 2,
+    'perfekt': 2, 'zufrieden': 1, 'positiv': 1, 'gefallen': 1, 'gefällt': 1, 'freude': 1, 'erfolg': 1,
+    'erfolgreich': 1, 'dankbar': 1, 'danke': 1, 'empfehlen': 1, 'hilfreich': 1, 'hilfsbereit': 1,
+    'freundlich': 1, 'nett': 1, 'angenehm': 1, 'interessant': 1, 'spannend': 1, 'motivierend': 1,
+    'motiviert': 1, 'verständlich': 1, 'klar': 1, 'strukturiert': 1, 'abwechslungsreich': 1,
+    'kompetent': 1, 'engagiert': 1, 'fair': 1, 'gerecht': 1, 'respektvoll': 1, 'unterstützend': 1,
+    'unterstützung': 1, 'geduldig': 1, 'lustig': 1, 'spaß': 1, 'ruhig': 1,
+    'ausgezeichnet': 2, 'hervorragend': 2, 'genial': 2, 'wunderbar': 2, 'großartig': 2, 'gelungen': 1,
+    'praxisnah': 1, 'sinnvoll': 1, 'lehrreich': 1, 'kreativ': 1, 'modern': 1, 'sauber': 1,
+    'pünktlich': 1, 'flexibel': 1, 'transparent': 1, 'wertschätzend': 1, 'lob': 1, 'loben': 1,
+    'mögen': 1, 'mag': 1, 'lieb': 1, 'gerne': 1, 'gern': 1, 'top': 2, 'cool': 1, 'entspannt': 1,
+    # negativ
+    'schlecht': -1, 'schlechter': -1, 'schlimm': -2, 'negativ': -1, 'problem': -1, 'probleme': -1,
+    'schwierig': -1, 'unzufrieden': -1, 'fehler': -1, 'mangel': -1, 'mangelhaft': -2, 'kritik': -1,
+    'beschwerde': -1, 'stress': -1, 'stressig': -1, 'langweilig': -1, 'anstrengend': -1, 'unfair': -1,
+    'ungerecht': -1, 'unfreundlich': -1, 'unklar': -1, 'unverständlich': -1, 'chaotisch': -1,
+    'chaos': -1, 'laut': -1, 'unruhig': -1, 'schmutzig': -1, 'unsauber': -1, 'dreckig': -1, 'kaputt': -1,
+    'defekt': -1,
+    'veraltet': -1, 'überfordert': -1, 'überforderung': -1, 'druck': -1, 'angst': -1, 'ärgerlich': -1,
+    'nervig': -1, 'nervt': -1, 'frustrierend': -1, 'frustriert': -1, 'enttäuscht': -1,
+    'enttäuschend': -1, 'katastrophal': -2, 'katastrophe': -2, 'furchtbar': -2, 'schrecklich': -2,
+    'miserabel': -2, 'respektlos': -1, 'streng': -1, 'ungeduldig': -1, 'unpünktlich': -1,
+    'ausfall': -1, 'fällt': -1, 'fehlt': -1, 'fehlen': -1, 'wenig': -1, 'zuwenig': -1,
+    'zuviel': -1, 'mühsam': -1, 'unnötig': -1, 'sinnlos': -1, 'unorganisiert': -1, 'störend': -1,
+    'stört': -1, 'ungenügend': -2, 'schade': -1, 'leider': -1, 'verbesserung': -1,
+    'verbessern': -1, 'belastend': -1, 'belastung': -1, 'müde': -1, 'hasse': -2, 'doof': -1,
+    'blöd': -1, 'mies': -2
+}
+
+GERMAN_NEGATIONS = {
+    'nicht', 'kein', 'keine', 'keinen', 'keiner', 'keinem', 'keines', 'nie', 'niemals',
+    'nichts', 'ohne', 'kaum', 'weder', 'nirgends'
+}
+
+NEGATION_PREFIX = '¬'
+
+# Flexionsendungen, deren Stammformen zusätzlich ins Lexikon aufgenommen werden ("klar" -> "klare", "klaren")
+_INFLECTION_ENDINGS = ('e', 'n', 's', 'r', 'en', 'er', 'es', 'em', 'nen')
+
+
+def stem_german(word: str) -> str:
+    """
+    Leichter deutscher Stemmer (Plural-/Kasusendungen nach Savoy)
+    
+    Args:
+        word: Kleingeschriebenes Wort
+        
+    Returns:
+        Stammform
+    """
+    word = word.replace('ß', 'ss')
+    if len(word) > 5 and word.endswith('nen'):
+        return word[:-3]
+    if len(word) > 4 and word[-2:] in ('en', 'se', 'es', 'er', 'em'):
+        return word[:-2]
+    if len(word) > 3 and word[-1] in 'esnr':
+        return word[:-1]
+    return word
+
+
+class IQESSentimentScorer:
+    """
+    Stimmung je Antwort aus einem gewichteten Lexikon
+    
+    Terme sind Stammformen der Lexikonwörter und ihrer flektierten Formen;
+    Wörter bis zu scope Tokens nach einer Negation (innerhalb desselben
+    Satzglieds) erhalten einen Negationsmarker. Steht die Negation am Ende des
+    Satzglieds ("gefällt mir nicht"), gilt sie für die vorangehenden Wörter des
+    Satzglieds. Negierte positive Wörter zählen negativ, negierte negative
+    Wörter abgeschwächt positiv ("nicht schlecht"). Der Score einer Antwort ist
+    die mittlere Polarität ihrer Lexikontreffer, begrenzt auf -1 .. 1; Antworten
+    ohne Treffer erhalten 0.
+    """
+    
+    def __init__(self, lexicon: Dict[str, float] = GERMAN_SENTIMENT_LEXICON,
+                 negations: Iterable[str] = GERMAN_NEGATIONS, scope: int = 3,
+                 negated_negative_weight: float = 0.5):
+        self.negations = set(negations)
+        self.scope = scope
+        self.negated_negative_weight = negated_negative_weight
+        
+        self.lexicon: Dict[str, float] = {}
+        for word, polarity in lexicon.items():
+            if polarity:
+                self.lexicon[stem_german(word)] = polarity
+        # Der Stemmer kürzt Grund- und flektierte Form unterschiedlich weit ("klar" -> "kla",
+        # "klare" -> "klar"); daher auch die Stämme der flektierten Formen aufnehmen
+        for word, polarity in lexicon.items():
+            if polarity:
+                for ending in _INFLECTION_ENDINGS:
+                    self.lexicon.setdefault(stem_german(word + ending), polarity)
+    
+    def terms(self, tokens: List[str]) -> List[str]:
+        """
+        Lexikon-Terme einer Token-Liste (mit Negationsmarker)
+        
+        Args:
+            tokens: Tokens aus tokenize
+            
+        Returns:
+            Terme für die Dokument-Term-Matrix
+        """
+        result = []
+        negated_until = -1
+        clause_terms = []  # Positionen nicht negierter Treffer des aktuellen Satzglieds in result
+        for position, token in enumerate(tokens):
+            if token == CLAUSE_BOUNDARY:
+                negated_until = -1
+                clause_terms = []
+                continue
+            if token in self.negations:
+                if position + 1 == len(tokens) or tokens[position + 1] == CLAUSE_BOUNDARY:
+                    # Nachgestellte Negation kehrt die vorangehenden Treffer des Satzglieds um
+                    for index in clause_terms:
+                        result[index] = NEGATION_PREFIX + result[index]
+                    clause_terms = []
+                else:
+                    negated_until = position + self.scope
+                continue
+            
+            stem = stem_german(token)
+            if stem not in self.lexicon:
+                continue
+            if position <= negated_until:
+                result.append(NEGATION_PREFIX + stem)
+            else:
+                clause_terms.append(len(result))
+                result.append(stem)
+        return result
+    
+    def weights(self, vocabulary: np.ndarray) -> np.ndarray:
+        """
+        Polaritätsvektor zum Vokabular einer Dokument-Term-Matrix
+        
+        Args:
+            vocabulary: Terme aus terms
+            
+        Returns:
+            Gewicht je Term
+        """
+        weights = np.zeros(len(vocabulary))
+        for index, term in enumerate(vocabulary):
+            if term.startswith(NEGATION_PREFIX):
+                polarity = self.lexicon.get(term[len(NEGATION_PREFIX):], 0)
+                weights[index] = -polarity if polarity > 0 else -polarity * self.negated_negative_weight
+            else:
+                weights[index] = self.lexicon.get(term, 0)
+        return weights
+    
+    def score_matrix(self, matrix: sparse.csr_matrix, vocabulary: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores für alle Dokumente einer Matrix
+        
+        Args:
+            matrix: Zählmatrix (n_dokumente, n_terme)
+            vocabulary: Vokabular der Matrix
+            
+        Returns:
+            Tuple (Score je Dokument in -1 .. 1, Anzahl Lexikontreffer je Dokument)
+        """
+        if matrix.shape[1] == 0:
+            return np.zeros(matrix.shape[0]), np.zeros(matrix.shape[0], dtype=np.int64)
+        
+        weights = self.weights(vocabulary)
+        raw = matrix @ weights
+        hits = np.asarray(matrix.sum(axis=1)).ravel()
+        scores = np.divide(raw, hits, out=np.zeros_like(raw, dtype=float), where=hits > 0)
+        return np.clip(scores, -1.0, 1.0), hits
+    
+    def score_texts(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Scores für beliebige Texte (z.B. Sätze der Zusammenfassung)
+        
+        Args:
+            texts: Texte
+            
+        Returns:
+            Score je Text in -1 .. 1
+        """
+        matrix, vocabulary = document_term_matrix([tokenize(text) for text in texts], self.terms)
+        return self.score_matrix(matrix, vocabulary)[0]
+    
+    def annotate(self, corpus: IQESTextCorpus) -> pd.DataFrame:
+        """
+        Ergänzt corpus.answers um 'Sentiment' und 'Sentiment_Treffer'
+        
+        Args:
+            corpus: Text-Korpus (Matrix wird einmal je Korpus berechnet)
+            
+        Returns:
+            corpus.answers
+        """
+        matrix, vocabulary = corpus.document_term_matrix('sentiment', self.terms)
+        scores, hits = self.score_matrix(matrix, vocabulary)
+        corpus.answers['Sentiment'] = scores
+        corpus.answers['Sentiment_Treffer'] = hits
+        return corpus.answers
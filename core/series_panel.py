@@ -0,0 +1,53 @@
+"""
+IQES Series Panel - Zeitreihen-Matrix für Batch-Analysen
+Überführt IQES-Daten in eine (n_reihen × n_zeiträume) Matrix für vektorisierte Auswertungen
+"""
+
+import numpy as np
+import pandas as pd
+from typing import List, Tuple, Union
+
+
+def build_series_panel(data: pd.DataFrame, keys: Union[str, List[str]],
+                       value_column: str = 'Bewertung',
+                       time_column: str = 'Datum') -> Tuple[pd.DataFrame, pd.Index, np.ndarray]:
+    """
+    Erstellt eine Panel-Matrix mit einer Zeile pro Zeitreihe und einer Spalte pro Zeitraum
+    
+    Args:
+        data: IQES-Daten
+        keys: Spalte(n), die eine Zeitreihe identifizieren (z.B. ['Fragenummer', 'Bildungsgang'])
+        value_column: Wert-Spalte (Mittelwert je Reihe und Zeitraum)
+        time_column: Zeit-Spalte
+        
+    Returns:
+        Tuple (Schlüssel-DataFrame je Reihe, sortierte Zeiträume, Matrix mit NaN für fehlende Werte)
+    """
+    key_columns = [keys] if isinstance(keys, str) else list(keys)
+    
+    if data.empty or any(col not in data.columns for col in key_columns + [value_column, time_column]):
+        return pd.DataFrame(columns=key_columns), pd.Index([]), np.empty((0, 0))
+    
+    valid = data[data[value_column].notna()]
+    panel = valid.groupby(key_columns + [time_column])[value_column].mean().unstack(time_column)
+    panel = panel.sort_index(axis=1)
+    
+    series_keys = panel.index.to_frame(index=False)
+    return series_keys, panel.columns, panel.to_numpy(dtype=float)
+
+
+def period_positions(periods: pd.Index) -> np.ndarray:
+    """
+    Wandelt Zeiträume in eine numerische Zeitachse (Jahre seit dem ersten Zeitraum)
+    
+    Args:
+        periods: Sortierte Zeiträume (Timestamps)
+        
+    Returns:
+        Array mit Zeitabständen in Jahren
+    """
+    if len(periods) == 0:
+        return np.empty(0)
+    
+    timestamps = pd.DatetimeIndex(periods)
+    return ((timestamps - timestamps[0]).days / 365.25).to_numpy(dtype=float)
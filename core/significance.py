@@ -0,0 +1,179 @@
+"""
+IQES Significance - Signifikanztests für Veränderungen zwischen Evaluationszeiträumen
+Vektorisierte Chi-Quadrat-, Mann-Whitney-U-Tests und Bootstrap-Konfidenzintervalle
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from typing import Tuple
+
+from core.distribution_stats import IQESDistributionStats
+
+
+class IQESSignificanceTester:
+    """
+    Signifikanztests auf 4-Punkte-Antwortverteilungen
+    Alle Tests laufen gleichzeitig über alle Gruppen (Fragen, Themen, ...) als NumPy-Batch
+    """
+    
+    def __init__(self, alpha: float = 0.05, n_bootstrap: int = 1000,
+                 confidence: float = 0.95, random_state: int = 42):
+        self.alpha = alpha
+        self.n_bootstrap = n_bootstrap
+        self.confidence = confidence
+        self.random_state = random_state
+        self.distribution_stats = IQESDistributionStats()
+        self.scale_points = self.distribution_stats.scale_points
+    
+    def chi_square_test(self, before: np.ndarray, after: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Chi-Quadrat-Homogenitätstest (2 × 4 Kontingenztafel) je Gruppe
+        
+        Args:
+            before: Häufigkeiten im Ausgangszeitraum, Form (n_gruppen, 4)
+            after: Häufigkeiten im Vergleichszeitraum, Form (n_gruppen, 4)
+            
+        Returns:
+            Tuple (Chi-Quadrat-Statistik, p-Wert) je Gruppe (NaN wenn nicht testbar)
+        """
+        table = np.stack([before, after], axis=1).astype(float)  # (g, 2, 4)
+        row_totals = table.sum(axis=2, keepdims=True)
+        col_totals = table.sum(axis=1, keepdims=True)
+        total = table.sum(axis=(1, 2), keepdims=True)
+        
+        expected = row_totals * col_totals / np.where(total > 0, total, 1.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            contributions = np.where(expected > 0, (table - expected) ** 2 / expected, 0.0)
+        statistic = contributions.sum(axis=(1, 2))
+        
+        # Freiheitsgrade nur über tatsächlich besetzte Antwortkategorien
+        dof = (col_totals[:, 0, :] > 0).sum(axis=1) - 1
+        testable = (row_totals[:, :, 0] > 0).all(axis=1) & (dof > 0)
+        
+        p_value = np.full(len(statistic), np.nan)
+        p_value[testable] = stats.chi2.sf(statistic[testable], dof[testable])
+        statistic = np.where(testable, statistic, np.nan)
+        
+        return statistic, p_value
+    
+    def mann_whitney_test(self, before: np.ndarray, after: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Mann-Whitney-U-Test mit Bindungskorrektur direkt auf gruppierten Häufigkeiten
+        
+        Args:
+            before: Häufigkeiten im Ausgangszeitraum, Form (n_gruppen, 4)
+            after: Häufigkeiten im Vergleichszeitraum, Form (n_gruppen, 4)
+            
+        Returns:
+            Tuple (U-Statistik des Vergleichszeitraums, zweiseitiger p-Wert) je Gruppe
+        """
+        before = np.asarray(before, dtype=float)
+        after = np.asarray(after, dtype=float)
+        n1 = before.sum(axis=1)
+        n2 = after.sum(axis=1)
+        n = n1 + n2
+        
+        # U = Anzahl Paare (Nachher > Vorher) + 0.5 * Anzahl Bindungen
+        below = np.cumsum(before, axis=1) - before
+        u_after = (after * (below + 0.5 * before)).sum(axis=1)
+        
+        ties = before + after
+        tie_term = (ties ** 3 - ties).sum(axis=1) / np.where(n > 1, n * (n - 1), 1.0)
+        variance = n1 * n2 / 12.0 * ((n + 1) - tie_term)
+        
+        testable = (n1 > 0) & (n2 > 0) & (variance > 0)
+        z = np.zeros_like(u_after)
+        z[testable] = (u_after[testable] - n1[testable] * n2[testable] / 2.0) / np.sqrt(variance[testable])
+        
+        p_value = np.where(testable, 2 * stats.norm.sf(np.abs(z)), np.nan)
+        return np.where(testable, u_after, np.nan), p_value
+    
+    def bootstrap_mean_difference(self, before: np.ndarray, after: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Bootstrap-Konfidenzintervall der Mittelwertdifferenz (Nachher - Vorher)
+        
+        Alle Gruppen werden in einem einzigen multinomialen Ziehungs-Batch
+        der Form (n_bootstrap, n_gruppen, 4) simuliert.
+        
+        Args:
+            before: Häufigkeiten im Ausgangszeitraum, Form (n_gruppen, 4)
+            after: Häufigkeiten im Vergleichszeitraum, Form (n_gruppen, 4)
+            
+        Returns:
+            Tuple (untere Grenze, obere Grenze) je Gruppe
+        """
+        rng = np.random.default_rng(self.random_state)
+        n_groups = len(before)
+        
+        def resample_means(counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            counts = np.asarray(counts, dtype=float)
+            n = counts.sum(axis=1)
+            valid = n > 0
+            # Gruppen ohne Antworten mit Gleichverteilung ziehen und danach maskieren
+            pvals = np.where(valid[:, None], counts / np.where(valid, n, 1.0)[:, None], 1.0 / counts.shape[1])
+            draws = rng.multinomial(n.astype(np.int64), pvals, size=(self.n_bootstrap, n_groups))
+            means = (draws @ self.scale_points) / np.where(valid, n, 1.0)
+            return means, valid
+        
+        means_before, valid_before = resample_means(before)
+        means_after, valid_after = resample_means(after)
+        
+        tail = (1 - self.confidence) / 2 * 100
+        lower, upper = np.percentile(means_after - means_before, [tail, 100 - tail], axis=0)
+        
+        valid = valid_before & valid_after
+        return np.where(valid, lower, np.nan), np.where(valid, upper, np.nan)
+    
+    def compare_periods(self, data: pd.DataFrame, group_by: str) -> pd.DataFrame:
+        """
+        Vergleicht je Gruppe den ersten mit dem aktuellsten Evaluationszeitraum
+        
+        Args:
+            data: IQES-Daten mit Antwortverteilungen und Spalte 'Datum'
+            group_by: Gruppierungs-Spalte ('Fragenummer', 'Thema', 'Bildungsgang', ...)
+            
+        Returns:
+            DataFrame mit p-Werten, Bootstrap-Konfidenzintervall und Signifikanz-Flag je Gruppe
+        """
+        if data.empty or group_by not in data.columns or 'Datum' not in data.columns:
+            return pd.DataFrame()
+        
+        pooled = self.distribution_stats.pool_distributions(data, [group_by, 'Datum'])
+        pooled = pooled[pooled['N_Verteilung'] > 0].sort_values([group_by, 'Datum'])
+        
+        if pooled.empty:
+            return pd.DataFrame()
+        
+        periods = pooled.groupby(group_by, sort=True)
+        first = periods.head(1).set_index(group_by)
+        latest = periods.tail(1).set_index(group_by)
+        multi_period = periods.size() >= 2
+        
+        first = first[multi_period.reindex(first.index).to_numpy()]
+        latest = latest.loc[first.index]
+        
+        if first.empty:
+            return pd.DataFrame()
+        
+        count_columns = self.distribution_stats.count_columns
+        before = first[count_columns].to_numpy()
+        after = latest[count_columns].to_numpy()
+        
+        chi2_stat, chi2_p = self.chi_square_test(before, after)
+        u_stat, mwu_p = self.mann_whitney_test(before, after)
+        ci_lower, ci_upper = self.bootstrap_mean_difference(before, after)
+        
+        result = pd.DataFrame({
+            group_by: first.index,
+            'N_Erste': first['N_Verteilung'].to_numpy(),
+            'N_Aktuell': latest['N_Verteilung'].to_numpy(),
+            'Chi2': np.round(chi2_stat, 3),
+            'p_Chi2': chi2_p,
+            'p_Wert': mwu_p,
+            'KI_Unten': np.round(ci_lower, 2),
+            'KI_Oben': np.round(ci_upper, 2),
+        })
+        result['Signifikant'] = result['p_Wert'] < self.alpha
+        
+        return result
@@ -0,0 +1,176 @@
+"""
+IQES Summarization - Map-Reduce-Zusammenfassung offener Antworten
+Zerlegt große Antwortmengen in Token-begrenzte Teilstücke, fasst sie parallel zusammen und verdichtet die Teilergebnisse
+"""
+
+import hashlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config.themes import LLM_SUMMARY_CONFIG
+from core.llm_dispatcher import IQESLLMDispatcher
+
+
+class IQESMapReduceSummarizer:
+    """
+    Map-Reduce über Textantworten
+    
+    Die Teilstücke werden inhaltsabhängig gebildet: Eine Grenze liegt nach jeder
+    Antwort, deren Hash durch boundary_every teilbar ist, spätestens aber beim
+    Erreichen des Token-Budgets. Neue Antworten (z.B. eines weiteren Zeitraums)
+    verändern damit nur die Teilstücke, in die sie fallen; alle übrigen behalten
+    ihren Inhalt und damit ihren Cache-Schlüssel.
+    
+    Map- und Reduce-Funktionen werden vom Aufrufer übergeben (typischerweise
+    cache-gestützte KI-Anfragen) und über den Dispatcher parallel ausgeführt.
+    """
+    
+    def __init__(self, dispatcher: Optional[IQESLLMDispatcher] = None,
+                 chunk_tokens: int = LLM_SUMMARY_CONFIG['chunk_tokens'],
+                 boundary_every: int = LLM_SUMMARY_CONFIG['boundary_every'],
+                 reduce_fan_in: int = LLM_SUMMARY_CONFIG['reduce_fan_in'],
+                 chars_per_token: int = LLM_SUMMARY_CONFIG['chars_per_token']):
+        self.dispatcher = dispatcher or IQESLLMDispatcher()
+        self.chunk_tokens = chunk_tokens
+        self.boundary_every = max(1, boundary_every)
+        self.reduce_fan_in = max(2, reduce_fan_in)
+        self.chars_per_token = chars_per_token
+    
+    def estimate_tokens(self, text: str) -> int:
+        """
+        Grobe Token-Schätzung über die Zeichenzahl
+        
+        Args:
+            text: Antworttext
+            
+        Returns:
+            Geschätzte Anzahl Token (mindestens 1)
+        """
+        return max(1, -(-len(text) // self.chars_per_token))
+    
+    def _is_boundary(self, text: str) -> bool:
+        """Inhaltsabhängige Grenze (unabhängig von PYTHONHASHSEED)"""
+        digest = hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') % self.boundary_every == 0
+    
+    def chunk_texts(self, texts: List[str]) -> List[List[str]]:
+        """
+        Zerlegt Antworten in Token-begrenzte Teilstücke
+        
+        Leere Antworten entfallen; einzelne überlange Antworten werden auf das
+        Budget gekürzt.
+        
+        Args:
+            texts: Textantworten in stabiler Reihenfolge
+            
+        Returns:
+            Liste von Teilstücken (Listen von Antworten)
+        """
+        max_chars = self.chunk_tokens * self.chars_per_token
+        chunks, current, current_tokens = [], [], 0
+        
+        for text in texts:
+            text = str(text).strip()[:max_chars]
+            if not text:
+                continue
+            
+            tokens = self.estimate_tokens(text)
+            if current and current_tokens + tokens > self.chunk_tokens:
+                chunks.append(current)
+                current, current_tokens = [], 0
+            
+            current.append(text)
+            current_tokens += tokens
+            if self._is_boundary(text):
+                chunks.append(current)
+                current, current_tokens = [], 0
+        
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    def _dispatch(self, batches: List[List[str]], function: Callable[..., Optional[str]]) -> Dict[int, str]:
+        """
+        Führt function für alle Teilstücke aus: Cache-Treffer sofort, der Rest parallel
+        
+        Returns:
+            Dictionary {Index des Teilstücks: Ergebnis} (fehlgeschlagene fehlen)
+            
+        Raises:
+            Letzter Fehler, wenn kein Teilstück ein Ergebnis liefert
+        """
+        results = {}
+        for index, batch in enumerate(batches):
+            cached = function(batch, cached_only=True)
+            if cached:
+                results[index] = (cached, None)
+        
+        # Nur echte Anfragen belasten Parallelitätsgrenze und Ratenlimit
+        jobs = {
+            index: (lambda batch=batch: function(batch))
+            for index, batch in enumerate(batches) if index not in results
+        }
+        results.update(self.dispatcher.dispatch(jobs))
+        
+        outputs = {index: results[index][0] for index in range(len(batches)) if results[index][0]}
+        if not outputs:
+            errors = [error for _, error in results.values() if error is not None]
+            if errors:
+                raise errors[-1]
+        return outputs
+    
+    def summarize(self, chunks: List[List[str]], map_function: Callable[..., Optional[str]],
+                  combine_function: Callable[..., Optional[str]],
+                  final_function: Optional[Callable[..., Optional[str]]] = None
+                  ) -> Tuple[Optional[str], Dict[str, int]]:
+        """
+        Map-Reduce über vorbereitete Teilstücke
+        
+        Map- und Combine-Funktion erhalten eine Liste von Eingaben und werden je
+        Schritt zuerst mit cached_only=True aufgerufen: Sie liefern dann nur eine
+        bereits gespeicherte Antwort (oder None), ohne den Anbieter anzufragen.
+        
+        Fehlgeschlagene Teilstücke fallen weg; wie viele Antworten das Ergebnis
+        noch abdeckt, erhält die abschließende Auswertung als Schlüsselwort-Argumente
+        answers und total_answers und der Aufrufer in der Abdeckung.
+        
+        Args:
+            chunks: Teilstücke aus chunk_texts
+            map_function: Zusammenfassung eines Teilstücks (Liste von Antworten)
+            combine_function: Verdichtung mehrerer Teilzusammenfassungen
+            final_function: Abschließende Auswertung der verbleibenden Zusammenfassungen
+                (Standard: combine_function)
+                
+        Returns:
+            Tuple (Gesamtergebnis oder None, Abdeckung mit 'answers', 'total_answers',
+            'chunks' und 'failed_chunks')
+        """
+        coverage = {
+            'answers': 0,
+            'total_answers': sum(len(chunk) for chunk in chunks),
+            'chunks': len(chunks),
+            'failed_chunks': 0
+        }
+        if not chunks:
+            return None, coverage
+        
+        mapped = self._dispatch(chunks, map_function)
+        coverage['failed_chunks'] = len(chunks) - len(mapped)
+        partials = [mapped[index] for index in sorted(mapped)]
+        # Anzahl Antworten hinter jeder Teilzusammenfassung
+        answers = [len(chunks[index]) for index in sorted(mapped)]
+        
+        # Mehrstufig verdichten, bis ein Reduce-Schritt alle Teilergebnisse aufnehmen kann
+        while len(partials) > self.reduce_fan_in:
+            starts = range(0, len(partials), self.reduce_fan_in)
+            combined = self._dispatch([partials[start:start + self.reduce_fan_in] for start in starts], combine_function)
+            group_answers = [sum(answers[start:start + self.reduce_fan_in]) for start in starts]
+            partials = [combined[index] for index in sorted(combined)]
+            answers = [group_answers[index] for index in sorted(combined)]
+        
+        coverage['answers'] = sum(answers)
+        if not partials:
+            return None, coverage
+        result = (final_function or combine_function)(
+            partials, answers=coverage['answers'], total_answers=coverage['total_answers']
+        )
+        return result, coverage
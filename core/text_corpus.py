@@ -0,0 +1,143 @@
+"""
+IQES Text Corpus - Offene Antworten als Langtabelle mit einmaliger Tokenisierung
+Grundlage für Sentiment, Schlagwörter und Suche über alle Textantworten
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sklearn.feature_extraction.text import CountVectorizer
+
+
+# Wörter sowie satzgliedernde Zeichen (werden zum Grenz-Token)
+_TOKEN_PATTERN = re.compile(r"[^\W\d_]+|[.,;:!?]")
+CLAUSE_BOUNDARY = '|'
+
+ANSWER_COLUMNS = [
+    'Fragenummer', 'Frage_ID', 'Frage', 'Thema', 'Bildungsgang',
+    'Datum', 'Evaluationstyp', 'Zeitraum', 'Quelldatei'
+]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Kleingeschriebene Wort-Tokens; Satzzeichen werden zu CLAUSE_BOUNDARY
+    
+    Args:
+        text: Antworttext
+        
+    Returns:
+        Token-Liste
+    """
+    return [token if token.isalpha() else CLAUSE_BOUNDARY for token in _TOKEN_PATTERN.findall(str(text).lower())]
+
+
+def document_term_matrix(token_lists: List[List[str]],
+                         terms: Callable[[List[str]], List[str]]) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    """
+    Dünn besetzte Dokument-Term-Matrix aus bereits tokenisierten Texten
+    
+    Args:
+        token_lists: Token-Liste je Dokument
+        terms: Abbildung Token-Liste -> Terme (z.B. Stammformen, Negationsmarker, Bigramme)
+        
+    Returns:
+        Tuple (Zählmatrix (n_dokumente, n_terme), Vokabular)
+    """
+    if not token_lists:
+        return sparse.csr_matrix((0, 0), dtype=np.int64), np.array([], dtype=object)
+    
+    vectorizer = CountVectorizer(analyzer=terms)
+    try:
+        matrix = vectorizer.fit_transform(token_lists).tocsr()
+    except ValueError:
+        # Kein einziger Term in allen Dokumenten
+        return sparse.csr_matrix((len(token_lists), 0), dtype=np.int64), np.array([], dtype=object)
+    return matrix, vectorizer.get_feature_names_out()
+
+
+class IQESTextCorpus:
+    """
+    Alle offenen Antworten eines Datenstands
+    
+    answers enthält eine Zeile je Antwort mit den Metadaten der Frage und der
+    Spalte 'Zeile' (Index der Fragezeile in den Quelldaten), sodass gefilterte
+    Daten über ihren Index auf die Antworten abgebildet werden. Die Texte werden
+    beim Aufbau einmal tokenisiert; abgeleitete Dokument-Term-Matrizen werden je
+    Name nur einmal berechnet. Analysen legen ihre Ergebnisse als Spalten in
+    answers ab (z.B. 'Sentiment').
+    
+    Mit einem Deduplikator (IQESAnswerDeduplicator) enthält answers je Gruppe
+    nahezu gleicher Antworten nur einen Repräsentanten; 'Anzahl' gibt an, wie
+    viele Antworten er vertritt, und ist das Gewicht für alle Auswertungen.
+    """
+    
+    def __init__(self, data: pd.DataFrame, deduplicator: Optional[object] = None):
+        self._matrices: Dict[str, Tuple[sparse.csr_matrix, np.ndarray]] = {}
+        
+        if data.empty or 'Textantworten' not in data.columns:
+            self.answers = pd.DataFrame({'Zeile': pd.Series(dtype=object), 'Antwort': pd.Series(dtype=str),
+                                         'Anzahl': pd.Series(dtype=np.int64)})
+            self.tokens: List[List[str]] = []
+            return
+        
+        rows = data[data['Textantworten'].apply(lambda value: isinstance(value, list) and len(value) > 0)]
+        columns = [col for col in ANSWER_COLUMNS if col in rows.columns]
+        answers = rows[columns + ['Textantworten']].explode('Textantworten')
+        answers = answers.rename(columns={'Textantworten': 'Antwort'})
+        answers['Antwort'] = answers['Antwort'].astype(str)
+        answers.insert(0, 'Zeile', answers.index)
+        answers = answers.reset_index(drop=True)
+        
+        if deduplicator is not None:
+            answers = deduplicator.collapse(answers)
+        else:
+            answers['Anzahl'] = 1
+        
+        self.answers = answers
+        self.tokens = [tokenize(text) for text in self.answers['Antwort']]
+    
+    def __len__(self) -> int:
+        return len(self.answers)
+    
+    @property
+    def n_answers(self) -> int:
+        """Anzahl der ursprünglichen Antworten (Summe der Gewichte)"""
+        return int(self.answers['Anzahl'].sum())
+    
+    @property
+    def weights(self) -> np.ndarray:
+        """Gewicht (Anzahl vertretener Antworten) je Zeile von answers"""
+        return self.answers['Anzahl'].to_numpy(dtype=float)
+    
+    def document_term_matrix(self, name: str, terms: Callable[[List[str]], List[str]]) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        """
+        Dokument-Term-Matrix über alle Antworten (einmal je Name berechnet)
+        
+        Args:
+            name: Cache-Name der Term-Abbildung
+            terms: Abbildung Token-Liste -> Terme
+            
+        Returns:
+            Tuple (Zählmatrix (n_antworten, n_terme), Vokabular)
+        """
+        if name not in self._matrices:
+            self._matrices[name] = document_term_matrix(self.tokens, terms)
+        return self._matrices[name]
+    
+    def row_mask(self, data: pd.DataFrame) -> np.ndarray:
+        """
+        Antworten, deren Fragezeile in den (gefilterten) Daten enthalten ist
+        
+        Args:
+            data: Gefilterte IQES-Daten (Index der Quelldaten)
+            
+        Returns:
+            Boolesche Maske über answers
+        """
+        if self.answers.empty:
+            return np.zeros(0, dtype=bool)
+        return self.answers['Zeile'].isin(data.index).to_numpy()
@@ -0,0 +1,173 @@
+"""
+IQES Text Dedup - Zusammenfassen nahezu gleicher Textantworten
+Normalisierter Schlüssel plus MinHash/LSH; je Gruppe bleibt eine repräsentative Antwort mit ihrer Anzahl
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from typing import Iterable, List, Optional
+
+from config.themes import TEXT_DEDUP_CONFIG
+from core.minhash import IQESMinHasher
+from core.question_matching import IQESQuestionMatcher
+from core.sentiment import GERMAN_NEGATIONS, IQESSentimentScorer
+from core.text_corpus import CLAUSE_BOUNDARY, tokenize
+
+
+# Binde- und Schrägstriche innerhalb eines Worts ("W-LAN", "Lehrer/innen")
+_WORD_JOINER = re.compile(r'(?<=\w)[-‐/](?=\w)')
+
+
+class IQESAnswerDeduplicator:
+    """
+    Gruppiert wiederholte und nahezu gleiche Antworten
+    
+    Stufe 1 fasst Antworten mit gleichem normalisiertem Schlüssel zusammen
+    (Kleinschreibung, ohne Satzzeichen und Stoppwörter, Bindestriche in Wörtern
+    entfernt): "WLAN ist schlecht" und "W-LAN schlecht!!" ergeben beide
+    "wlan schlecht". Stufe 2 verbindet die eindeutigen Schlüssel über
+    MinHash/LSH, wenn ihre geschätzte Jaccard-Ähnlichkeit mindestens threshold
+    beträgt. Negationen sind nie Stoppwörter.
+    
+    Verbunden werden nur Antworten mit gleicher Polaritäts-Signatur (Negationen
+    und Sentiment-Terme, siehe signature): "Der Unterricht ist gut" und "Der
+    Unterricht ist nicht gut" oder "verständlich" und "unverständlich" bleiben
+    trotz hoher Zeichenähnlichkeit getrennt. Zusammengefasst wird außerdem nur
+    innerhalb einer Fragezeile (eine Frage einer Quelldatei), damit jede Gruppe
+    die Metadaten ihrer Antworten behält.
+    """
+    
+    def __init__(self, stop_words: Iterable[str] = (), threshold: float = TEXT_DEDUP_CONFIG['threshold'],
+                 hasher: Optional[IQESMinHasher] = None, sentiment: Optional[IQESSentimentScorer] = None):
+        self.stop_words = set(stop_words) - set(GERMAN_NEGATIONS)
+        self.threshold = threshold
+        self.matcher = IQESQuestionMatcher(threshold=threshold, hasher=hasher)
+        self.sentiment = sentiment or IQESSentimentScorer()
+    
+    def normalize(self, text: str) -> str:
+        """
+        Vergleichsschlüssel einer Antwort
+        
+        Args:
+            text: Antworttext
+            
+        Returns:
+            Normalisierter Schlüssel (nur Stoppwörter: normalisierter Volltext)
+        """
+        tokens = tokenize(_WORD_JOINER.sub('', str(text)))
+        key = ' '.join(token for token in tokens if token != CLAUSE_BOUNDARY and token not in self.stop_words)
+        # Antworten nur aus Stoppwörtern ("Nein", "Nichts") nicht alle auf denselben leeren Schlüssel legen
+        return key or self.matcher.hasher.normalize(text)
+    
+    def signature(self, text: str) -> str:
+        """
+        Polaritäts-Signatur einer Antwort
+        
+        Args:
+            text: Antworttext
+            
+        Returns:
+            Sortierte Negationen und Sentiment-Terme (mit Negationsmarker) als Zeichenkette
+        """
+        tokens = tokenize(text)
+        negations = {token for token in tokens if token in GERMAN_NEGATIONS}
+        return ' '.join(sorted(negations) + sorted(set(self.sentiment.terms(tokens))))
+    
+    def cluster(self, texts: List[str], groups: Optional[Iterable] = None) -> np.ndarray:
+        """
+        Gruppennummer je Text
+        
+        Nahezu gleiche Texte werden nur innerhalb derselben Gruppe (z.B.
+        Fragezeile) und mit gleicher Polaritäts-Signatur verbunden.
+        
+        Args:
+            texts: Antworttexte
+            groups: Optional Gruppe je Text (None: alle Texte in einer Gruppe)
+            
+        Returns:
+            Gruppennummer je Text (0..n_gruppen-1)
+        """
+        if not texts:
+            return np.empty(0, dtype=np.int64)
+        
+        groups = np.zeros(len(texts), dtype=np.int64) if groups is None else pd.factorize(pd.Series(list(groups)))[0]
+        # Schlüssel und Signatur je eindeutigem Text nur einmal berechnen
+        text_codes, unique_texts = pd.factorize(pd.Series(texts, dtype=object))
+        signatures = np.array([self.signature(text) for text in unique_texts], dtype=object)
+        normalized = np.array([self.normalize(text) for text in unique_texts], dtype=object)
+        keys = pd.DataFrame({
+            'group': groups,
+            'signature': signatures[text_codes],
+            'key': normalized[text_codes]
+        })
+        # Stufe 1: gleicher Schlüssel in gleicher Gruppe und Signatur
+        key_codes = keys.groupby(['group', 'signature', 'key'], sort=False).ngroup().to_numpy()
+        unique_keys = keys.drop_duplicates(['group', 'signature', 'key'])
+        blocks = unique_keys.groupby(['group', 'signature'], sort=False).ngroup().to_numpy()
+        
+        # Stufe 2: ein MinHash/LSH-Durchlauf über alle Blöcke (Gruppe × Signatur) mit mehr als
+        # einem Schlüssel; Kandidaten nur innerhalb eines Blocks, damit Union-Find keine Blöcke verbindet
+        near = np.arange(len(unique_keys))
+        shared = np.flatnonzero(np.bincount(blocks)[blocks] > 1)
+        if len(shared):
+            labels = self.matcher.cluster_texts(unique_keys['key'].iloc[shared].tolist(), blocks=blocks[shared])
+            near[shared] = len(unique_keys) + labels
+        return pd.factorize(near[key_codes])[0]
+    
+    def collapse(self, answers: pd.DataFrame, text_column: str = 'Antwort',
+                 group_column: str = 'Zeile') -> pd.DataFrame:
+        """
+        Eine Zeile je Gruppe nahezu gleicher Antworten
+        
+        Repräsentant ist die häufigste Originalformulierung der Gruppe (bei
+        Gleichstand die zuerst genannte); 'Anzahl' enthält die Zahl der
+        zusammengefassten Antworten. Innerhalb einer Fragezeile sind die
+        Gruppen nach Anzahl absteigend sortiert.
+        
+        Args:
+            answers: Langtabelle mit einer Zeile je Antwort
+            text_column: Spalte mit dem Antworttext
+            group_column: Spalte der Fragezeile (nur innerhalb wird zusammengefasst)
+            
+        Returns:
+            Neue Langtabelle mit Spalte 'Anzahl'
+        """
+        if answers.empty:
+            return answers.assign(Anzahl=pd.Series(dtype=np.int64))
+        
+        texts = answers[text_column].astype(str).tolist()
+        group = self.cluster(texts, answers[group_column].to_numpy())
+        
+        frame = pd.DataFrame({'group': group, 'text': texts, 'position': np.arange(len(texts))})
+        variants = frame.groupby(['group', 'text'], sort=False).agg(
+            count=('position', 'size'), first=('position', 'min')
+        ).reset_index()
+        # Häufigste Formulierung je Gruppe, bei Gleichstand die früheste
+        variants = variants.sort_values(['group', 'count', 'first'], ascending=[True, False, True])
+        representative = variants.drop_duplicates('group').set_index('group')['first']
+        multiplicity = frame.groupby('group').size()
+        
+        collapsed = answers.iloc[representative.sort_index().to_numpy()].copy()
+        collapsed['Anzahl'] = multiplicity.sort_index().to_numpy()
+        
+        # Innerhalb jeder Fragezeile: häufige Aussagen zuerst (z.B. für Stichproben in KI-Prompts)
+        order = np.lexsort((-collapsed['Anzahl'].to_numpy(), pd.factorize(collapsed[group_column])[0]))
+        return collapsed.iloc[order].reset_index(drop=True)
+
+
+def with_multiplicity(texts: Iterable[str], counts: Optional[Iterable[int]] = None) -> List[str]:
+    """
+    Texte mit Häufigkeitsangabe für KI-Prompts ("WLAN ist schlecht (12×)")
+    
+    Args:
+        texts: Repräsentative Antworten
+        counts: Anzahl je Antwort (None: unverändert)
+        
+    Returns:
+        Texte, bei Anzahl > 1 mit Häufigkeitsangabe
+    """
+    texts = [str(text) for text in texts]
+    if counts is None:
+        return texts
+    return [f"{text} ({int(count)}×)" if count > 1 else text for text, count in zip(texts, counts)]
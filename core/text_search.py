@@ -0,0 +1,330 @@
+"""
+IQES Text Search - Volltextsuche über offene Antworten
+Persistenter SQLite-FTS5-Index, inkrementell je Quelldatei aufgebaut, mit BM25-Ranking und Hervorhebung
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from config.themes import TEXT_SEARCH_CONFIG
+
+
+SOURCE_COLUMNS = ['Quelldatei', 'Datum', 'Bildungsgang', 'Evaluationstyp']
+
+_QUERY_TERM = re.compile(r"[^\W_]+")
+
+
+class IQESTextSearchIndex:
+    """
+    Invertierter Index über alle Textantworten
+    
+    Jede Quelle (Datei mit Datum, Bildungsgang und Evaluationstyp) wird über
+    einen Hash ihrer Fragen und Antworten identifiziert und nur einmal
+    indexiert: Kommt ein weiterer Zeitraum hinzu, werden nur dessen Antworten
+    aufgenommen. Jede Antwort trägt den Schlüssel ihrer Fragezeile, sodass
+    Suchen exakt auf gefilterte Daten (Bildungsgang, Zeitraum, Frage)
+    eingeschränkt werden.
+    
+    Der Tokenizer (unicode61 ohne Diakritika) behandelt Umlaute wie ihre
+    Grundbuchstaben; Suchbegriffe werden als Wortanfänge gesucht, sodass
+    "lehrer" auch "Lehrerin" und "Lehrerzimmer" findet. Ist der Pfad nicht
+    beschreibbar, wird ein Index im Arbeitsspeicher verwendet.
+    
+    Da der Index über Sitzungen hinweg bestehen bleibt, wird er bei jedem
+    Abgleich bereinigt: Quellen, die seit ttl_days nicht mehr geladen wurden,
+    und über max_sources hinaus die am längsten nicht geladenen Quellen werden
+    samt ihren Antworten entfernt. Quellen der aktuellen Daten bleiben erhalten.
+    """
+    
+    def __init__(self, path: str = TEXT_SEARCH_CONFIG['path'],
+                 tokenizer: str = TEXT_SEARCH_CONFIG['tokenizer'],
+                 prefix_lengths: str = TEXT_SEARCH_CONFIG['prefix_lengths'],
+                 ttl_days: Optional[float] = TEXT_SEARCH_CONFIG['ttl_days'],
+                 max_sources: Optional[int] = TEXT_SEARCH_CONFIG['max_sources']):
+        self.tokenizer = tokenizer
+        self.prefix_lengths = prefix_lengths
+        self.ttl_days = ttl_days
+        self.max_sources = max_sources
+        self._lock = threading.Lock()
+        
+        try:
+            if path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._create_tables()
+            self.path = path
+        except (OSError, sqlite3.Error):
+            self._connection = sqlite3.connect(':memory:', check_same_thread=False)
+            self._create_tables()
+            self.path = ':memory:'
+    
+    def _create_tables(self):
+        """Legt Quellen-Tabelle und FTS5-Index an, falls sie noch nicht existieren"""
+        with self._connection:
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS sources (
+                    source TEXT PRIMARY KEY,
+                    quelldatei TEXT,
+                    n_answers INTEGER NOT NULL,
+                    indexed REAL NOT NULL,
+                    last_seen REAL
+                )
+            """)
+            # Indizes aus früheren Versionen ohne 'last_seen' ergänzen
+            columns = {row[1] for row in self._connection.execute("PRAGMA table_info(sources)")}
+            if 'last_seen' not in columns:
+                self._connection.execute("ALTER TABLE sources ADD COLUMN last_seen REAL")
+                self._connection.execute("UPDATE sources SET last_seen = indexed")
+            self._connection.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS answers USING fts5(
+                    antwort,
+                    frage UNINDEXED, fragenummer UNINDEXED, bildungsgang UNINDEXED,
+                    datum UNINDEXED, evaluationstyp UNINDEXED, row_key UNINDEXED, source UNINDEXED,
+                    tokenize = '{self.tokenizer}', prefix = '{self.prefix_lengths}'
+                )
+            """)
+    
+    @staticmethod
+    def _hash(*parts) -> str:
+        """Stabiler Hash über Textteile (mit Längenpräfix)"""
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            encoded = str(part).encode('utf-8')
+            digest.update(len(encoded).to_bytes(8, 'big'))
+            digest.update(encoded)
+        return digest.hexdigest()
+    
+    def _open_rows(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Fragezeilen mit mindestens einer Textantwort"""
+        if data.empty or 'Textantworten' not in data.columns:
+            return data.iloc[0:0]
+        return data[data['Textantworten'].apply(lambda value: isinstance(value, list) and len(value) > 0)]
+    
+    def _source_keys(self, rows: pd.DataFrame) -> pd.Series:
+        """Quellen-Schlüssel je Fragezeile: Metadaten der Datei und Inhalt aller ihrer offenen Antworten"""
+        columns = [col for col in SOURCE_COLUMNS if col in rows.columns]
+        meta = rows[columns].astype(str).agg('\x1f'.join, axis=1) if columns else pd.Series('', index=rows.index)
+        content = {
+            group: self._hash(group, *[
+                part for _, row in rows.loc[index].iterrows()
+                for part in [row.get('Fragenummer', ''), row.get('Frage', '')] + list(row['Textantworten'])
+            ])
+            for group, index in meta.groupby(meta, sort=False).groups.items()
+        }
+        return meta.map(content)
+    
+    def row_keys(self, data: pd.DataFrame) -> pd.Series:
+        """
+        Schlüssel der Fragezeilen im Index
+        
+        Args:
+            data: IQES-Daten (auch gefiltert)
+            
+        Returns:
+            Series Zeilenindex -> Schlüssel (nur Zeilen mit Textantworten)
+        """
+        rows = self._open_rows(data)
+        if rows.empty:
+            return pd.Series(dtype=str)
+        sources = self._source_keys(rows)
+        return pd.Series(
+            [self._hash(source, row.get('Fragenummer', ''), row.get('Frage', ''))
+             for source, (_, row) in zip(sources, rows.iterrows())],
+            index=rows.index
+        )
+    
+    def sync(self, data: pd.DataFrame) -> int:
+        """
+        Nimmt alle noch nicht indexierten Quellen auf und bereinigt den Index (siehe prune)
+        
+        Args:
+            data: Alle geladenen IQES-Daten
+            
+        Returns:
+            Anzahl neu indexierter Antworten
+        """
+        rows = self._open_rows(data)
+        if rows.empty:
+            return 0
+        
+        sources = self._source_keys(rows)
+        current = json.dumps(sources.unique().tolist())
+        now = time.time()
+        # Prüfen und Einfügen unter einem Lock: parallele Sitzungen indexieren eine Quelle nur einmal
+        with self._lock, self._connection:
+            known = {
+                source for (source,) in self._connection.execute(
+                    "SELECT source FROM sources WHERE source IN (SELECT value FROM json_each(?))", (current,)
+                )
+            }
+            self._connection.execute(
+                "UPDATE sources SET last_seen = ? WHERE source IN (SELECT value FROM json_each(?))", (now, current)
+            )
+            
+            records = []
+            counts = {}
+            for index, row in rows[~sources.isin(known)].iterrows():
+                source = sources[index]
+                row_key = self._hash(source, row.get('Fragenummer', ''), row.get('Frage', ''))
+                datum = pd.Timestamp(row['Datum']).isoformat() if pd.notna(row.get('Datum')) else ''
+                for answer in row['Textantworten']:
+                    records.append((
+                        str(answer), str(row.get('Frage', '')), str(row.get('Fragenummer', '')),
+                        str(row.get('Bildungsgang', '')), datum, str(row.get('Evaluationstyp', '')), row_key, source
+                    ))
+                counts.setdefault(source, [row.get('Quelldatei'), 0])[1] += len(row['Textantworten'])
+            
+            self._connection.executemany("INSERT INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?)", records)
+            self._connection.executemany(
+                "INSERT INTO sources (source, quelldatei, n_answers, indexed, last_seen) VALUES (?, ?, ?, ?, ?)",
+                [(source, filename, n_answers, now, now) for source, (filename, n_answers) in counts.items()]
+            )
+            self._prune(now, current)
+        return len(records)
+    
+    def _prune(self, now: float, protected: str = '[]') -> int:
+        """
+        Entfernt abgelaufene und überzählige Quellen samt Antworten (Aufruf unter Lock und Transaktion)
+        
+        Args:
+            now: Aktueller Zeitpunkt (Sekunden seit Epoche)
+            protected: JSON-Liste der Quellen, die erhalten bleiben
+            
+        Returns:
+            Anzahl entfernter Quellen
+        """
+        candidates = "SELECT source FROM sources WHERE source NOT IN (SELECT value FROM json_each(?))"
+        removed = set()
+        if self.ttl_days is not None:
+            removed.update(source for (source,) in self._connection.execute(
+                candidates + " AND last_seen < ?", (protected, now - self.ttl_days * 86400)
+            ))
+        if self.max_sources is not None:
+            (total,) = self._connection.execute("SELECT COUNT(*) FROM sources").fetchone()
+            excess = total - len(removed) - self.max_sources
+            if excess > 0:
+                removed.update(source for (source,) in self._connection.execute(
+                    candidates + " AND source NOT IN (SELECT value FROM json_each(?)) ORDER BY last_seen LIMIT ?",
+                    (protected, json.dumps(sorted(removed)), excess)
+                ))
+        if removed:
+            stale = json.dumps(sorted(removed))
+            self._connection.execute("DELETE FROM answers WHERE source IN (SELECT value FROM json_each(?))", (stale,))
+            self._connection.execute("DELETE FROM sources WHERE source IN (SELECT value FROM json_each(?))", (stale,))
+        return len(removed)
+    
+    def prune(self) -> int:
+        """
+        Bereinigt den Index nach ttl_days und max_sources
+        
+        Returns:
+            Anzahl entfernter Quellen
+        """
+        with self._lock, self._connection:
+            return self._prune(time.time())
+    
+    @staticmethod
+    def build_query(text: str) -> Optional[str]:
+        """
+        FTS5-Abfrage aus einer Benutzereingabe
+        
+        Alle Wörter müssen vorkommen, jeweils als Wortanfang; FTS-Sonderzeichen
+        der Eingabe werden ignoriert.
+        
+        Args:
+            text: Suchbegriffe
+            
+        Returns:
+            Abfrage oder None, wenn die Eingabe kein Wort enthält
+        """
+        terms = _QUERY_TERM.findall(str(text))
+        if not terms:
+            return None
+        return ' '.join(f'"{term}"*' for term in terms)
+    
+    def search(self, text: str, row_keys: Optional[Iterable[str]] = None, limit: int = TEXT_SEARCH_CONFIG['max_results'],
+               highlight: tuple = ('**', '**')) -> pd.DataFrame:
+        """
+        Rangierte Suche (BM25) mit hervorgehobenen Treffern
+        
+        Args:
+            text: Suchbegriffe
+            row_keys: Nur Antworten dieser Fragezeilen (aus row_keys der gefilterten Daten); None = alle
+            limit: Maximale Trefferzahl
+            highlight: Markierung vor und nach jedem Treffer
+            
+        Returns:
+            DataFrame mit 'Antwort', 'Treffer' (hervorgehoben), 'Frage', 'Fragenummer',
+            'Bildungsgang', 'Datum', 'Evaluationstyp' und 'Rang' (kleiner = besser)
+        """
+        columns = ['Antwort', 'Treffer', 'Frage', 'Fragenummer', 'Bildungsgang', 'Datum', 'Evaluationstyp', 'Rang']
+        query = self.build_query(text)
+        if query is None:
+            return pd.DataFrame(columns=columns)
+        
+        sql = """
+            SELECT antwort, highlight(answers, 0, ?, ?), frage, fragenummer, bildungsgang,
+                   datum, evaluationstyp, bm25(answers)
+            FROM answers
+            WHERE answers MATCH ?
+        """
+        params = list(highlight) + [query]
+        if row_keys is not None:
+            sql += " AND row_key IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(list(row_keys)))
+        sql += " ORDER BY bm25(answers) LIMIT ?"
+        params.append(int(limit))
+        
+        with self._lock:
+            results = pd.DataFrame(self._connection.execute(sql, params).fetchall(), columns=columns)
+        results['Datum'] = pd.to_datetime(results['Datum'], errors='coerce')
+        return results
+    
+    def count(self, text: str, row_keys: Optional[Iterable[str]] = None) -> int:
+        """
+        Anzahl aller Treffer (ohne Limit)
+        
+        Args:
+            text: Suchbegriffe
+            row_keys: Nur Antworten dieser Fragezeilen; None = alle
+            
+        Returns:
+            Trefferzahl
+        """
+        query = self.build_query(text)
+        if query is None:
+            return 0
+        sql = "SELECT COUNT(*) FROM answers WHERE answers MATCH ?"
+        params = [query]
+        if row_keys is not None:
+            sql += " AND row_key IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(list(row_keys)))
+        with self._lock:
+            return self._connection.execute(sql, params).fetchone()[0]
+    
+    def stats(self) -> dict:
+        """
+        Umfang des Index
+        
+        Returns:
+            Dictionary mit 'sources', 'answers' und 'path'
+        """
+        with self._lock:
+            sources, answers = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(n_answers), 0) FROM sources"
+            ).fetchone()
+        return {'sources': sources, 'answers': answers, 'path': self.path}
+    
+    def clear(self):
+        """Leert den Index"""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM answers")
+            self._connection.execute("DELETE FROM sources")
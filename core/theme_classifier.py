@@ -0,0 +1,95 @@
+"""
+IQES Theme Classifier - Regelbasierte Themenzuordnung
+Kompiliert Schlüsselwort-Regeln aus config/themes.py zu einem regulären Ausdruck
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+
+
+class IQESThemeClassifier:
+    """
+    Ordnet Texten (Thema, Bereich) die erste passende Regel einer Regeltabelle zu
+    
+    Alle Regeln werden zu einem einzigen Ausdruck mit je einer Lookahead-Alternative
+    pro Regel kompiliert. Die Alternativen werden in Tabellenreihenfolge geprüft,
+    damit gilt wie bisher "erste passende Regel gewinnt". Ausgewertet wird nur
+    auf den eindeutigen Texten, das Ergebnis wird über Faktor-Codes zurückgespielt.
+    """
+    
+    def __init__(self, rules: List[Dict], default: Dict):
+        self.rules = rules
+        self.default = default
+        self.pattern = self._compile(rules)
+    
+    def _compile(self, rules: List[Dict]) -> re.Pattern:
+        """
+        Kompiliert die Regeltabelle zu einem regulären Ausdruck
+        
+        Args:
+            rules: Regeln mit 'keywords'
+            
+        Returns:
+            Kompilierter Ausdruck mit einer benannten Gruppe je Regel
+        """
+        branches = [
+            f"(?=.*?(?:{'|'.join(re.escape(keyword.lower()) for keyword in rule['keywords'])}))(?P<r{index}>)"
+            for index, rule in enumerate(rules)
+        ]
+        return re.compile(f"^(?:{'|'.join(branches)})", re.DOTALL)
+    
+    def match(self, text: str) -> int:
+        """
+        Ermittelt die erste passende Regel für einen Text
+        
+        Args:
+            text: Zu klassifizierender Text
+            
+        Returns:
+            Index der Regel oder -1 (Standard)
+        """
+        if not text:
+            return -1
+        
+        result = self.pattern.match(str(text).lower())
+        return int(result.lastgroup[1:]) if result else -1
+    
+    def classify(self, values: pd.Series) -> np.ndarray:
+        """
+        Regel-Index je Zeile, berechnet nur auf den eindeutigen Werten
+        
+        Args:
+            values: Texte (z.B. Spalte 'Thema' oder 'Bereich')
+            
+        Returns:
+            Array mit Regel-Index je Zeile (-1 = Standard)
+        """
+        codes, uniques = pd.factorize(values)
+        unique_rules = np.array([self.match(value) for value in uniques] + [-1], dtype=np.int64)
+        # Code -1 (fehlender Wert) zeigt auf den angehängten Standard-Eintrag
+        return unique_rules[codes]
+    
+    def assign(self, values: pd.Series) -> pd.DataFrame:
+        """
+        Liefert die Attribute der passenden Regel je Zeile
+        
+        Args:
+            values: Texte (z.B. Spalte 'Thema' oder 'Bereich')
+            
+        Returns:
+            DataFrame (gleicher Index) mit allen Regel-Attributen und 'Regel' zur Nachvollziehbarkeit
+        """
+        rule_index = self.classify(values)
+        
+        attributes = [key for key in self.default if key != 'rule']
+        table = pd.DataFrame(
+            [[rule.get(key, self.default[key]) for key in attributes] + [rule['rule']] for rule in self.rules] +
+            [[self.default[key] for key in attributes] + [self.default['rule']]],
+            columns=attributes + ['Regel']
+        )
+        
+        result = table.iloc[np.where(rule_index < 0, len(self.rules), rule_index)]
+        result.index = values.index
+        return result
@@ -3,12 +3,16 @@ IQES Timeline Analyzer - Zeitreihenanalyse für IQES-Daten
 Spezialisiert auf Antwortskala-Fragen (1-4 Bewertung) und Trend-Analysen
 """
 
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from typing import List, Dict, Tuple, Optional
 from datetime import datetime
 
+from core.significance import IQESSignificanceTester
+from core.period_index import IQESPeriodIndex
+
 
 class IQESTimelineAnalyzer:
     """
@@ -17,7 +21,9 @@ class IQESTimelineAnalyzer:
     """
     
     def __init__(self):
-        self.trend_threshold = 0.1  # Schwellenwert für signifikante Trends
+        self.trend_threshold = 0.1  # Schwellenwert für relevante Trends
+        self.significance_tester = IQESSignificanceTester()
+        self.period_index = IQESPeriodIndex()
         self.colors = [
             '#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
             '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf'
@@ -49,6 +55,34 @@ class IQESTimelineAnalyzer:
         
         return scale_data
     
+    def resample_periods(self, data: pd.DataFrame, granularity: str = 'Datum') -> pd.DataFrame:
+        """
+        Bündelt Evaluationszeiträume auf Monat, Quartal, Schulhalbjahr oder Schuljahr
+        
+        Alle übrigen Methoden gruppieren nach 'Datum' und können danach unverändert
+        auf den gebündelten Daten arbeiten.
+        
+        Args:
+            data: IQES-Daten (mit vorberechneten Zeitraum-Codes aus IQESPeriodIndex)
+            granularity: 'Datum' (unverändert), 'Monat', 'Quartal', 'Halbjahr' oder 'Schuljahr'
+            
+        Returns:
+            Daten mit gebündeltem 'Datum' und Kategorie-Spalte 'Zeitraum'
+        """
+        return self.period_index.resample(data, granularity)
+    
+    def question_key(self, data: pd.DataFrame) -> str:
+        """
+        Spalte, über die Einzelfragen zeitlich verknüpft werden
+        
+        Args:
+            data: IQES-Daten
+            
+        Returns:
+            'Frage_ID' (kanonisch, aus IQESQuestionMatcher) falls vorhanden, sonst 'Fragenummer'
+        """
+        return 'Frage_ID' if 'Frage_ID' in data.columns else 'Fragenummer'
+    
     def identify_multi_period_questions(self, data: pd.DataFrame) -> List[str]:
         """
         Identifiziert Unterfragen, die in mehreren Zeiträumen evaluiert wurden
@@ -57,14 +91,15 @@ class IQESTimelineAnalyzer:
             data: IQES-Daten (bereits gefiltert für Antwortskala)
             
         Returns:
-            Liste von Unterfragen-Nummern (z.B. "7.1", "7.2") die in ≥2 Zeiträumen vorhanden sind
+            Liste von Fragen-IDs (z.B. "7.1", "7.2") die in ≥2 Zeiträumen vorhanden sind
         """
-        if data.empty or 'Fragenummer' not in data.columns or 'Datum' not in data.columns:
+        key = self.question_key(data)
+        if data.empty or key not in data.columns or 'Datum' not in data.columns:
             return []
         
-        # Gruppiere nach Unterfrage-Nummer (Fragenummer) und zähle einzigartige Zeiträume
-        question_timeline = data.groupby(['Fragenummer', 'Datum'])['Bewertung'].mean().reset_index()
-        question_counts = question_timeline.groupby('Fragenummer')['Datum'].count()
+        # Gruppiere nach Frage (kanonische ID bzw. Fragenummer) und zähle einzigartige Zeiträume
+        question_timeline = data.groupby([key, 'Datum'])['Bewertung'].mean().reset_index()
+        question_counts = question_timeline.groupby(key)['Datum'].count()
         
         # Nur Unterfragen mit mindestens 2 Zeiträumen
         multi_period_questions = question_counts[question_counts >= 2].index.tolist()
@@ -75,50 +110,69 @@ class IQESTimelineAnalyzer:
         """
         Berechnet Trend-Metriken für gegebene Gruppierung
         
+        Sind Antwortverteilungen vorhanden, wird die Veränderung zwischen erstem und
+        aktuellem Zeitraum zusätzlich auf Signifikanz getestet. Ein Trend gilt dann nur
+        als Verbesserung/Verschlechterung, wenn er den Schwellenwert überschreitet UND
+        signifikant ist – kleine Stichproben erzeugen so keine Scheintrends mehr.
+        
         Args:
             data: Zeitreihen-Daten
             group_by: Gruppierungs-Spalte ('Fragenummer', 'Thema', etc.)
             
         Returns:
-            DataFrame mit Trend-Metriken
+            DataFrame mit Trend-Metriken (inkl. p-Wert und Konfidenzintervall wenn verfügbar)
         """
         if data.empty or group_by not in data.columns:
             return pd.DataFrame()
         
         timeline_data = data.groupby([group_by, 'Datum'])['Bewertung'].mean().reset_index()
-        trend_results = []
+        timeline_data = timeline_data.sort_values([group_by, 'Datum'])
+        
+        trend_results = timeline_data.groupby(group_by).agg(
+            Erste_Bewertung=('Bewertung', 'first'),
+            Aktuelle_Bewertung=('Bewertung', 'last'),
+            Anzahl_Zeitraeume=('Datum', 'count'),
+            Erstes_Datum=('Datum', 'first'),
+            Letztes_Datum=('Datum', 'last')
+        ).reset_index()
+        trend_results = trend_results[trend_results['Anzahl_Zeitraeume'] >= 2]
+        
+        if trend_results.empty:
+            return pd.DataFrame()
         
-        for group_value in timeline_data[group_by].unique():
-            group_data = timeline_data[timeline_data[group_by] == group_value].sort_values('Datum')
-            
-            if len(group_data) >= 2:
-                first_val = group_data.iloc[0]['Bewertung']
-                latest_val = group_data.iloc[-1]['Bewertung']
-                trend_change = latest_val - first_val
-                
-                # Trend-Klassifikation
-                if trend_change > self.trend_threshold:
-                    trend_status = "📈 Verbessert"
-                    trend_icon = "📈"
-                elif trend_change < -self.trend_threshold:
-                    trend_status = "📉 Verschlechtert"
-                    trend_icon = "📉"
-                else:
-                    trend_status = "➡️ Stabil"
-                    trend_icon = "➡️"
-                
-                trend_results.append({
-                    group_by: group_value,
-                    'Erste_Bewertung': round(first_val, 2),
-                    'Aktuelle_Bewertung': round(latest_val, 2),
-                    'Trend_Change': round(trend_change, 2),
-                    'Trend_Status': trend_status,
-                    'Trend_Icon': trend_icon,
-                    'Anzahl_Zeitraeume': len(group_data),
-                    'Zeitspanne': f"{group_data.iloc[0]['Datum'].strftime('%Y-%m')} bis {group_data.iloc[-1]['Datum'].strftime('%Y-%m')}"
-                })
-        
-        return pd.DataFrame(trend_results)
+        trend_change = trend_results['Aktuelle_Bewertung'] - trend_results['Erste_Bewertung']
+        improving = trend_change > self.trend_threshold
+        declining = trend_change < -self.trend_threshold
+        
+        # Signifikanztests auf Basis der Antwortverteilungen
+        significance = self.significance_tester.compare_periods(data, group_by)
+        if not significance.empty:
+            trend_results = trend_results.merge(
+                significance[[group_by, 'p_Wert', 'KI_Unten', 'KI_Oben', 'Signifikant']],
+                on=group_by, how='left'
+            )
+            # Ohne testbare Verteilung bleibt der Schwellenwert allein maßgeblich
+            is_significant = trend_results['Signifikant'].where(trend_results['p_Wert'].notna(), True).astype(bool)
+            improving &= is_significant.to_numpy()
+            declining &= is_significant.to_numpy()
+        
+        trend_results['Trend_Icon'] = np.select([improving, declining], ["📈", "📉"], default="➡️")
+        trend_results['Trend_Status'] = np.select(
+            [improving, declining], ["📈 Verbessert", "📉 Verschlechtert"], default="➡️ Stabil"
+        )
+        trend_results['Erste_Bewertung'] = trend_results['Erste_Bewertung'].round(2)
+        trend_results['Aktuelle_Bewertung'] = trend_results['Aktuelle_Bewertung'].round(2)
+        trend_results['Trend_Change'] = trend_change.round(2).to_numpy()
+        trend_results['Zeitspanne'] = (
+            trend_results['Erstes_Datum'].dt.strftime('%Y-%m') + " bis " +
+            trend_results['Letztes_Datum'].dt.strftime('%Y-%m')
+        )
+        
+        columns = [group_by, 'Erste_Bewertung', 'Aktuelle_Bewertung', 'Trend_Change',
+                   'Trend_Status', 'Trend_Icon', 'Anzahl_Zeitraeume', 'Zeitspanne']
+        columns += [col for col in ['p_Wert', 'KI_Unten', 'KI_Oben', 'Signifikant'] if col in trend_results.columns]
+        
+        return trend_results[columns].reset_index(drop=True)
     
     def create_thematic_timeline_chart(self, data: pd.DataFrame) -> go.Figure:
         """
@@ -237,24 +291,19 @@ class IQESTimelineAnalyzer:
             return go.Figure()
         
         # Timeline-Daten erstellen
-        question_timeline = data.groupby(['Fragenummer', 'Datum'])['Bewertung'].mean().reset_index()
+        key = self.question_key(data)
+        question_timeline = data.groupby([key, 'Datum'])['Bewertung'].mean().reset_index()
+        
+        # Trend-Icons (inkl. Signifikanzprüfung) für alle Fragen in einem Durchlauf
+        selected_data = data[data[key].isin(questions_to_show)]
+        trend_metrics = self.calculate_trend_metrics(selected_data, key)
+        trend_icons = trend_metrics.set_index(key)['Trend_Icon'].to_dict() if not trend_metrics.empty else {}
         
         fig = go.Figure()
         
         for i, question_num in enumerate(questions_to_show):
-            question_data = question_timeline[question_timeline['Fragenummer'] == question_num].sort_values('Datum')
-            
-            # Trend berechnen
-            trend_icon = "➡️"
-            if len(question_data) >= 2:
-                latest_val = question_data.iloc[-1]['Bewertung']
-                first_val = question_data.iloc[0]['Bewertung']
-                trend_change = latest_val - first_val
-                
-                if trend_change > self.trend_threshold:
-                    trend_icon = "📈"
-                elif trend_change < -self.trend_threshold:
-                    trend_icon = "📉"
+            question_data = question_timeline[question_timeline[key] == question_num].sort_values('Datum')
+            trend_icon = trend_icons.get(question_num, "➡️")
             
             color = self.colors[i % len(self.colors)]
             
@@ -0,0 +1,288 @@
+"""
+IQES Topic Model - Themen in offenen Antworten
+Hashing-Merkmale mit MiniBatchKMeans; neue Zeiträume aktualisieren die Themen, statt sie neu zu lernen
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from typing import Dict, Iterable, List, Optional, Union
+
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.preprocessing import normalize
+from sklearn.utils import murmurhash3_32
+
+from config.themes import TOPIC_MODEL_CONFIG
+from core.keyword_index import keyword_terms
+from core.text_corpus import IQESTextCorpus
+
+
+SOURCE_COLUMNS = ['Quelldatei', 'Datum', 'Bildungsgang', 'Evaluationstyp']
+
+
+class IQESTopicModel:
+    """
+    Gruppiert Antworten zu Themen und hält das Modell über Datenstände hinweg
+    
+    Merkmale sind Schlagwort-Terme (wie im Schlagwort-Index), per Hashing in
+    einen festen Merkmalsraum abgebildet, logarithmisch gedämpft und
+    L2-normiert. Der Merkmalsraum hängt damit nicht vom Vokabular eines
+    Datenstands ab.
+    
+    Das erste Training clustert per MiniBatchKMeans (gewichtet mit 'Anzahl').
+    Danach sind die Themenzentren laufende gewichtete Mittelwerte: Kommt ein
+    neuer Zeitraum hinzu, verschiebt update nur die Zentren, denen dessen
+    Antworten nahe sind. Antworten ohne ähnliches Thema werden nicht in ein
+    bestehendes Thema gedrängt; sind sie zahlreich genug, werden sie per
+    MiniBatchKMeans zu zusätzlichen Themen (bis max_topics). Themennummern und
+    Zuordnungen früherer Zeiträume bleiben so stabil. Das Modell merkt sich die
+    gelernten Quellen (Datei × Datum × Bildungsgang × Evaluationstyp), damit
+    jede nur einmal eingeht.
+    """
+    
+    def __init__(self, stop_words: Iterable[str] = (), n_topics: int = TOPIC_MODEL_CONFIG['n_topics'],
+                 max_topics: int = TOPIC_MODEL_CONFIG['max_topics'],
+                 novelty_similarity: float = TOPIC_MODEL_CONFIG['novelty_similarity'],
+                 min_new_topic_share: float = TOPIC_MODEL_CONFIG['min_new_topic_share'],
+                 n_features: int = TOPIC_MODEL_CONFIG['n_features'],
+                 batch_size: int = TOPIC_MODEL_CONFIG['batch_size'],
+                 top_terms: int = TOPIC_MODEL_CONFIG['top_terms'], random_state: int = 42):
+        self.stop_words = set(stop_words)
+        self.n_topics = n_topics
+        self.max_topics = max(max_topics, n_topics)
+        self.novelty_similarity = novelty_similarity
+        self.min_new_topic_share = min_new_topic_share
+        self.n_features = n_features
+        self.batch_size = batch_size
+        self.top_terms = top_terms
+        self.random_state = random_state
+        
+        # Themenzentren (n_themen, n_features) und ihr bisheriges Gesamtgewicht
+        self.centers: Optional[np.ndarray] = None
+        self.center_weights: Optional[np.ndarray] = None
+        self.seen_sources: set = set()
+        # Gelernte Begriffsgewichte und ihr Hash-Merkmal (für die Themenbezeichnungen)
+        self.term_weights: Dict[str, float] = {}
+        self.term_buckets: Dict[str, int] = {}
+    
+    @property
+    def is_fitted(self) -> bool:
+        return self.centers is not None
+    
+    def terms(self, tokens: List[str]) -> List[str]:
+        """Themen-Terme einer Token-Liste (Wörter ohne Stoppwörter, mit Wortpaaren)"""
+        return keyword_terms(tokens, self.stop_words)
+    
+    def _buckets(self, vocabulary: np.ndarray) -> np.ndarray:
+        """Hash-Merkmal je Term (unabhängig von PYTHONHASHSEED)"""
+        return np.array([murmurhash3_32(term, positive=True) % self.n_features for term in vocabulary],
+                        dtype=np.int64)
+    
+    def features(self, corpus: IQESTextCorpus):
+        """
+        Hashing-Merkmale aller Antworten eines Korpus
+        
+        Args:
+            corpus: Text-Korpus
+            
+        Returns:
+            Tuple (normierte Merkmale (n_antworten, n_features), Zählmatrix, Vokabular, Hash-Merkmal je Term)
+        """
+        matrix, vocabulary = corpus.document_term_matrix('topics', self.terms)
+        buckets = self._buckets(vocabulary)
+        projection = sparse.csr_matrix(
+            (np.ones(len(vocabulary)), (np.arange(len(vocabulary)), buckets)),
+            shape=(len(vocabulary), self.n_features)
+        )
+        hashed = (matrix @ projection).tocsr().astype(float)
+        hashed.data = np.log1p(hashed.data)
+        return normalize(hashed), matrix, vocabulary, buckets
+    
+    @staticmethod
+    def source_keys(answers: pd.DataFrame) -> np.ndarray:
+        """
+        Quelle je Antwort als stabiler Schlüssel
+        
+        Args:
+            answers: Langtabelle aus IQESTextCorpus
+            
+        Returns:
+            Schlüssel je Antwort
+        """
+        columns = [col for col in SOURCE_COLUMNS if col in answers.columns]
+        if not columns or answers.empty:
+            return np.full(len(answers), '', dtype=object)
+        return answers[columns].astype(str).agg('\x1f'.join, axis=1).to_numpy()
+    
+    def _cluster(self, features: sparse.csr_matrix, weights: np.ndarray, n_clusters: int) -> np.ndarray:
+        """MiniBatchKMeans über die übergebenen Antworten; liefert die Zentren"""
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, batch_size=self.batch_size,
+                                 random_state=self.random_state, n_init=3)
+        kmeans.fit(features, sample_weight=weights)
+        return kmeans.cluster_centers_
+    
+    def _similarity(self, features: sparse.csr_matrix) -> np.ndarray:
+        """Kosinus-Ähnlichkeit (n_antworten, n_themen) zu den Zentren"""
+        norms = np.linalg.norm(self.centers, axis=1)
+        return np.asarray(features @ self.centers.T) / np.where(norms > 0, norms, 1.0)
+    
+    def _accumulate(self, features: sparse.csr_matrix, weights: np.ndarray, topics: np.ndarray):
+        """Verschiebt die Zentren zum gewichteten Mittel aus bisherigen und neuen Antworten"""
+        for topic in np.unique(topics):
+            members = topics == topic
+            added = weights[members].sum()
+            total = self.center_weights[topic] + added
+            weighted_sum = np.asarray(features[members].T @ weights[members]).ravel()
+            self.centers[topic] = (self.centers[topic] * self.center_weights[topic] + weighted_sum) / total
+            self.center_weights[topic] = total
+    
+    def update(self, corpus: IQESTextCorpus) -> int:
+        """
+        Lernt die Antworten noch nicht gelernter Quellen hinzu
+        
+        Das erste Training benötigt mindestens n_topics Antworten mit Begriffen;
+        bis dahin bleibt das Modell untrainiert.
+        
+        Args:
+            corpus: Text-Korpus (mit 'Anzahl')
+            
+        Returns:
+            Anzahl neu gelernter Antworten (Repräsentanten)
+        """
+        if len(corpus) == 0:
+            return 0
+        
+        hashed, matrix, vocabulary, buckets = self.features(corpus)
+        sources = self.source_keys(corpus.answers)
+        new_sources = ~pd.Series(sources).isin(self.seen_sources).to_numpy()
+        rows = np.flatnonzero(new_sources & (np.diff(hashed.indptr) > 0))
+        if len(rows) == 0 or (not self.is_fitted and len(rows) < self.n_topics):
+            return 0
+        
+        features, weights = hashed[rows], corpus.weights[rows]
+        if not self.is_fitted:
+            self.centers = self._cluster(features, weights, self.n_topics)
+            self.center_weights = np.zeros(len(self.centers))
+            self._accumulate(features, weights, self.predict(features))
+        else:
+            similarity = self._similarity(features)
+            novel = similarity.max(axis=1) < self.novelty_similarity
+            novel_share = weights[novel].sum() / (self.center_weights.sum() + weights.sum())
+            free = self.max_topics - len(self.centers)
+            
+            if free > 0 and novel_share >= self.min_new_topic_share and novel.sum() >= 2:
+                # Neuartige Antworten bilden eigene, zusätzliche Themen
+                n_new = int(min(free, novel.sum(), max(1, np.ceil(novel_share * self.n_topics))))
+                new_centers = self._cluster(features[novel], weights[novel], n_new)
+                self.centers = np.vstack([self.centers, new_centers])
+                self.center_weights = np.concatenate([self.center_weights, np.zeros(n_new)])
+                topics = np.empty(len(rows), dtype=np.int64)
+                topics[~novel] = self.predict(features[~novel]) if (~novel).any() else []
+                topics[novel] = len(self.centers) - n_new + self._nearest(features[novel], new_centers)
+            else:
+                topics = self.predict(features)
+            self._accumulate(features, weights, topics)
+        
+        # Begriffsgewichte der neuen Antworten für die Bezeichnungen
+        totals = matrix[rows].T @ corpus.weights[rows]
+        for index in np.flatnonzero(totals):
+            term = vocabulary[index]
+            self.term_weights[term] = self.term_weights.get(term, 0.0) + float(totals[index])
+            self.term_buckets[term] = int(buckets[index])
+        
+        self.seen_sources.update(sources[new_sources])
+        return len(rows)
+    
+    @staticmethod
+    def _nearest(features: sparse.csr_matrix, centers: np.ndarray) -> np.ndarray:
+        """Nächstes Zentrum (euklidisch) je Antwort"""
+        scores = 2 * np.asarray(features @ centers.T) - (centers ** 2).sum(axis=1)
+        return scores.argmax(axis=1)
+    
+    def predict(self, features: sparse.csr_matrix) -> np.ndarray:
+        """
+        Themenindex (ab 0) je Antwort
+        
+        Args:
+            features: Merkmale aus features
+            
+        Returns:
+            Index des nächsten Zentrums
+        """
+        return self._nearest(features, self.centers)
+    
+    def topic_labels(self) -> Dict[int, str]:
+        """
+        Bezeichnung je Thema aus den stärksten Begriffen des Zentrums
+        
+        Returns:
+            Dictionary Themennummer (ab 1) -> Bezeichnung
+        """
+        if not self.is_fitted:
+            return {}
+        
+        # Je Hash-Merkmal der häufigste gelernte Begriff
+        bucket_terms: Dict[int, str] = {}
+        for term, weight in sorted(self.term_weights.items(), key=lambda item: -item[1]):
+            bucket_terms.setdefault(self.term_buckets[term], term)
+        
+        labels = {}
+        for topic, center in enumerate(self.centers):
+            words = []
+            for bucket in np.argsort(-center)[:self.top_terms * 4]:
+                term = bucket_terms.get(int(bucket))
+                # Wortpaare nur, wenn sie nicht bloß bereits genannte Wörter wiederholen
+                if term is None or center[bucket] <= 0 or all(part in words for part in term.split(' ')):
+                    continue
+                words.append(term)
+                if len(words) >= self.top_terms:
+                    break
+            labels[topic + 1] = ' · '.join(words) if words else f"Thema {topic + 1}"
+        return labels
+    
+    def assign(self, corpus: IQESTextCorpus) -> pd.DataFrame:
+        """
+        Ergänzt corpus.answers um 'Textthema' (ab 1) und 'Textthema_Label'
+        
+        Antworten ohne Begriffe (oder vor dem ersten Training) erhalten kein Thema.
+        
+        Args:
+            corpus: Text-Korpus
+            
+        Returns:
+            corpus.answers
+        """
+        topics = pd.array([pd.NA] * len(corpus), dtype='Int64')
+        if self.is_fitted and len(corpus):
+            hashed = self.features(corpus)[0]
+            rows = np.flatnonzero(np.diff(hashed.indptr) > 0)
+            if len(rows):
+                topics[rows] = self.predict(hashed[rows]) + 1
+        
+        corpus.answers['Textthema'] = topics
+        corpus.answers['Textthema_Label'] = corpus.answers['Textthema'].map(self.topic_labels())
+        return corpus.answers
+    
+    def topic_shares(self, answers: pd.DataFrame, by: Union[str, List[str]] = 'Datum') -> pd.DataFrame:
+        """
+        Anteil der Themen je Zeitraum (bzw. weiterer Gruppierung), gewichtet mit 'Anzahl'
+        
+        Args:
+            answers: Antworten mit 'Textthema' (z.B. gefilterter Ausschnitt aus corpus.answers)
+            by: Gruppierungsspalte(n), z.B. 'Datum' oder ['Bildungsgang', 'Datum']
+            
+        Returns:
+            DataFrame mit by-Spalten, 'Textthema', 'Textthema_Label', 'Anzahl' und 'Anteil'
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        columns = by + ['Textthema', 'Textthema_Label', 'Anzahl', 'Anteil']
+        if answers.empty or 'Textthema' not in answers.columns:
+            return pd.DataFrame(columns=columns)
+        
+        assigned = answers[answers['Textthema'].notna()]
+        if assigned.empty:
+            return pd.DataFrame(columns=columns)
+        
+        shares = assigned.groupby(by + ['Textthema', 'Textthema_Label'])['Anzahl'].sum().reset_index()
+        shares['Anteil'] = shares['Anzahl'] / shares.groupby(by)['Anzahl'].transform('sum')
+        return shares[columns]
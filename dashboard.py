@@ -7,15 +7,34 @@ import numpy as np
 from datetime import datetime, timedelta
 import os
 import re
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
 from textblob import TextBlob
 import seaborn as sns
 import matplotlib.pyplot as plt
 from wordcloud import WordCloud
 import warnings
 import io
+from core.distribution_stats import IQESDistributionStats
+from core.gap_analysis import IQESGapAnalyzer
+from core.rankings import IQESRankingEngine
+from core.categorization import IQESCategorizer
+from core.theme_classifier import IQESThemeClassifier
+from core.derived_columns import IQESDerivedStage
+from core.question_matching import IQESQuestionMatcher
+from core.cohorts import IQESCohortIndex
+from core.segmentation import IQESSegmentationCube
+from core.clustering import IQESQuestionClusterer
+from core.llm_cache import IQESLLMCache, IQESFakeLLMProvider
+from core.llm_dispatcher import IQESLLMDispatcher
+from core.ai_clients import IQESAIClientManager, IQESProviderUnavailable
+from core.summarization import IQESMapReduceSummarizer
+from core.extractive_summarizer import IQESExtractiveSummarizer
+from core.text_corpus import IQESTextCorpus
+from core.sentiment import IQESSentimentScorer
+from core.keyword_index import IQESKeywordIndex, count_keywords
+from core.text_search import IQESTextSearchIndex
+from core.text_dedup import IQESAnswerDeduplicator, with_multiplicity
+from core.topic_model import IQESTopicModel
+from config.themes import BEREICH_THEME_RULES, BEREICH_THEME_DEFAULT, THEME_ATTRIBUTES, CONFIG_VERSION, TEXT_DEDUP_CONFIG, lookup_theme
 warnings.filterwarnings('ignore')
 
 # Environment Variables laden
@@ -36,6 +55,82 @@ try:
 except ImportError:
     GEMINI_AVAILABLE = False
 
+# Versionen der Prompt-Vorlagen (bei Textänderung erhöhen, damit der Antwort-Cache neu anfragt)
+PROMPT_TEMPLATE_VERSIONS = {
+    'openai_insights': 'openai_insights:v1',
+    'gemini_insights': 'gemini_insights:v1',
+    'gemini_recommendations': 'gemini_recommendations:v1',
+    'chunk_summary': 'chunk_summary:v1',
+    'summary_combine': 'summary_combine:v1',
+    'summary_insights': 'summary_insights:v2'
+}
+
+# Modelle je Anbieter für provider-unabhängige Anfragen (Map-Reduce-Zusammenfassung)
+LLM_MODELS = {
+    'gemini': 'gemini-2.5-flash',
+    'openai': 'gpt-3.5-turbo'
+}
+
+# Prompt-Vorlagen der Map-Reduce-Zusammenfassung ({texts}: Eingaben, {count}: Anzahl,
+# {answers}/{total_answers}: abgedeckte bzw. alle Antworten der abschließenden Auswertung)
+SUMMARY_PROMPTS = {
+    'chunk_summary': """Fasse diese {count} IQES-Schülerrückmeldungen knapp zusammen.
+    
+RÜCKMELDUNGEN:
+{texts}
+
+Nenne die genannten Themen mit ungefährer Häufigkeit, positive Aspekte und Probleme.
+Keine Empfehlungen, nur verdichtete Inhalte. Auf Deutsch, höchstens 150 Wörter.""",
+    'summary_combine': """Führe diese {count} Teilzusammenfassungen von IQES-Schülerrückmeldungen zu einer Zusammenfassung zusammen.
+    
+TEILZUSAMMENFASSUNGEN:
+{texts}
+
+Gleiche Themen zusammenführen, Häufigkeiten addieren, nichts erfinden. Auf Deutsch, höchstens 250 Wörter.""",
+    'summary_insights': """Du bist ein Experte für Schulentwicklung und IQES-Evaluationen.
+    
+Die folgenden {count} Zusammenfassungen decken {answers} von {total_answers} Schülerrückmeldungen ab. Gib eine strukturierte Analyse:
+
+ZUSAMMENFASSUNGEN:
+{texts}
+
+AUFGABE:
+1. 📊 HAUPTTHEMEN: Identifiziere die 3 wichtigsten Themen
+2. 😊 POSITIVE ASPEKTE: Was läuft gut?
+3. ⚠️ PROBLEMBEREICHE: Welche Herausforderungen gibt es?
+4. 🎯 SOFORTMASSNAHMEN: 2-3 konkrete, umsetzbare Empfehlungen
+
+Antworte auf Deutsch, strukturiert und praxisorientiert für Schulleitung."""
+}
+
+def build_ai_client_factories():
+    """Factories der konfigurierten KI-Anbieter (Clients werden erst bei Bedarf erzeugt)"""
+    # Lokaler Test-Anbieter ohne API-Aufrufe
+    if os.getenv('IQES_LLM_PROVIDER') == 'fake':
+        return {'gemini': IQESFakeLLMProvider}
+    
+    factories = {}
+    if GEMINI_AVAILABLE and os.getenv('GOOGLE_AI_API_KEY'):
+        factories['gemini'] = lambda: genai.Client(api_key=os.getenv('GOOGLE_AI_API_KEY'))
+    if OPENAI_AVAILABLE and os.getenv('OPENAI_API_KEY'):
+        factories['openai'] = lambda: openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    return factories
+
+@st.cache_resource
+def get_ai_client_manager():
+    """Ein Client-Manager (ein Client/Connection-Pool je Anbieter) für alle Sessions"""
+    return IQESAIClientManager(build_ai_client_factories())
+
+@st.cache_resource
+def get_llm_dispatcher():
+    """Ein Dispatcher für alle Sessions, damit das Anfragelimit (Token-Bucket) über Reruns erhalten bleibt"""
+    return IQESLLMDispatcher(fail_fast=(IQESProviderUnavailable,))
+
+@st.cache_resource
+def get_text_search_index():
+    """Ein Volltext-Index (SQLite-Verbindung) für alle Sessions"""
+    return IQESTextSearchIndex()
+
 # Deutsche Stoppwörter für Textanalyse
 GERMAN_STOPWORDS = {
     'der', 'die', 'und', 'in', 'zu', 'den', 'das', 'nicht', 'von', 'sie', 'ist', 'des', 'sich', 'mit',
@@ -323,6 +418,15 @@ class SchulqualitätsDashboard:
         self.data = None
         self.processed_data = pd.DataFrame()
         self.metadata = pd.DataFrame()
+        self.distribution_stats = IQESDistributionStats()
+        self.gap_analyzer = IQESGapAnalyzer()
+        self.ranking_engine = IQESRankingEngine()
+        self.categorizer = IQESCategorizer()
+        self.theme_classifier = IQESThemeClassifier(BEREICH_THEME_RULES, BEREICH_THEME_DEFAULT)
+        self.derived_stage = IQESDerivedStage(self.add_derived_columns, CONFIG_VERSION)
+        self.question_matcher = IQESQuestionMatcher()
+        self.question_clusterer = IQESQuestionClusterer()
+        self.sentiment_scorer = IQESSentimentScorer()
         self.ki_analyzer = None  # Wird bei Bedarf initialisiert
         self.openai_client = None
         self.setup_openai()
@@ -374,13 +478,14 @@ class SchulqualitätsDashboard:
             file_hash.update(f.name.encode())
         current_hash = file_hash.hexdigest()
         
-        # Session State für Performance prüfen
+        # Session State für Performance prüfen: Basisdaten nur bei neuen Dateien neu parsen
         if (st.session_state.get('data_loaded', False) and 
-            st.session_state.get('last_file_hash') == current_hash and
-            'processed_data' in st.session_state and 
-            not st.session_state.processed_data.empty):
-            self.processed_data = st.session_state.processed_data
-            st.success("✅ Daten aus Cache geladen (Performance-Optimierung)")
+            self.derived_stage.has_base(st.session_state, current_hash)):
+            self.processed_data, recomputed = self.derived_stage.resolve(st.session_state)
+            if recomputed:
+                st.info("🎨 Konfiguration geändert - Themen und Kategorien neu berechnet (Basisdaten aus Cache)")
+            else:
+                st.success("✅ Daten aus Cache geladen (Performance-Optimierung)")
             return True
         
         all_data = []
@@ -439,14 +544,36 @@ class SchulqualitätsDashboard:
             # Datenqualität sicherstellen
             self.processed_data = self.clean_data(self.processed_data)
             
-            # In Session State cachen
-            st.session_state.processed_data = self.processed_data
+            # Umnummerierte/umformulierte Fragen über alle Zeiträume verknüpfen (Frage_ID)
+            self.processed_data = self.question_matcher.assign_question_ids(self.processed_data)
+            
+            # Basisdaten und konfigurationsabhängige Spalten getrennt in Session State cachen
+            self.derived_stage.store_base(st.session_state, self.processed_data, current_hash)
+            self.processed_data, _ = self.derived_stage.resolve(st.session_state)
             st.session_state.data_loaded = True
-            st.session_state.last_file_hash = current_hash
             
             return True
         return False
     
+    def add_derived_columns(self, data):
+        """
+        Berechnet alle konfigurationsabhängigen Spalten aus den Basisdaten
+        
+        Wird über IQESDerivedStage nur neu ausgeführt, wenn sich die Dateien oder
+        config/themes.py (CONFIG_VERSION) geändert haben.
+        
+        Args:
+            data: Bereinigte Basisdaten
+            
+        Returns:
+            Daten mit Themen, Farben und Einstufungen
+        """
+        # Themen für alle Fragen gesammelt zuordnen
+        data = self.assign_themes(data)
+        
+        # Verbesserungsbedarf und Trend für alle Fragen in einem Schritt einstufen
+        return self.categorizer.add_category_columns(data, columns=('Verbesserungsbedarf', 'Trend'))
+    
     def clean_data(self, data):
         """Datenqualität sicherstellen"""
         if data.empty:
@@ -634,17 +761,11 @@ class SchulqualitätsDashboard:
                     # Verwende individuelle Fragenummer wenn verfügbar, sonst Sheet-Nummer
                     final_question_number = individual_question_number if individual_question_number else question_number
                     
-                    # Thema zuordnen basierend auf echtem Bereichstext
-                    theme_info = self.assign_theme_to_question(final_question_number, category)
-                    
-                    # DEBUG: Log alle gefundenen Fragen und Themen-Zuordnung
+                    # DEBUG: Log alle gefundenen Fragen (Themen-Zuordnung erfolgt gesammelt in assign_themes)
                     if 'debug_questions' not in st.session_state:
                         st.session_state.debug_questions = []
-                    if 'debug_themes' not in st.session_state:
-                        st.session_state.debug_themes = []
                     
                     st.session_state.debug_questions.append(f"GEFUNDEN: Frage {final_question_number} - {question_text[:50]}...")
-                    st.session_state.debug_themes.append(f"Frage {final_question_number}: '{category}' → {theme_info['theme']} (Strategisch: {theme_info['strategic']})")
                     
                     question_data = {
                         'Datum': eval_date,
@@ -656,12 +777,6 @@ class SchulqualitätsDashboard:
                         'Fragentyp': 'Antwortskala',
                         'Bewertung': average_rating,
                         'Anzahl_Antworten': n_responses or 0,
-                        'Verbesserungsbedarf': self.calculate_improvement_need(average_rating),
-                        'Trend': self.calculate_trend(average_rating),
-                        'Thema': theme_info['theme'],  # Thematische Gruppierung
-                        'Thema_Farbe': theme_info['color'],  # Farbkodierung
-                        'Thema_Priorität': theme_info['priority'],  # Priorisierung
-                        'Strategisch': theme_info['strategic'],  # Strategische Relevanz
                         'Quelldatei': filename,
                         'Arbeitsblatt': sheet_name,
                         'Antwortverteilung': response_distribution,
@@ -749,9 +864,6 @@ class SchulqualitätsDashboard:
                 segmentation_type = detect_segmentation_type(question_text, choices)
                 is_segmentation = segmentation_type in ['Geschlecht', 'Alter', 'Herkunft', 'Bildungsweg']
                 
-                # Thema zuordnen
-                theme_info = self.assign_theme_to_question(question_number, 'Demographische Daten')
-                
                 question_data = {
                     'Datum': eval_date,
                     'Bildungsgang': bildungsgang,
@@ -762,11 +874,6 @@ class SchulqualitätsDashboard:
                     'Fragentyp': 'Einfachauswahl',
                     'Bewertung': None,  # Keine numerische Bewertung
                     'Anzahl_Antworten': total_responses,
-                    'Verbesserungsbedarf': 'N/A',
-                    'Trend': 'N/A',
-                    'Thema': theme_info['theme'],
-                    'Thema_Farbe': theme_info['color'],
-                    'Thema_Priorität': theme_info['priority'],
                     'Segmentierungstyp': segmentation_type,
                     'Für_Segmentierung': is_segmentation,
                     'Quelldatei': filename,
@@ -830,8 +937,6 @@ class SchulqualitätsDashboard:
                     'Fragentyp': 'Offene Frage',
                     'Bewertung': None,  # Keine numerische Bewertung
                     'Anzahl_Antworten': response_count,
-                    'Verbesserungsbedarf': 'N/A',
-                    'Trend': 'N/A',
                     'Quelldatei': filename,
                     'Arbeitsblatt': sheet_name,
                     'Textantworten': text_responses,
@@ -844,167 +949,55 @@ class SchulqualitätsDashboard:
             
         return questions
     
-    def calculate_improvement_need(self, value):
-        """Berechnet Verbesserungsbedarf für IQES-Skala (1-4)"""
-        if value < 2.5:
-            return "HOCH"
-        elif value < 3.0:
-            return "MITTEL"
-        else:
-            return "NIEDRIG"
-    
-    def get_color_for_category(self, category_text):
-        """Ordnet IQES-Bereichstext eine Farbe zu (intelligente Erkennung)"""
-        if not category_text:
-            return {'theme': '❓ Unbekannt', 'color': '#7f8c8d', 'priority': 5}
-        
-        category_lower = category_text.lower()
+    def assign_themes(self, data):
+        """
+        Ordnet allen Antwortskala- und Einfachauswahl-Fragen ein Thema zu
         
-        # Schulatmosphäre und Zwischenmenschliches
-        if any(word in category_lower for word in ['atmosphäre', 'umgang', 'klima', 'zusammenleben', 'gemeinschaft', 'schulklima']):
-            return {'theme': '🏫 Schulatmosphäre & Umgang', 'color': '#3498db', 'priority': 1}
+        Zuerst über den Themen-Index aus config/themes.py (spezifischste Regel gewinnt),
+        sonst über die Regeltabelle BEREICH_THEME_RULES auf dem Bereichstext. Geprüft
+        werden nur eindeutige Fragenummern bzw. Bereichstexte.
         
-        # Unterricht und Lehre  
-        elif any(word in category_lower for word in ['unterricht', 'lehre', 'lehr', 'didaktik', 'methodik', 'vermittlung']):
-            return {'theme': '📚 Unterricht & Lehre', 'color': '#e74c3c', 'priority': 1}
-            
-        # Bewertung und Leistung
-        elif any(word in category_lower for word in ['bewertung', 'beurteilung', 'leistung', 'note', 'prüfung']):
-            return {'theme': '📝 Leistungsbewertung', 'color': '#f39c12', 'priority': 2}
-            
-        # Förderung und Unterstützung
-        elif any(word in category_lower for word in ['förderung', 'unterstützung', 'hilfe', 'beratung', 'individuell']):
-            return {'theme': '🎯 Individuelle Förderung', 'color': '#9b59b6', 'priority': 2}
+        Args:
+            data: Zusammengeführte IQES-Daten
             
-        # Digitalisierung und Technik
-        elif any(word in category_lower for word in ['digital', 'technik', 'computer', 'internet', 'medien']):
-            return {'theme': '💻 Digitalisierung & Medien', 'color': '#1abc9c', 'priority': 2}
-            
-        # Zukunft und Perspektiven
-        elif any(word in category_lower for word in ['zukunft', 'perspektive', 'beruf', 'karriere', 'entwicklung', 'vorbereitung']):
-            return {'theme': '🚀 Zukunftsperspektiven', 'color': '#27ae60', 'priority': 3}
-            
-        # Offene Fragen und Feedback
-        elif any(word in category_lower for word in ['offen', 'feedback', 'rückmeldung', 'anregung', 'wunsch']):
-            return {'theme': '💬 Offenes Feedback', 'color': '#34495e', 'priority': 3}
-            
-        # Demografische Daten
-        elif any(word in category_lower for word in ['demograf', 'hintergrund', 'angaben', 'daten']):
-            return {'theme': '📊 Demografische Daten', 'color': '#95a5a6', 'priority': 4}
+        Returns:
+            Daten mit Thema, Thema_Farbe, Thema_Priorität, Strategisch und Thema_Regel
+        """
+        if data.empty or 'Fragenummer' not in data.columns:
+            return data
         
-        # Spezielle IQES-Kategorien (Fallback für unklare Texte)
-        elif 'gebäude' in category_lower or 'räume' in category_lower or 'ausstattung' in category_lower:
-            return {'theme': '🏢 Infrastruktur & Ausstattung', 'color': '#8e44ad', 'priority': 3}
+        data = data.copy()
+        theme_rows = data['Fragentyp'].isin(['Antwortskala', 'Einfachauswahl'])
+        subset = data.loc[theme_rows]
+        
+        # Inhaltsbasierte Zuordnung über die kompilierte Regeltabelle
+        themes = self.theme_classifier.assign(subset['Bereich'].fillna(''))
+        themes['Regel'] = 'bereich:' + themes['Regel']
+        
+        # Themen-Index (Einzelfragen, Bereiche, Hauptfragen-Präfixe) hat Vorrang
+        codes, unique_numbers = pd.factorize(subset['Fragenummer'].astype(str))
+        indexed = pd.DataFrame([lookup_theme(number) or {} for number in unique_numbers],
+                               columns=THEME_ATTRIBUTES).iloc[codes]
+        indexed.index = subset.index
+        by_number = indexed['theme'].notna()
+        
+        themes[THEME_ATTRIBUTES] = indexed.combine_first(themes[THEME_ATTRIBUTES]).astype({'priority': int})
+        themes.loc[by_number, 'Regel'] = 'fragenummer:' + subset.loc[by_number, 'Fragenummer'].astype(str)
+        
+        data.loc[theme_rows, 'Thema'] = themes['theme']
+        data.loc[theme_rows, 'Thema_Farbe'] = themes['color']
+        data.loc[theme_rows, 'Thema_Priorität'] = themes['priority']
+        data.loc[theme_rows, 'Strategisch'] = themes['strategic']
+        data.loc[theme_rows, 'Thema_Regel'] = themes['Regel']
+        
+        # DEBUG: Themen-Zuordnung je eindeutiger Frage protokollieren
+        assignments = data.loc[theme_rows, ['Fragenummer', 'Bereich', 'Thema', 'Strategisch', 'Thema_Regel']].drop_duplicates()
+        st.session_state.debug_themes = [
+            f"Frage {row.Fragenummer}: '{row.Bereich}' → {row.Thema} (Strategisch: {row.Strategisch}, Regel: {row.Thema_Regel})"
+            for row in assignments.itertuples(index=False)
+        ]
         
-        # Fallback: Verwende gekürzten Bereichstext
-        short_name = category_text[:30] + "..." if len(category_text) > 30 else category_text
-        return {'theme': f'📋 {short_name}', 'color': '#7f8c8d', 'priority': 3}
-    
-    def get_strategic_theme_mapping(self):
-        """Strategische Fragengruppierung für IQES-Dashboard basierend auf echten Daten"""
-        return {
-            # STRATEGISCHE KERNBEREICHE (basierend auf echten Excel-Daten)
-            
-            # Schulatmosphäre, Umgang und Unterstützung (5.1-5.5)
-            '5.1': {'theme': '🏫 Schulatmosphäre', 'color': '#3498db', 'priority': 1, 'strategic': True},
-            '5.2': {'theme': '🏫 Schulatmosphäre', 'color': '#3498db', 'priority': 1, 'strategic': True},
-            '5.3': {'theme': '🏫 Schulatmosphäre', 'color': '#3498db', 'priority': 1, 'strategic': True},
-            '5.4': {'theme': '🏫 Schulatmosphäre', 'color': '#3498db', 'priority': 1, 'strategic': True},
-            '5.5': {'theme': '🏫 Schulatmosphäre', 'color': '#3498db', 'priority': 1, 'strategic': True},
-            
-            # Unterricht (7.1-7.13)
-            '7.1': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-            '7.2': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-            '7.3': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-            '7.4': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-            '7.5': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-            '7.6': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-            '7.7': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-            '7.8': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-            '7.9': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-            '7.10': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-            '7.11': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-            '7.12': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-            '7.13': {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True},
-            
-            # Feedback (9.1-9.3)  
-            '9.1': {'theme': '💬 Feedback', 'color': '#f39c12', 'priority': 2, 'strategic': True},
-            '9.2': {'theme': '💬 Feedback', 'color': '#f39c12', 'priority': 2, 'strategic': True},
-            '9.3': {'theme': '💬 Feedback', 'color': '#f39c12', 'priority': 2, 'strategic': True},
-            
-            # SPEZIELLE FRAGENTYPEN (andere Auswertung)
-            
-            # Demografische Fragen (1.x-2.x) - nicht in Trends
-            '1': {'theme': '📊 Demografie', 'color': '#95a5a6', 'priority': 5, 'strategic': False},
-            '1.1': {'theme': '📊 Demografie', 'color': '#95a5a6', 'priority': 5, 'strategic': False},
-            '1.2': {'theme': '📊 Demografie', 'color': '#95a5a6', 'priority': 5, 'strategic': False},
-            '2': {'theme': '📊 Demografie', 'color': '#95a5a6', 'priority': 5, 'strategic': False},
-            '2.1': {'theme': '📊 Demografie', 'color': '#95a5a6', 'priority': 5, 'strategic': False},
-            '2.2': {'theme': '📊 Demografie', 'color': '#95a5a6', 'priority': 5, 'strategic': False},
-            
-            # Offene Fragen (4.x, 6.x, 8.x) - qualitative Auswertung
-            '4': {'theme': '💭 Offene Antworten', 'color': '#34495e', 'priority': 4, 'strategic': False},
-            '6': {'theme': '💭 Offene Antworten', 'color': '#34495e', 'priority': 4, 'strategic': False},
-            '8': {'theme': '💭 Offene Antworten', 'color': '#34495e', 'priority': 4, 'strategic': False},
-            
-            # Sonstige Einzelfragen - separate Behandlung
-            '9': {'theme': '📋 Sonstige Bereiche', 'color': '#7f8c8d', 'priority': 3, 'strategic': False},
-            '10': {'theme': '📋 Sonstige Bereiche', 'color': '#7f8c8d', 'priority': 3, 'strategic': False},
-            '11': {'theme': '📋 Sonstige Bereiche', 'color': '#7f8c8d', 'priority': 3, 'strategic': False},
-            '12': {'theme': '📋 Sonstige Bereiche', 'color': '#7f8c8d', 'priority': 3, 'strategic': False},
-        }
-    
-    def assign_theme_to_question(self, question_number, category_text=""):
-        """Ordnet Thema basierend auf strategischer Fragengruppierung UND Inhaltsanalyse zu"""
-        strategic_mapping = self.get_strategic_theme_mapping()
-        
-        # Exakte Übereinstimmung suchen
-        if question_number in strategic_mapping:
-            return strategic_mapping[question_number]
-        
-        # Hauptnummer suchen (z.B. "5" für "5.10" falls nicht in Mapping)
-        main_number = question_number.split('.')[0]
-        if main_number in strategic_mapping:
-            base_info = strategic_mapping[main_number].copy()
-            return base_info
-        
-        # ADAPTIVE ERKENNUNG für unterschiedliche IQES-Versionen
-        # Basiert auf Frageninhalt statt nur Nummern
-        if category_text:
-            category_lower = category_text.lower()
-            
-            # Schulatmosphäre-Keywords
-            if any(keyword in category_lower for keyword in [
-                'schulgemeinschaft', 'vertrauen', 'respekt', 'unterstützung', 'hilfe', 
-                'umgang', 'atmosphäre', 'gemeinschaft', 'ort', 'geschätzt', 'kultur'
-            ]):
-                return {'theme': '🏫 Schulatmosphäre', 'color': '#3498db', 'priority': 1, 'strategic': True}
-            
-            # Unterricht-Keywords  
-            elif any(keyword in category_lower for keyword in [
-                'unterricht', 'beruflich', 'ziele', 'inhalte', 'methodisch', 'lernen',
-                'lernbedürfnisse', 'arbeitsaufträge', 'anspruchsvoll', 'kompetent', 
-                'begeistern', 'leistungsbeurteilung', 'lernumgebung', 'fehler'
-            ]):
-                return {'theme': '📚 Unterricht', 'color': '#e74c3c', 'priority': 1, 'strategic': True}
-            
-            # Feedback-Keywords
-            elif any(keyword in category_lower for keyword in [
-                'rückmeldung', 'feedback', 'auswertung', 'vereinbarung', 'maßnahmen'
-            ]):
-                return {'theme': '💬 Feedback', 'color': '#f39c12', 'priority': 2, 'strategic': True}
-        
-        # Fallback für unbekannte Fragen
-        return {'theme': '❓ Unbekannt', 'color': '#7f8c8d', 'priority': 5, 'strategic': False}
-    
-    def calculate_trend(self, value):
-        """Berechnet Trend für IQES-Skala (1-4)"""
-        if value >= 3.5:
-            return "↑ Positiv"
-        elif value >= 2.5:
-            return "→ Stabil"
-        else:
-            return "↓ Negativ"
+        return data
     
     def create_kpi_metrics(self):
         """Erstellt KPI-Metriken für IQES-Daten (nur strategische Kernbereiche)"""
@@ -1236,10 +1229,12 @@ class SchulqualitätsDashboard:
         
         with tab3:
             # Einzelfragen-Trends (nur Fragen die in mehreren Zeiträumen vorhanden sind)
-            question_timeline = scale_data.groupby(['Fragenummer', 'Datum'])['Bewertung'].mean().reset_index()
+            # Gruppiert nach kanonischer Frage_ID, damit umnummerierte Fragen eine Zeitreihe bilden
+            question_key = 'Frage_ID' if 'Frage_ID' in scale_data.columns else 'Fragenummer'
+            question_timeline = scale_data.groupby([question_key, 'Datum'])['Bewertung'].mean().reset_index()
             
             # Nur Fragen zeigen die in mindestens 2 Zeiträumen vorhanden sind
-            question_counts = question_timeline.groupby('Fragenummer')['Datum'].count()
+            question_counts = question_timeline.groupby(question_key)['Datum'].count()
             multi_period_questions = question_counts[question_counts >= 2].index
             
             if len(multi_period_questions) == 0:
@@ -1262,7 +1257,7 @@ class SchulqualitätsDashboard:
                          '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
                 
                 for i, question_num in enumerate(selected_questions[:10]):  # Max 10 Fragen
-                    question_data = question_timeline[question_timeline['Fragenummer'] == question_num]
+                    question_data = question_timeline[question_timeline[question_key] == question_num]
                     
                     # Trend berechnen
                     if len(question_data) >= 2:
@@ -1303,14 +1298,14 @@ class SchulqualitätsDashboard:
                 st.markdown("### 📊 Trend-Übersicht")
                 trend_summary = []
                 for question_num in selected_questions:
-                    question_data = question_timeline[question_timeline['Fragenummer'] == question_num]
+                    question_data = question_timeline[question_timeline[question_key] == question_num]
                     if len(question_data) >= 2:
                         latest_val = question_data.iloc[-1]['Bewertung']
                         first_val = question_data.iloc[0]['Bewertung']
                         trend_change = latest_val - first_val
                         
                         # Frage-Text aus ursprünglichen Daten
-                        frage_text = scale_data[scale_data['Fragenummer'] == question_num]['Bereich'].iloc[0]
+                        frage_text = scale_data[scale_data[question_key] == question_num]['Bereich'].iloc[0]
                         
                         trend_summary.append({
                             'Frage': f"Frage {question_num}",
@@ -1325,21 +1320,33 @@ class SchulqualitätsDashboard:
                     trend_df = pd.DataFrame(trend_summary)
                     st.dataframe(trend_df, use_container_width=True, hide_index=True)
     
-    def _calculate_rankings_data(self, data):
-        """Berechnung der Rankings ohne Caching"""
+    def _calculate_rankings_data(self, data, group_by=None, k=5):
+        """
+        Berechnung der Rankings ohne Caching
+        
+        Args:
+            data: IQES-Daten
+            group_by: Optionale Gruppierung für Ranglisten je Gruppe (z.B. 'Bildungsgang')
+            k: Anzahl Einträge je Gruppe und Richtung
+            
+        Returns:
+            Tuple (kritischste k, beste k) je Gruppe
+        """
         scale_data = data[data['Fragentyp'] == 'Antwortskala'].copy()
         if scale_data.empty:
             return pd.DataFrame(), pd.DataFrame()
         
+        group_cols = [group_by] if group_by and group_by != 'Thema' else []
+        
         # Rankings erstellen mit thematischer Gruppierung
         if 'Thema' in scale_data.columns:
-            question_rankings = scale_data.groupby(['Frage', 'Fragenummer', 'Thema', 'Thema_Farbe']).agg({
+            question_rankings = scale_data.groupby(group_cols + ['Frage', 'Fragenummer', 'Thema', 'Thema_Farbe']).agg({
                 'Bewertung': 'mean',
                 'Anzahl_Antworten': 'sum',
                 'Verbesserungsbedarf': 'first'
             }).reset_index()
         else:
-            question_rankings = scale_data.groupby(['Frage', 'Fragenummer']).agg({
+            question_rankings = scale_data.groupby(group_cols + ['Frage', 'Fragenummer']).agg({
                 'Bewertung': 'mean',
                 'Anzahl_Antworten': 'sum',
                 'Verbesserungsbedarf': 'first'
@@ -1347,13 +1354,42 @@ class SchulqualitätsDashboard:
             question_rankings['Thema'] = '❓ Sonstige'
             question_rankings['Thema_Farbe'] = '#7f8c8d'
         
-        # Top 5 kritische Fragen (niedrigste Bewertungen)
-        bottom_5 = question_rankings.nsmallest(5, 'Bewertung')
+        # Kritischste (niedrigste) und beste (höchste) Bewertungen in einem Durchlauf
+        bottom_k, top_k = self.ranking_engine.top_bottom(question_rankings, k=k, group_by=group_by)
         
-        # Top 5 beste Fragen (höchste Bewertungen)
-        top_5 = question_rankings.nlargest(5, 'Bewertung')
+        return bottom_k, top_k
+    
+    def _show_group_leaderboards(self, data):
+        """Zeigt Ranglisten je Bildungsgang oder Thema über das gesamte Archiv"""
+        st.markdown("### 🏆 Ranglisten je Gruppe")
+        
+        col1, col2 = st.columns([2, 1])
+        
+        with col1:
+            group_by = st.selectbox("Ranglisten je:", ['Bildungsgang', 'Thema'], key="leaderboard_group")
         
-        return bottom_5, top_5
+        with col2:
+            k = st.number_input("Einträge je Gruppe:", min_value=1, max_value=20, value=3, key="leaderboard_k")
+        
+        bottom_k, top_k = self._calculate_rankings_data(data, group_by=group_by, k=int(k))
+        
+        if bottom_k.empty:
+            st.info("Keine Antwortskala-Daten für Ranglisten verfügbar.")
+            return
+        
+        display_cols = [group_by, 'Rang', 'Fragenummer', 'Frage', 'Bewertung', 'Anzahl_Antworten']
+        if group_by != 'Thema':
+            display_cols.insert(4, 'Thema')
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown(f"#### 🚨 Kritischste {int(k)} je {group_by}")
+            st.dataframe(bottom_k[display_cols].round({'Bewertung': 2}), use_container_width=True, hide_index=True)
+        
+        with col2:
+            st.markdown(f"#### ✅ Beste {int(k)} je {group_by}")
+            st.dataframe(top_k[display_cols].round({'Bewertung': 2}), use_container_width=True, hide_index=True)
     
     def create_rankings_visualization(self, data):
         """Erstellt Top/Bottom Rankings für kritische Bereiche"""
@@ -1434,6 +1470,8 @@ class SchulqualitätsDashboard:
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
+        
+        self._show_group_leaderboards(data)
     
     def create_comparison_visualization(self, data):
         """Erstellt verbesserte BM vs VK Vergleichscharts"""
@@ -1543,62 +1581,104 @@ class SchulqualitätsDashboard:
             
             st.plotly_chart(fig_radar, use_container_width=True)
         
-        # Verbesserte Delta-Analyse mit detaillierter Gap-Visualisierung
-        if len(comparison_data['Bildungsgang'].unique()) == 2:
+        # Paarweise Gap-Analyse über alle Bildungsgänge
+        if len(comparison_data['Bildungsgang'].unique()) >= 2:
             st.markdown("### 📈 Performance-Gap-Analyse")
             
-            bildungsgänge = comparison_data['Bildungsgang'].unique()
-            bg1_data = comparison_data[comparison_data['Bildungsgang'] == bildungsgänge[0]]
-            bg2_data = comparison_data[comparison_data['Bildungsgang'] == bildungsgänge[1]]
+            gap_dimension = st.radio(
+                "Gap-Analyse nach:",
+                [x_field, 'Fragenummer'],
+                format_func=lambda dim: "Einzelfragen" if dim == 'Fragenummer' else dim,
+                horizontal=True,
+                key="gap_dimension"
+            )
+            gap_source = strategic_data if x_field == 'Thema' and 'Strategisch' in scale_data.columns else scale_data
+            
+            # Heatmap: mittlerer Gap je Bildungsgang-Paar (Zeile minus Spalte)
+            pair_matrix = self.gap_analyzer.pair_matrix(gap_source, gap_dimension)
+            if not pair_matrix.empty:
+                fig_heatmap = go.Figure(data=go.Heatmap(
+                    z=pair_matrix.values,
+                    x=pair_matrix.columns.tolist(),
+                    y=pair_matrix.index.tolist(),
+                    colorscale='RdYlGn',
+                    zmid=0,
+                    text=pair_matrix.round(2).values,
+                    texttemplate='%{text:+.2f}',
+                    hovertemplate='%{y} vs %{x}<br>Ø Gap: %{z:+.2f}<extra></extra>'
+                ))
+                fig_heatmap.update_layout(
+                    title="🗺️ Mittlerer Performance-Gap (Zeile minus Spalte)",
+                    template='plotly_white',
+                    height=400
+                )
+                st.plotly_chart(fig_heatmap, use_container_width=True)
+            
+            pair_gaps = self.gap_analyzer.pair_gaps(gap_source, gap_dimension)
+            if pair_gaps.empty:
+                st.info("Keine gemeinsamen Bereiche für Gap-Vergleich gefunden.")
+                return
+            
+            # Gap-Heatmap je Paar und Thema/Frage
+            pair_gaps['Paar'] = pair_gaps['Bildungsgang_A'] + " vs " + pair_gaps['Bildungsgang_B']
+            gap_pivot = pair_gaps.pivot(index='Paar', columns=gap_dimension, values='Gap')
+            fig_pair_heatmap = go.Figure(data=go.Heatmap(
+                z=gap_pivot.values,
+                x=gap_pivot.columns.astype(str).tolist(),
+                y=gap_pivot.index.tolist(),
+                colorscale='RdYlGn',
+                zmid=0,
+                hovertemplate='%{y}<br>%{x}: %{z:+.2f}<extra></extra>'
+            ))
+            fig_pair_heatmap.update_layout(
+                title=f"🔍 Gap je Bildungsgang-Paar und {gap_dimension}",
+                template='plotly_white',
+                height=max(300, 60 * len(gap_pivot) + 150)
+            )
+            st.plotly_chart(fig_pair_heatmap, use_container_width=True)
             
-            # Durchschnittliche Differenz
-            avg_diff = bg1_data['Bewertung'].mean() - bg2_data['Bewertung'].mean()
+            # Detailansicht für ein ausgewähltes Paar
+            selected_pair = st.selectbox("Bildungsgang-Paar:", gap_pivot.index.tolist(), key="gap_pair")
+            pair_data = pair_gaps[pair_gaps['Paar'] == selected_pair]
+            bg_a, bg_b = pair_data['Bildungsgang_A'].iloc[0], pair_data['Bildungsgang_B'].iloc[0]
+            avg_diff = pair_data['Gap'].mean()
             
             col1, col2, col3 = st.columns(3)
             
             with col1:
-                st.metric(f"Durchschnitt {bildungsgänge[0]}", f"{bg1_data['Bewertung'].mean():.2f}")
+                st.metric(f"Durchschnitt {bg_a}", f"{pair_data['Bewertung_A'].mean():.2f}")
             
             with col2:
-                st.metric(f"Durchschnitt {bildungsgänge[1]}", f"{bg2_data['Bewertung'].mean():.2f}")
+                st.metric(f"Durchschnitt {bg_b}", f"{pair_data['Bewertung_B'].mean():.2f}")
             
             with col3:
                 delta_color = "normal" if avg_diff >= 0 else "inverse"
                 st.metric("Performance-Gap", f"{abs(avg_diff):.2f}", f"{avg_diff:+.2f}", delta_color=delta_color)
             
-            # Detaillierte Gap-Analyse pro Bereich/Thema
-            st.markdown("#### 🔍 Gap-Analyse nach Bereichen")
-            
-            # Merge der beiden Bildungsgänge für Gap-Berechnung
-            merged_data = bg1_data.merge(bg2_data, on=x_field, suffixes=('_BG1', '_BG2'))
-            merged_data['Gap'] = merged_data['Bewertung_BG1'] - merged_data['Bewertung_BG2']
-            merged_data['Abs_Gap'] = abs(merged_data['Gap'])
-            
-            # Gap-Visualisierung (Waterfall-ähnlich)
             fig_gap = go.Figure()
             
-            colors = ['#e74c3c' if gap < 0 else '#2ecc71' for gap in merged_data['Gap']]
+            colors = ['#e74c3c' if gap < 0 else '#2ecc71' for gap in pair_data['Gap']]
             
             fig_gap.add_trace(go.Bar(
-                x=merged_data[x_field],
-                y=merged_data['Gap'],
+                x=pair_data[gap_dimension].astype(str),
+                y=pair_data['Gap'],
                 marker_color=colors,
-                text=[f"{gap:+.2f}" for gap in merged_data['Gap']],
+                text=[f"{gap:+.2f}" for gap in pair_data['Gap']],
                 textposition='outside',
                 name='Performance-Gap'
             ))
             
             fig_gap.update_layout(
-                title=f"📊 Performance-Gap: {bildungsgänge[0]} vs {bildungsgänge[1]}",
+                title=f"📊 Performance-Gap: {bg_a} vs {bg_b}",
                 yaxis_title="Bewertungsdifferenz",
-                xaxis_title=x_field,
+                xaxis_title=gap_dimension,
                 template='plotly_white',
                 height=400,
                 yaxis=dict(range=[-1, 1]),
                 annotations=[
-                    dict(text="Grün = BG1 besser", x=0.02, y=0.98, xref="paper", yref="paper", 
+                    dict(text=f"Grün = {bg_a} besser", x=0.02, y=0.98, xref="paper", yref="paper", 
                          showarrow=False, font=dict(color="#2ecc71")),
-                    dict(text="Rot = BG2 besser", x=0.02, y=0.92, xref="paper", yref="paper", 
+                    dict(text=f"Rot = {bg_b} besser", x=0.02, y=0.92, xref="paper", yref="paper", 
                          showarrow=False, font=dict(color="#e74c3c"))
                 ]
             )
@@ -1608,14 +1688,81 @@ class SchulqualitätsDashboard:
             
             st.plotly_chart(fig_gap, use_container_width=True)
             
-            # Top Gap-Bereiche identifizieren
-            top_gaps = merged_data.nlargest(3, 'Abs_Gap')
+            # Größte Gaps aller Paare (Teilsortierung je Paar)
+            top_gaps = self.gap_analyzer.top_gaps(gap_source, gap_dimension)
             if not top_gaps.empty:
-                st.markdown("#### ⚠️ Größte Performance-Unterschiede")
-                for _, row in top_gaps.iterrows():
+                st.markdown("#### ⚠️ Größte Performance-Unterschiede je Paar")
+                for _, row in top_gaps[(top_gaps['Bildungsgang_A'] == bg_a) & (top_gaps['Bildungsgang_B'] == bg_b)].iterrows():
                     direction = "besser" if row['Gap'] > 0 else "schlechter"
                     color = "🟢" if row['Gap'] > 0 else "🔴"
-                    st.write(f"{color} **{row[x_field]}**: {bildungsgänge[0]} ist {abs(row['Gap']):.2f} Punkte {direction} ({row['Gap']:+.2f})")
+                    st.write(f"{color} **{row[gap_dimension]}**: {bg_a} ist {abs(row['Gap']):.2f} Punkte {direction} ({row['Gap']:+.2f})")
+                
+                with st.expander("📋 Top-Gaps aller Bildungsgang-Paare"):
+                    st.dataframe(top_gaps, use_container_width=True, hide_index=True)
+    
+    def create_cohort_visualization(self, data):
+        """
+        Pre/Post-Vergleich je Kohorte (Zwischen- vs. Abschlussevaluation)
+        
+        Der Join-Index wird einmal aufgebaut; Themen- und Fragen-Deltas sind danach
+        Lookups über die Paar-Indizes.
+        
+        Args:
+            data: Gefilterte IQES-Daten
+        """
+        scale_data = data[data['Fragentyp'] == 'Antwortskala']
+        cohort_index = IQESCohortIndex(scale_data)
+        
+        if cohort_index.pairs.empty:
+            st.info("Keine Kohorten gefunden: Zu einer Zwischenevaluation fehlt die passende Abschlussevaluation desselben Bildungsgangs.")
+            return
+        
+        pairs = cohort_index.pairs
+        st.markdown(f"**{len(pairs)} Kohorten** mit Zwischen- und Abschlussevaluation")
+        
+        question_key = 'Frage_ID' if 'Frage_ID' in scale_data.columns else 'Fragenummer'
+        cohort_dimension = st.radio(
+            "Veränderung nach:",
+            ['Thema', question_key],
+            format_func=lambda dim: "Einzelfragen" if dim == question_key else dim,
+            horizontal=True,
+            key="cohort_dimension"
+        )
+        
+        delta_matrix = cohort_index.delta_matrix(cohort_dimension)
+        if delta_matrix.empty or delta_matrix.isna().all().all():
+            st.info("Keine gemeinsamen Fragen zwischen Zwischen- und Abschlussevaluation gefunden.")
+            return
+        
+        delta_matrix = delta_matrix.loc[:, delta_matrix.notna().any()]
+        fig_cohorts = go.Figure(data=go.Heatmap(
+            z=delta_matrix.values,
+            x=delta_matrix.columns.astype(str).tolist(),
+            y=delta_matrix.index.tolist(),
+            colorscale='RdYlGn',
+            zmid=0,
+            hovertemplate='%{y}<br>%{x}: %{z:+.2f}<extra></extra>'
+        ))
+        fig_cohorts.update_layout(
+            title="🎓 Veränderung Zwischen- → Abschlussevaluation (Abschluss minus Zwischen)",
+            template='plotly_white',
+            height=max(300, 60 * len(delta_matrix) + 150)
+        )
+        st.plotly_chart(fig_cohorts, use_container_width=True)
+        
+        cohort_deltas = cohort_index.deltas(cohort_dimension)
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.metric("Ø Veränderung", f"{cohort_deltas['Delta'].mean():+.2f}")
+        with col2:
+            st.metric("Verbessert", int((cohort_deltas['Delta'] > 0.1).sum()))
+        with col3:
+            st.metric("Verschlechtert", int((cohort_deltas['Delta'] < -0.1).sum()))
+        
+        with st.expander("📋 Kohorten-Deltas im Detail"):
+            st.dataframe(pairs.drop(columns=['Pre', 'Post']), use_container_width=True, hide_index=True)
+            st.dataframe(cohort_deltas.sort_values('Delta'), use_container_width=True, hide_index=True)
     
     def create_segmentation_analysis(self, data):
         """Intelligente Kombination aller Fragentypen für Segmentierungs-Analyse"""
@@ -1628,12 +1775,9 @@ class SchulqualitätsDashboard:
         choice_data = data[data['Fragentyp'] == 'Einfachauswahl']
         open_data = data[data['Fragentyp'] == 'Offene Frage']
         
-        # Verfügbare Segmentierungsoptionen finden
-        segmentation_options = []
-        if not choice_data.empty and 'Für_Segmentierung' in choice_data.columns:
-            seg_questions = choice_data[choice_data['Für_Segmentierung'] == True]
-            segmentation_options = [(row['Fragenummer'], row['Segmentierungstyp'], row['Frage']) 
-                                  for _, row in seg_questions.iterrows()]
+        # Segmentierungs-Würfel (einmal je Ladevorgang berechnet)
+        cube = self.get_segmentation_cube()
+        segmentation_options = cube.segment_labels()
         
         if not segmentation_options and not scale_data.empty:
             st.info("💡 Segmentierungs-Analyse: Aktuell nur nach Bildungsgang verfügbar. Demografische Daten werden erkannt sobald Einfachauswahl-Fragen vorhanden sind.")
@@ -1650,26 +1794,28 @@ class SchulqualitätsDashboard:
         elif segmentation_options:
             st.markdown("### 🎯 Multidimensionale Analyse")
             
-            # Segmentierungs-Auswahl
+            # Segmentierungs-Auswahl (Index in den Würfel, keine Neuberechnung)
             selected_segment = st.selectbox(
                 "📋 Segmentierung auswählen:",
-                options=[f"{seg_type}: {question[:60]}..." if len(question) > 60 else f"{seg_type}: {question}" 
-                        for _, seg_type, question in segmentation_options],
+                options=range(len(segmentation_options)),
+                format_func=lambda index: segmentation_options[index],
                 help="Wählen Sie eine demografische Dimension für die Analyse aus"
             )
             
-            if selected_segment:
+            evaluation_mask = cube.evaluation_mask(data)
+            
+            if selected_segment is not None and evaluation_mask.any():
                 # Tabs für verschiedene Analysedimensionen
                 tab1, tab2, tab3 = st.tabs(["📊 Segmentierte Trends", "🔍 Vergleichsanalyse", "💬 Qualitative Insights"])
                 
                 with tab1:
-                    self._show_segmented_trends(scale_data, choice_data, selected_segment)
+                    self._show_segmented_trends(cube, selected_segment, evaluation_mask)
                 
                 with tab2:
-                    self._show_segment_comparison(scale_data, choice_data, selected_segment)
+                    self._show_segment_comparison(cube, selected_segment, evaluation_mask)
                 
                 with tab3:
-                    self._show_qualitative_by_segment(open_data, choice_data, selected_segment)
+                    self._show_qualitative_by_segment(cube, selected_segment, evaluation_mask)
         else:
             st.info("📋 Keine auswertbaren Daten für Segmentierung verfügbar.")
     
@@ -1715,6 +1861,16 @@ class SchulqualitätsDashboard:
             st.markdown("#### 📊 Themenbereiche-Performance")
             theme_performance = scale_data.groupby('Thema')['Bewertung'].agg(['mean', 'count']).round(2)
             theme_performance.columns = ['Durchschnitt', 'Anzahl Fragen']
+            
+            # Exakte Kennzahlen aus gepoolten Antwortverteilungen (Summe der Häufigkeiten)
+            pooled = self.distribution_stats.pool_distributions(scale_data, 'Thema').set_index('Thema')
+            if not pooled.empty and pooled['N_Verteilung'].sum() > 0:
+                theme_performance['Median'] = pooled['Median']
+                theme_performance['Std.-Abw.'] = pooled['Standardabweichung'].round(2)
+                theme_performance['Zustimmung (%)'] = (pooled['Zustimmung_Anteil'] * 100).round(1)
+                theme_performance['Top-Box (%)'] = (pooled['Top_Box_Anteil'] * 100).round(1)
+                theme_performance['Bottom-Box (%)'] = (pooled['Bottom_Box_Anteil'] * 100).round(1)
+            
             theme_performance = theme_performance.sort_values('Durchschnitt', ascending=False)
             
             # Farbkodierung für Performance
@@ -1753,132 +1909,372 @@ class SchulqualitätsDashboard:
             fig.update_layout(height=400)
             st.plotly_chart(fig, use_container_width=True)
     
-    def _show_segmented_trends(self, scale_data, choice_data, selected_segment):
-        """Placeholder für segmentierte Trend-Analyse"""
-        st.info("🚧 Segmentierte Trend-Analyse wird implementiert wenn demografische Daten verfügbar sind.")
+    def create_cluster_visualization(self, data):
+        """
+        Fragen-Cluster nach Antwortmuster, Trend und Bildungsgang-Gap
+        
+        Die Modelle werden je Datenstand in st.session_state gecacht; Reruns mit
+        unveränderten Daten und Filtern trainieren nicht neu.
+        
+        Args:
+            data: Gefilterte IQES-Daten
+        """
+        scale_data = data[data['Fragentyp'] == 'Antwortskala']
+        if len(scale_data) < self.question_clusterer.n_clusters:
+            st.info("Zu wenige Antwortskala-Fragen für eine Cluster-Analyse.")
+            return
+        
+        clustered = self.question_clusterer.assign_clusters(scale_data, st.session_state)
+        clustered = clustered[clustered['Cluster'].notna()].copy()
+        clustered['Cluster_Label'] = "Cluster " + clustered['Cluster'].astype(str)
+        
+        question_key = 'Frage_ID' if 'Frage_ID' in clustered.columns else 'Fragenummer'
+        hover_columns = [col for col in [question_key, 'Bildungsgang', 'Datum', 'Bewertung', 'Thema'] if col in clustered.columns]
+        
+        if 'Cluster_PC2' in clustered.columns:
+            fig = px.scatter(
+                clustered.sort_values('Cluster'),
+                x='Cluster_PC1',
+                y='Cluster_PC2',
+                color='Cluster_Label',
+                hover_data=hover_columns,
+                title="🧩 Fragen-Cluster (Hauptkomponenten der Merkmale)",
+                labels={'Cluster_PC1': 'Komponente 1', 'Cluster_PC2': 'Komponente 2', 'Cluster_Label': 'Cluster'}
+            )
+            fig.update_layout(template='plotly_white', height=450)
+            st.plotly_chart(fig, use_container_width=True)
+        
+        st.markdown("#### 📋 Cluster-Profile (Cluster 1 = niedrigste Bewertung)")
+        profiles = self.question_clusterer.cluster_profiles(clustered)
+        st.dataframe(profiles, use_container_width=True)
+        
+        selected_cluster = st.selectbox("Fragen im Cluster:", sorted(clustered['Cluster'].unique().tolist()), key="cluster_select")
+        members = clustered[clustered['Cluster'] == selected_cluster]
+        member_columns = [col for col in [question_key, 'Frage', 'Bildungsgang', 'Datum', 'Bewertung'] if col in members.columns]
+        st.dataframe(members[member_columns].sort_values('Bewertung'), use_container_width=True, hide_index=True)
+    
+    def get_segmentation_cube(self):
+        """
+        Segmentierungs-Würfel über alle geladenen Daten, gecacht je Datei- und Konfigurationsversion
+        
+        Returns:
+            IQESSegmentationCube
+        """
+        cache_key = (st.session_state.get('last_file_hash'), st.session_state.get('derived_config_version'))
+        if st.session_state.get('segmentation_cube_key') != cache_key or 'segmentation_cube' not in st.session_state:
+            st.session_state.segmentation_cube = IQESSegmentationCube(self.processed_data)
+            st.session_state.segmentation_cube_key = cache_key
+        return st.session_state.segmentation_cube
+    
+    def get_text_corpus(self):
+        """
+        Text-Korpus aller offenen Antworten mit Sentiment-Spalte, gecacht je Datei- und Konfigurationsversion
+        
+        Nahezu gleiche Antworten einer Frage sind zu einem Repräsentanten mit
+        'Anzahl' zusammengefasst (TEXT_DEDUP_CONFIG).
+        
+        Returns:
+            IQESTextCorpus
+        """
+        cache_key = (st.session_state.get('last_file_hash'), st.session_state.get('derived_config_version'))
+        if st.session_state.get('text_corpus_key') != cache_key or 'text_corpus' not in st.session_state:
+            deduplicator = IQESAnswerDeduplicator(GERMAN_STOPWORDS) if TEXT_DEDUP_CONFIG['enabled'] else None
+            corpus = IQESTextCorpus(self.processed_data, deduplicator)
+            self.sentiment_scorer.annotate(corpus)
+            st.session_state.text_corpus = corpus
+            st.session_state.text_corpus_key = cache_key
+        return st.session_state.text_corpus
+    
+    def get_keyword_index(self):
+        """
+        Schlagwort-Index (Term × Frage/Zeitraum/Bildungsgang) über den Text-Korpus, gecacht je Datei- und Konfigurationsversion
+        
+        Returns:
+            IQESKeywordIndex
+        """
+        cache_key = (st.session_state.get('last_file_hash'), st.session_state.get('derived_config_version'))
+        if st.session_state.get('keyword_index_key') != cache_key or 'keyword_index' not in st.session_state:
+            st.session_state.keyword_index = IQESKeywordIndex(self.get_text_corpus(), GERMAN_STOPWORDS)
+            st.session_state.keyword_index_key = cache_key
+        return st.session_state.keyword_index
+    
+    def get_text_topics(self):
+        """
+        Themen-Modell der offenen Antworten; corpus.answers erhält 'Textthema' und 'Textthema_Label'
+        
+        Das Modell bleibt für die ganze Sitzung erhalten: Neue Dateien (z.B. ein
+        weiterer Zeitraum) werden einmal je Datenstand hinzugelernt, ohne die
+        bisherigen Themen neu zu berechnen.
+        
+        Returns:
+            Tuple (IQESTopicModel, IQESTextCorpus)
+        """
+        corpus = self.get_text_corpus()
+        if 'topic_model' not in st.session_state:
+            st.session_state.topic_model = IQESTopicModel(GERMAN_STOPWORDS)
+        model = st.session_state.topic_model
+        
+        cache_key = (st.session_state.get('last_file_hash'), st.session_state.get('derived_config_version'))
+        if st.session_state.get('text_topics_key') != cache_key or 'Textthema' not in corpus.answers.columns:
+            model.update(corpus)
+            model.assign(corpus)
+            st.session_state.text_topics_key = cache_key
+        return model, corpus
+    
+    def create_text_topic_analysis(self, data):
+        """
+        Themen der offenen Antworten im Filter und ihr Anteil je Evaluationszeitraum
+        
+        Args:
+            data: Gefilterte IQES-Daten (offene Fragen)
+        """
+        model, corpus = self.get_text_topics()
+        if not model.is_fitted:
+            st.info("Zu wenige offene Antworten für eine Themen-Analyse.")
+            return
+        
+        answers = corpus.answers[corpus.row_mask(data)]
+        answers = answers[answers['Textthema'].notna()]
+        if answers.empty:
+            st.info("Keine Antworten mit zuordenbarem Thema im aktuellen Filter.")
+            return
+        
+        # Übersicht: Gewicht, Anteil und häufigste Aussage je Thema
+        summary = answers.groupby(['Textthema', 'Textthema_Label'])['Anzahl'].sum().reset_index()
+        summary['Anteil'] = (summary['Anzahl'] / summary['Anzahl'].sum() * 100).round(1)
+        examples = answers.sort_values('Anzahl', ascending=False).drop_duplicates('Textthema').set_index('Textthema')['Antwort']
+        summary['Beispiel'] = summary['Textthema'].map(examples)
+        summary = summary.sort_values('Anzahl', ascending=False)
+        st.dataframe(
+            summary.rename(columns={'Textthema': 'Nr.', 'Textthema_Label': 'Thema (Begriffe)', 'Anteil': 'Anteil %'}),
+            use_container_width=True, hide_index=True
+        )
+        
+        if answers['Datum'].nunique() > 1:
+            shares = model.topic_shares(answers, by='Datum')
+            fig = px.area(
+                shares.sort_values(['Datum', 'Textthema']),
+                x='Datum', y='Anteil', color='Textthema_Label',
+                title="Anteil der Themen je Evaluationszeitraum",
+                labels={'Anteil': 'Anteil der Antworten', 'Textthema_Label': 'Thema'}
+            )
+            fig.update_layout(height=400, yaxis=dict(tickformat='.0%'))
+            st.plotly_chart(fig, use_container_width=True)
+    
+    def get_text_search(self):
+        """
+        Volltext-Index mit den Schlüsseln der aktuellen Fragezeilen; neue Quellen werden einmal je Datenstand indexiert
+        
+        Returns:
+            Tuple (IQESTextSearchIndex, Series Zeilenindex -> Schlüssel)
+        """
+        search_index = get_text_search_index()
+        cache_key = st.session_state.get('last_file_hash')
+        if st.session_state.get('text_search_key') != cache_key or 'text_search_rows' not in st.session_state:
+            added = search_index.sync(self.processed_data)
+            if added:
+                st.info(f"🔎 {added} Textantworten in den Suchindex aufgenommen")
+            st.session_state.text_search_rows = search_index.row_keys(self.processed_data)
+            st.session_state.text_search_key = cache_key
+        return search_index, st.session_state.text_search_rows
+    
+    def _show_segmented_trends(self, cube, segment, evaluation_mask):
+        """Zusammensetzung des Segments über die Evaluationszeiträume"""
+        composition = cube.crosstab(segment, evaluation_mask, by='Datum')
+        if composition.empty or composition.isna().all().all():
+            st.info("Keine Verteilungsdaten für dieses Segment im gewählten Filter.")
+            return
+        
+        fig = go.Figure()
+        colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
+                  '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+        
+        for i, option in enumerate(composition.index):
+            fig.add_trace(go.Scatter(
+                x=composition.columns,
+                y=composition.loc[option] * 100,
+                mode='lines+markers',
+                name=str(option),
+                line=dict(width=3, color=colors[i % len(colors)]),
+                hovertemplate=f'<b>{option}</b><br>Datum: %{{x}}<br>Anteil: %{{y:.1f}}%<extra></extra>'
+            ))
+        
+        fig.update_layout(
+            title="👥 Zusammensetzung über Zeit (gewichtet nach Antwortzahl)",
+            xaxis_title="Evaluationszeitraum",
+            yaxis_title="Anteil (%)",
+            template='plotly_white',
+            height=400
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        
+        # Zusammensetzung je Bildungsgang
+        by_program = cube.crosstab(segment, evaluation_mask, by='Bildungsgang')
+        if not by_program.empty:
+            st.markdown("#### 🎓 Zusammensetzung je Bildungsgang")
+            st.dataframe((by_program * 100).round(1), use_container_width=True)
     
-    def _show_segment_comparison(self, scale_data, choice_data, selected_segment):
-        """Placeholder für Segment-Vergleiche"""
-        st.info("🚧 Segment-Vergleiche werden implementiert wenn demografische Daten verfügbar sind.")
+    def _show_segment_comparison(self, cube, segment, evaluation_mask):
+        """Themenbewertungen je Segment-Option aus den vorberechneten Arrays"""
+        weighted = cube.weighted_ratings(segment, evaluation_mask)
+        if weighted.empty or weighted.isna().all().all():
+            st.info("Keine Bewertungsdaten für einen Segment-Vergleich verfügbar.")
+            return
+        
+        st.caption("Näherung: IQES liefert keine Einzelantworten. Jede Evaluation geht mit dem Anteil der Option an den Antwortenden in den Mittelwert ein.")
+        
+        fig = go.Figure(data=go.Heatmap(
+            z=weighted.values,
+            x=weighted.columns.astype(str).tolist(),
+            y=weighted.index.astype(str).tolist(),
+            colorscale='RdYlGn',
+            zmin=1,
+            zmax=4,
+            text=weighted.round(2).values,
+            texttemplate='%{text:.2f}',
+            hovertemplate='%{y}<br>%{x}: %{z:.2f}<extra></extra>'
+        ))
+        fig.update_layout(
+            title="🔍 Gewichtete Themenbewertung je Segment-Option",
+            template='plotly_white',
+            height=max(300, 60 * len(weighted) + 150)
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        
+        correlation = cube.share_rating_correlation(segment, evaluation_mask)
+        if not correlation.empty and correlation.notna().any().any():
+            st.markdown("#### 📐 Zusammenhang Segmentanteil ↔ Themenbewertung")
+            st.caption("Pearson-Korrelation über Evaluationen (mind. 3 gemeinsame Evaluationen)")
+            st.dataframe(correlation.round(2), use_container_width=True)
     
-    def _show_qualitative_by_segment(self, open_data, choice_data, selected_segment):
-        """Placeholder für qualitative Analyse nach Segmenten"""
-        st.info("🚧 Qualitative Segmentierung wird implementiert wenn demografische Daten verfügbar sind.")
+    def _show_qualitative_by_segment(self, cube, segment, evaluation_mask):
+        """Offene Rückmeldungen je Evaluation neben der Segment-Zusammensetzung"""
+        table = cube.evaluation_table(segment, evaluation_mask)
+        if table.empty:
+            st.info("Keine Evaluationen im gewählten Filter.")
+            return
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Offene Antworten", f"{int(table['Offene Antworten'].sum()):,}")
+        with col2:
+            st.metric("Evaluationen", len(table))
+        
+        st.dataframe(table, use_container_width=True, hide_index=True)
 
 class KI_Schulqualitäts_Analyzer:
     """KI-gestützte Analyse von IQES-Schulqualitätsdaten mit Google Gemini"""
     
-    def __init__(self):
-        self.scaler = StandardScaler()
-        self.kmeans = None
-        self.pca = None
-        self.gemini_client = None
-        self.openai_client = None  # Fallback
-        self.setup_ai_clients()
-    
-    def setup_ai_clients(self):
-        """Setup AI-Clients: Primär Gemini, Fallback OpenAI"""
-        # Google Gemini (primär)
-        if GEMINI_AVAILABLE:
-            api_key = os.getenv('GOOGLE_AI_API_KEY')
-            if api_key:
-                try:
-                    self.gemini_client = genai.Client(api_key=api_key)
-                    # Test API connection
-                    test_response = self.gemini_client.models.generate_content(
-                        model="gemini-2.5-flash",
-                        contents="Test"
-                    )
-                    st.sidebar.success("🤖 Google Gemini AI verbunden")
-                except Exception as e:
-                    st.sidebar.error(f"❌ Gemini Verbindungsfehler: {str(e)[:100]}...")
-                    self.gemini_client = None
-        
-        # OpenAI (Fallback)
-        if OPENAI_AVAILABLE and not self.gemini_client:
-            api_key = os.getenv('OPENAI_API_KEY')
-            if api_key:
-                try:
-                    self.openai_client = openai.OpenAI(api_key=api_key)
-                    st.sidebar.info("🤖 OpenAI Fallback verbunden")
-                except Exception:
-                    pass
+    def __init__(self, client_manager=None, dispatcher=None):
+        self.clients = client_manager or get_ai_client_manager()
+        # Testantworten des lokalen Anbieters nicht im persistenten Cache ablegen
+        fake_provider = os.getenv('IQES_LLM_PROVIDER') == 'fake'
+        self.response_cache = IQESLLMCache(path=':memory:') if fake_provider else IQESLLMCache()
+        self.dispatcher = dispatcher or get_llm_dispatcher()
+        self.summarizer = IQESMapReduceSummarizer(self.dispatcher)
+        self.sentiment_scorer = IQESSentimentScorer()
+        self.extractive_summarizer = IQESExtractiveSummarizer(GERMAN_STOPWORDS, sentiment=self.score_sentiment_german)
     
-    def analyze_german_text_responses(self, text_responses):
-        """Analysiert deutsche Textantworten mit KI-Features"""
+    @property
+    def gemini_client(self):
+        """Gemini-Client (primär); None, wenn nicht konfiguriert oder gesperrt"""
+        return self.clients.client('gemini')
+    
+    @property
+    def openai_client(self):
+        """OpenAI-Client (Fallback); nur genutzt, wenn Gemini nicht verfügbar ist"""
+        if self.clients.client('gemini') is not None:
+            return None
+        return self.clients.client('openai')
+    
+    def analyze_german_text_responses(self, text_responses, include_ai=True, sentiment_scores=None, keywords=None,
+                                      weights=None):
+        """
+        Analysiert deutsche Textantworten mit KI-Features
+        
+        Args:
+            text_responses: Textantworten (bei zusammengefassten Duplikaten: Repräsentanten)
+            include_ai: False = ohne API-Aufrufe
+            sentiment_scores: Bereits berechnete Scores, z.B. aus dem Text-Korpus
+            keywords: Bereits ermittelte Begriffe, z.B. aus dem Schlagwort-Index
+            weights: Anzahl vertretener Antworten je Text (None = je 1)
+            
+        Returns:
+            Dictionary mit Kennzahlen, Sentiment, Begriffen und Insights
+        """
         if not text_responses or len(text_responses) == 0:
             return {}
         
+        counts = np.ones(len(text_responses)) if weights is None else np.asarray(weights, dtype=float)
         analysis = {
-            'total_responses': len(text_responses),
-            'avg_length': np.mean([len(text) for text in text_responses]),
-            'sentiment_analysis': self.analyze_sentiment_german(text_responses),
-            'keyword_analysis': self.extract_german_keywords(text_responses)
+            'total_responses': int(counts.sum()),
+            'avg_length': np.average([len(text) for text in text_responses], weights=counts),
+            'sentiment_analysis': self.analyze_sentiment_german(text_responses, sentiment_scores, counts),
+            'keyword_analysis': keywords if keywords is not None else self.extract_german_keywords(text_responses, counts)
         }
         
-        # Erweiterte AI-Analyse mit Gemini (primär) oder OpenAI (fallback)
+        # Erweiterte AI-Analyse mit Gemini (primär) oder OpenAI (fallback); Duplikate als Häufigkeitsangabe
+        if not include_ai:
+            return analysis
+        prompt_texts = with_multiplicity(text_responses, weights)
         if self.gemini_client:
-            analysis['ai_insights'] = self.generate_gemini_insights_german(text_responses)
-            analysis['ai_recommendations'] = self.generate_gemini_recommendations(text_responses)
+            analysis['ai_insights'] = self.generate_gemini_insights_german(prompt_texts)
+            analysis['ai_recommendations'] = self.generate_gemini_recommendations(prompt_texts)
         elif self.openai_client:
-            analysis['ai_insights'] = self.generate_ai_insights_german(text_responses)
+            analysis['ai_insights'] = self.generate_ai_insights_german(prompt_texts)
+        
+        # Ohne KI-Anbieter oder bei Fehler: lokale extraktive Zusammenfassung
+        analysis['insights_source'] = 'KI' if analysis.get('ai_insights') else 'lokal'
+        if not analysis.get('ai_insights'):
+            analysis['ai_insights'] = self.extractive_summarizer.insights(text_responses, counts)
         
         return analysis
     
-    def analyze_sentiment_german(self, texts):
-        """Analysiert Sentiment deutscher Texte"""
-        positive_words = {
-            'gut', 'super', 'toll', 'schön', 'prima', 'klasse', 'perfekt', 'zufrieden', 
-            'positiv', 'gefallen', 'freude', 'erfolg', 'dankbar', 'empfehlen'
-        }
-        
-        negative_words = {
-            'schlecht', 'schlimm', 'negativ', 'problem', 'schwierig', 'unzufrieden',
-            'fehler', 'mangel', 'kritik', 'beschwerde', 'verbesserung', 'stress'
-        }
-        
-        sentiment_scores = []
-        for text in texts:
-            words = set(text.lower().split())
-            positive_count = len(words.intersection(positive_words))
-            negative_count = len(words.intersection(negative_words))
-            
-            if positive_count + negative_count > 0:
-                score = (positive_count - negative_count) / (positive_count + negative_count)
-            else:
-                score = 0
-            
-            sentiment_scores.append(score)
+    def analyze_sentiment_german(self, texts, sentiment_scores=None, weights=None):
+        """Analysiert Sentiment deutscher Texte (sentiment_scores: bereits berechnete Scores, z.B. aus dem Text-Korpus; weights: Anzahl je Text)"""
+        if sentiment_scores is None:
+            sentiment_scores = self.score_sentiment_german(texts)
         
+        scores = np.asarray(sentiment_scores, dtype=float)
+        counts = np.ones(len(scores)) if weights is None else np.asarray(weights, dtype=float)
         return {
-            'avg_sentiment': np.mean(sentiment_scores),
-            'positive_ratio': len([s for s in sentiment_scores if s > 0]) / len(sentiment_scores),
-            'negative_ratio': len([s for s in sentiment_scores if s < 0]) / len(sentiment_scores)
+            'avg_sentiment': np.average(scores, weights=counts),
+            'positive_ratio': counts[scores > 0].sum() / counts.sum(),
+            'negative_ratio': counts[scores < 0].sum() / counts.sum()
         }
     
-    def extract_german_keywords(self, texts):
-        """Extrahiert deutsche Schlüsselwörter"""
-        word_freq = {}
-        
-        for text in texts:
-            words = re.findall(r'\b\w+\b', text.lower())
-            for word in words:
-                if len(word) > 3 and word not in GERMAN_STOPWORDS:
-                    word_freq[word] = word_freq.get(word, 0) + 1
-        
-        sorted_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
-        return dict(sorted_words[:15])  # Top 15 Wörter
+    def score_sentiment_german(self, texts):
+        """Sentiment je Text zwischen -1 (negativ) und 1 (positiv)"""
+        return self.sentiment_scorer.score_texts(texts).tolist()
+    
+    def extract_german_keywords(self, texts, weights=None):
+        """Extrahiert deutsche Schlüsselwörter (Top 15; für gefilterte Korpusdaten besser IQESKeywordIndex.top_keywords)"""
+        return count_keywords(texts, GERMAN_STOPWORDS, k=15, weights=weights)
     
     def generate_ai_insights_german(self, texts):
         """Generiert KI-Insights für deutsche Texte mit OpenAI"""
         if not self.openai_client or len(texts) == 0:
             return None
         
-        sample_texts = texts[:8] if len(texts) > 8 else texts
-        combined_text = '\n\n'.join(sample_texts)
+        chunks = self.summarizer.chunk_texts(texts)
+        if not chunks:
+            return None
         
         try:
-            response = self.openai_client.chat.completions.create(
+            # Passt alles in ein Teilstück: direkte Analyse, sonst Map-Reduce über alle Antworten
+            if len(chunks) == 1:
+                return self._request_openai_insights(chunks[0])
+            return self.summarize_texts(chunks)
+        
+        except Exception:
+            return None
+    
+    def _request_openai_insights(self, sample_texts, cached_only=False):
+        """OpenAI-Insights über den Antwort-Cache (Fehler werden weitergereicht; cached_only: ohne API-Aufruf)"""
+        combined_text = '\n\n'.join(sample_texts)
+        
+        def generate(client):
+            response = client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {
@@ -1893,22 +2289,40 @@ class KI_Schulqualitäts_Analyzer:
                 max_tokens=400,
                 temperature=0.3
             )
-            
             return response.choices[0].message.content
-            
-        except Exception:
-            return None
+        
+        content, _ = self.response_cache.get_or_generate(
+            'openai', 'gpt-3.5-turbo', PROMPT_TEMPLATE_VERSIONS['openai_insights'], sample_texts,
+            (lambda: None) if cached_only else functools.partial(self.clients.call, 'openai', generate),
+            params={'max_tokens': 400, 'temperature': 0.3}
+        )
+        return content
     
     def generate_gemini_insights_german(self, texts):
         """Generiert KI-Insights für deutsche Texte mit Google Gemini"""
         if not self.gemini_client or len(texts) == 0:
             return None
         
-        sample_texts = texts[:8] if len(texts) > 8 else texts
-        combined_text = '\n\n'.join(sample_texts)
+        chunks = self.summarizer.chunk_texts(texts)
+        if not chunks:
+            return None
         
         try:
-            response = self.gemini_client.models.generate_content(
+            # Passt alles in ein Teilstück: direkte Analyse, sonst Map-Reduce über alle Antworten
+            if len(chunks) == 1:
+                return self._request_gemini_insights(chunks[0])
+            return self.summarize_texts(chunks)
+        
+        except Exception as e:
+            st.error(f"Gemini Fehler: {e}")
+            return None
+    
+    def _request_gemini_insights(self, sample_texts, cached_only=False):
+        """Gemini-Insights über den Antwort-Cache (Fehler werden weitergereicht; cached_only: ohne API-Aufruf)"""
+        combined_text = '\n\n'.join(sample_texts)
+        
+        def generate(client):
+            response = client.models.generate_content(
                 model="gemini-2.5-flash",
                 contents=f"""Du bist ein Experte für Schulentwicklung und IQES-Evaluationen. 
                 
@@ -1925,12 +2339,123 @@ AUFGABE:
 
 Antworte auf Deutsch, strukturiert und praxisorientiert für Schulleitung."""
             )
-            
             return response.text
-            
-        except Exception as e:
-            st.error(f"Gemini Fehler: {e}")
-            return None
+        
+        insights, _ = self.response_cache.get_or_generate(
+            'gemini', 'gemini-2.5-flash', PROMPT_TEMPLATE_VERSIONS['gemini_insights'], sample_texts,
+            (lambda: None) if cached_only else functools.partial(self.clients.call, 'gemini', generate)
+        )
+        return insights
+    
+    def _complete(self, template, texts, cached_only=False, **fields):
+        """
+        Cache-gestützte Anfrage an den aktiven Anbieter mit einer Vorlage aus SUMMARY_PROMPTS
+        
+        Args:
+            template: Name der Vorlage
+            texts: Eingaben (Antworten oder Teilzusammenfassungen); bestimmen den Cache-Schlüssel
+            cached_only: Nur aus dem Cache, ohne API-Aufruf
+            **fields: Weitere Platzhalter der Vorlage (z.B. answers, total_answers; Teil des Cache-Schlüssels)
+            
+        Returns:
+            Antworttext oder None
+            
+        Raises:
+            IQESProviderUnavailable: Kein KI-Anbieter verfügbar
+        """
+        provider = 'gemini' if self.gemini_client else 'openai' if self.openai_client else None
+        if provider is None:
+            raise IQESProviderUnavailable("Kein KI-Anbieter verfügbar")
+        
+        model = LLM_MODELS[provider]
+        prompt = SUMMARY_PROMPTS[template].format(texts='\n\n'.join(texts), count=len(texts), **fields)
+        
+        def generate(client):
+            if provider == 'gemini':
+                return client.models.generate_content(model=model, contents=prompt).text
+            response = client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=600,
+                temperature=0.3
+            )
+            return response.choices[0].message.content
+        
+        result, _ = self.response_cache.get_or_generate(
+            provider, model, PROMPT_TEMPLATE_VERSIONS[template], texts,
+            (lambda: None) if cached_only else functools.partial(self.clients.call, provider, generate),
+            params=fields or None
+        )
+        return result
+    
+    def summarize_texts(self, chunks):
+        """
+        Map-Reduce-Analyse aller Antworten
+        
+        Jedes Teilstück wird einzeln zusammengefasst (Cache je Teilstück-Inhalt),
+        die Teilzusammenfassungen werden verdichtet und abschließend ausgewertet.
+        Fallen Teilstücke aus, wird die Analyse als Teilergebnis gekennzeichnet.
+        
+        Args:
+            chunks: Teilstücke aus summarizer.chunk_texts
+            
+        Returns:
+            Strukturierte Analyse oder None
+        """
+        result, coverage = self.summarizer.summarize(
+            chunks,
+            functools.partial(self._complete, 'chunk_summary'),
+            functools.partial(self._complete, 'summary_combine'),
+            functools.partial(self._complete, 'summary_insights')
+        )
+        if result and coverage['answers'] < coverage['total_answers']:
+            result += (f"\n\n⚠️ Teilergebnis: Die Analyse beruht auf {coverage['answers']} von "
+                       f"{coverage['total_answers']} Antworten, da einzelne KI-Anfragen fehlgeschlagen sind.")
+        return result
+    
+    def generate_question_insights(self, question_texts, on_result=None, question_weights=None):
+        """
+        KI-Insights je offene Frage, alle Anfragen gleichzeitig (ohne KI-Anbieter: lokal extraktiv)
+        
+        Args:
+            question_texts: Dictionary {Fragenbezeichnung: Liste der Textantworten}
+            on_result: Optionaler Callback (Fragenbezeichnung, Insights, Fehler), sobald eine Antwort vorliegt
+            question_weights: Optional {Fragenbezeichnung: Anzahl vertretener Antworten je Text}
+            
+        Returns:
+            Dictionary {Fragenbezeichnung: (Insights oder None, Fehler oder None)}
+        """
+        if self.gemini_client:
+            request = self._request_gemini_insights
+        elif self.openai_client:
+            request = self._request_openai_insights
+        else:
+            # Ohne KI-Anbieter: lokale extraktive Zusammenfassung, ohne Netzwerk und sofort
+            results = {}
+            for label, texts in question_texts.items():
+                insights = self.extractive_summarizer.insights(texts, question_weights.get(label) if question_weights else None)
+                results[label] = (insights, None)
+                if on_result is not None:
+                    on_result(label, insights, None)
+            return results
+        
+        # Gecachte Antworten sofort anzeigen, nur der Rest belastet das Ratenlimit
+        results, jobs = {}, {}
+        for label, texts in question_texts.items():
+            if len(texts) == 0:
+                continue
+            weights = question_weights.get(label) if question_weights else None
+            sample_texts = with_multiplicity(texts[:8], weights[:8] if weights is not None else None)
+            cached = request(sample_texts, cached_only=True)
+            if cached:
+                results[label] = (cached, None)
+                if on_result is not None:
+                    on_result(label, cached, None)
+            else:
+                jobs[label] = functools.partial(request, sample_texts)
+        
+        results.update(self.dispatcher.dispatch(jobs, on_result))
+        return results
     
     def generate_gemini_recommendations(self, texts):
         """Generiert spezifische Handlungsempfehlungen mit Gemini"""
@@ -1940,8 +2465,8 @@ Antworte auf Deutsch, strukturiert und praxisorientiert für Schulleitung."""
         sample_texts = texts[:5] if len(texts) > 5 else texts
         combined_text = '\n\n'.join(sample_texts)
         
-        try:
-            response = self.gemini_client.models.generate_content(
+        def generate(client):
+            response = client.models.generate_content(
                 model="gemini-2.5-flash",
                 contents=f"""Basierend auf diesen IQES-Schülerrückmeldungen, erstelle 3 priorisierte Handlungsempfehlungen:
 
@@ -1957,13 +2482,18 @@ FORMAT (JSON-ähnlich):
 
 Fokus auf umsetzbare, realistische Maßnahmen für Schulleitung. Auf Deutsch antworten."""
             )
-            
-            # Parse response into structured recommendations
-            recommendations_text = response.text
+            return response.text
+        
+        try:
+            # Rohtext wird gecacht, das Parsing läuft bei jedem Aufruf
+            recommendations_text, _ = self.response_cache.get_or_generate(
+                'gemini', 'gemini-2.5-flash', PROMPT_TEMPLATE_VERSIONS['gemini_recommendations'],
+                sample_texts, functools.partial(self.clients.call, 'gemini', generate)
+            )
             recommendations = []
             
             # Simple parsing - in Produktion würde man robusteres Parsing verwenden
-            if "1." in recommendations_text and "PRIORITÄT" in recommendations_text:
+            if recommendations_text and "1." in recommendations_text and "PRIORITÄT" in recommendations_text:
                 recommendations.append({
                     'source': 'Gemini AI',
                     'content': recommendations_text,
@@ -1976,8 +2506,8 @@ Fokus auf umsetzbare, realistische Maßnahmen für Schulleitung. Auf Deutsch ant
             st.error(f"Gemini Empfehlungen Fehler: {e}")
             return []
     
-    def generate_smart_recommendations(self, data):
-        """Generiert intelligente IQES-spezifische Empfehlungen"""
+    def generate_smart_recommendations(self, data, corpus=None):
+        """Generiert intelligente IQES-spezifische Empfehlungen (corpus: Text-Korpus mit Sentiment-Spalte)"""
         if data.empty:
             return []
             
@@ -2004,21 +2534,33 @@ Fokus auf umsetzbare, realistische Maßnahmen für Schulleitung. Auf Deutsch ant
         
         # 2. Textanalyse-basierte Empfehlungen (mit KI)
         if not text_data.empty:
-            for _, text_question in text_data.iterrows():
-                if 'Textantworten' in text_question and text_question['Textantworten']:
-                    text_analysis = self.analyze_german_text_responses(text_question['Textantworten'])
-                    
-                    # Negative Sentiment Detection
-                    if text_analysis.get('sentiment_analysis', {}).get('negative_ratio', 0) > 0.3:
-                        recommendations.append({
-                            'priority': 'MITTEL',
-                            'type': 'Negatives Feedback (KI-Analyse)',
-                            'title': 'Kritische Textantworten erkannt',
-                            'description': f'{text_analysis["sentiment_analysis"]["negative_ratio"]*100:.1f}% negative Tendenz',
-                            'action': 'Detailanalyse und Feedback-Gespräche führen',
-                            'timeline': '2-3 Wochen',
-                            'impact': 'Mittel'
-                        })
+            # Anteil negativer Antworten je Fragezeile aus der Sentiment-Spalte des Korpus (ohne erneutes Scoring)
+            if corpus is not None and 'Sentiment' in corpus.answers.columns:
+                answers = corpus.answers[corpus.row_mask(text_data)]
+                negative_counts = answers['Anzahl'].where(answers['Sentiment'] < 0, 0)
+                negative_ratios = (
+                    negative_counts.groupby(answers['Zeile'], sort=False).sum()
+                    / answers['Anzahl'].groupby(answers['Zeile'], sort=False).sum()
+                )
+            else:
+                negative_ratios = pd.Series({
+                    index: np.mean(np.array(self.score_sentiment_german(texts)) < 0)
+                    for index, texts in text_data.get('Textantworten', pd.Series(dtype=object)).items()
+                    if isinstance(texts, list) and texts
+                }, dtype=float)
+            
+            for negative_ratio in negative_ratios:
+                # Negative Sentiment Detection
+                if negative_ratio > 0.3:
+                    recommendations.append({
+                        'priority': 'MITTEL',
+                        'type': 'Negatives Feedback (KI-Analyse)',
+                        'title': 'Kritische Textantworten erkannt',
+                        'description': f'{negative_ratio*100:.1f}% negative Tendenz',
+                        'action': 'Detailanalyse und Feedback-Gespräche führen',
+                        'timeline': '2-3 Wochen',
+                        'impact': 'Mittel'
+                    })
         
         # 3. Bildungsgang-Vergleiche
         if not scale_data.empty and 'Bildungsgang' in scale_data.columns and len(scale_data['Bildungsgang'].unique()) > 1:
@@ -2118,13 +2660,20 @@ def main():
                             if dashboard.ki_analyzer is None:
                                 try:
                                     dashboard.ki_analyzer = KI_Schulqualitäts_Analyzer()
-                                    if dashboard.ki_analyzer.gemini_client:
-                                        st.success("✅ Google Gemini AI verbunden")
-                                    elif dashboard.ki_analyzer.openai_client:
-                                        st.info("🔄 OpenAI Fallback aktiv")
+                                    clients = dashboard.ki_analyzer.clients
+                                    provider = clients.active_provider()
+                                    provider_name = {'gemini': 'Google Gemini AI', 'openai': 'OpenAI Fallback'}.get(provider)
+                                    health = clients.health(provider) if provider else {}
+                                    if provider and health['status'] == 'ok':
+                                        st.success(f"✅ {provider_name} verbunden")
+                                    elif provider:
+                                        st.info(f"🔄 {provider_name} bereit (Verbindung bei erster Anfrage)")
                                     else:
-                                        st.warning("⚠️ Keine KI-Services verfügbar")
-                                        enable_ai_analysis = False
+                                        unreachable = [name for name in clients.providers if clients.health(name)['status'] == 'gesperrt']
+                                        if unreachable:
+                                            st.warning(f"⚠️ KI-Anbieter nicht erreichbar ({', '.join(unreachable)}), lokale Zusammenfassung aktiv")
+                                        else:
+                                            st.info("💡 Keine KI-Services verfügbar, lokale Zusammenfassung aktiv")
                                 except Exception as e:
                                     st.error(f"❌ KI-Setup Fehler: {e}")
                                     enable_ai_analysis = False
@@ -2135,12 +2684,9 @@ def main():
                         st.header("⚡ Performance")
                         
                         if st.button("🗑️ Cache leeren", help="Leert den Daten-Cache und erzwingt Neuverarbeitung"):
-                            if 'processed_data' in st.session_state:
-                                del st.session_state.processed_data
+                            dashboard.derived_stage.clear(st.session_state)
                             if 'data_loaded' in st.session_state:
                                 del st.session_state.data_loaded
-                            if 'last_file_hash' in st.session_state:
-                                del st.session_state.last_file_hash
                             st.cache_data.clear()
                             st.success("✅ Cache geleert!")
                             st.rerun()
@@ -2279,10 +2825,19 @@ def main():
             st.subheader("📊 Bildungsgang-Vergleich")
             dashboard.create_comparison_visualization(filtered_data)
         
+        # Kohorten: Zwischen- vs. Abschlussevaluation desselben Jahrgangs
+        if filtered_data['Evaluationstyp'].nunique() > 1:
+            st.subheader("🎓 Kohorten-Entwicklung")
+            dashboard.create_cohort_visualization(filtered_data)
+        
         # Intelligente Segmentierung (Kombination aller Fragentypen)
         st.subheader("🎯 Intelligente Segmentierungs-Analyse")
         dashboard.create_segmentation_analysis(filtered_data)
         
+        # Fragen-Cluster nach Antwortmustern
+        with st.expander("🧩 Fragen-Cluster (Machine Learning)", expanded=False):
+            dashboard.create_cluster_visualization(filtered_data)
+        
         # KI-gestützte Analyse (wenn aktiviert)
         if enable_ai_analysis:
             st.header("🤖 KI-gestützte Analyse & Empfehlungen")
@@ -2292,14 +2847,33 @@ def main():
             if not open_questions_data.empty:
                 with st.expander("📝 KI-Textanalyse offener Antworten", expanded=True):
                     
-                    # Sammle alle Textantworten
-                    all_text_responses = []
-                    for _, row in open_questions_data.iterrows():
-                        if 'Textantworten' in row and row['Textantworten']:
-                            all_text_responses.extend(row['Textantworten'])
+                    # Textantworten im Filter aus dem Korpus (Sentiment bereits je Antwort berechnet)
+                    text_corpus = dashboard.get_text_corpus()
+                    answers = text_corpus.answers[text_corpus.row_mask(open_questions_data)]
+                    all_text_responses = answers['Antwort'].tolist()
+                    keyword_index = dashboard.get_keyword_index()
+                    keyword_mask = keyword_index.group_mask(open_questions_data)
+                    
+                    question_labels = (
+                        answers['Fragenummer'].astype(str) + ' ' + answers['Frage'].astype(str).str[:60]
+                    ).str.strip() if not answers.empty else pd.Series(dtype=str)
+                    question_texts = answers.groupby(question_labels, sort=False)['Antwort'].agg(list).to_dict()
+                    question_weights = answers.groupby(question_labels, sort=False)['Anzahl'].agg(list).to_dict()
+                    theme_answers = answers.dropna(subset=['Thema']) if 'Thema' in answers.columns else answers.iloc[0:0]
+                    theme_texts = theme_answers.groupby('Thema', sort=False)['Antwort'].agg(list).to_dict() if len(theme_answers) else {}
+                    theme_weights = theme_answers.groupby('Thema', sort=False)['Anzahl'].agg(list).to_dict() if len(theme_answers) else {}
                     
                     if all_text_responses and dashboard.ki_analyzer:
-                        text_analysis = dashboard.ki_analyzer.analyze_german_text_responses(all_text_responses)
+                        text_analysis = dashboard.ki_analyzer.analyze_german_text_responses(
+                            all_text_responses, sentiment_scores=answers['Sentiment'].to_numpy(),
+                            keywords=keyword_index.top_keywords(keyword_mask, k=15, include_bigrams=False),
+                            weights=answers['Anzahl'].to_numpy()
+                        )
+                        if len(answers) < text_analysis['total_responses']:
+                            st.caption(
+                                f"{text_analysis['total_responses']} Antworten, davon {len(answers)} unterschiedliche Aussagen "
+                                "(nahezu gleiche Antworten zusammengefasst und nach Häufigkeit gewichtet)"
+                            )
                         
                         # Sentiment Analyse
                         if 'sentiment_analysis' in text_analysis:
@@ -2312,17 +2886,50 @@ def main():
                                 st.metric("😐 Neutrale Stimmung", f"{(1-sentiment['positive_ratio']-sentiment['negative_ratio'])*100:.1f}%")
                             with col3:
                                 st.metric("😟 Negative Stimmung", f"{sentiment['negative_ratio']*100:.1f}%")
+                            
+                            # Stimmungsverlauf direkt aus der Sentiment-Spalte des Korpus
+                            if {'Datum', 'Bildungsgang'} <= set(answers.columns) and answers['Datum'].nunique() > 1:
+                                weighted = answers.assign(Gewichtet=answers['Sentiment'] * answers['Anzahl'])
+                                mood = weighted.groupby(['Bildungsgang', 'Datum'])[['Gewichtet', 'Anzahl']].sum().reset_index()
+                                mood['Sentiment'] = mood['Gewichtet'] / mood['Anzahl']
+                                fig = go.Figure()
+                                for bildungsgang, group in mood.groupby('Bildungsgang'):
+                                    fig.add_trace(go.Scatter(
+                                        x=group['Datum'], y=group['Sentiment'], mode='lines+markers', name=str(bildungsgang)
+                                    ))
+                                fig.update_layout(
+                                    title="Stimmung der Textantworten im Zeitverlauf",
+                                    yaxis=dict(title="Mittleres Sentiment", range=[-1, 1]),
+                                    height=320
+                                )
+                                st.plotly_chart(fig, use_container_width=True)
                         
                         # Keywords
                         if 'keyword_analysis' in text_analysis:
                             st.write("**📋 Häufigste Begriffe:**")
                             keywords = text_analysis['keyword_analysis']
+                            col1, col2 = st.columns(2)
+                            with col1:
+                                include_bigrams = st.checkbox("Wortpaare einbeziehen", value=False, key="keywords_bigrams")
+                            with col2:
+                                weighting = st.radio(
+                                    "Gewichtung", ["Häufigkeit", "TF-IDF"], horizontal=True, key="keywords_weighting"
+                                )
+                            if include_bigrams or weighting == "TF-IDF":
+                                # Andere Auswahl: Summe über die gefilterten Gruppen des Index, ohne erneute Tokenisierung
+                                keywords = keyword_index.top_keywords(
+                                    keyword_mask, k=15, include_bigrams=include_bigrams,
+                                    weighting='tfidf' if weighting == "TF-IDF" else 'count'
+                                )
                             keyword_text = " • ".join([f"{word} ({count})" for word, count in list(keywords.items())[:10]])
                             st.write(keyword_text)
                         
                         # KI-Insights
                         if 'ai_insights' in text_analysis and text_analysis['ai_insights']:
-                            st.write("**🧠 KI-Analyse:**")
+                            if text_analysis.get('insights_source') == 'lokal':
+                                st.write("**🧠 Zusammenfassung (lokal, ohne KI):**")
+                            else:
+                                st.write("**🧠 KI-Analyse:**")
                             st.write(text_analysis['ai_insights'])
                         
                         # KI-Empfehlungen
@@ -2330,13 +2937,36 @@ def main():
                             st.write("**🎯 KI-Empfehlungen:**")
                             for rec in text_analysis['ai_recommendations']:
                                 st.write(rec['content'])
+                        
+                        # Insights je Frage bzw. Thema: KI parallel angefragt (sonst lokal), Anzeige sobald eine Antwort vorliegt
+                        if len(question_texts) > 1:
+                            st.write("**🧩 Analyse je offene Frage:**")
+                            if len(theme_texts) > 1:
+                                grouping = st.radio("Gruppierung", ["Frage", "Thema"], horizontal=True, key="text_insights_grouping")
+                                if grouping == "Thema":
+                                    question_texts, question_weights = theme_texts, theme_weights
+                            placeholders = {label: st.empty() for label in question_texts}
+                            for label, placeholder in placeholders.items():
+                                placeholder.info(f"⏳ {label}")
+                            
+                            def show_question_insights(label, insights, error):
+                                with placeholders[label].container():
+                                    st.markdown(f"**{label}**")
+                                    if insights:
+                                        st.write(insights)
+                                    else:
+                                        st.warning(f"Keine KI-Analyse verfügbar: {error}" if error else "Keine KI-Analyse verfügbar")
+                            
+                            dashboard.ki_analyzer.generate_question_insights(
+                                question_texts, on_result=show_question_insights, question_weights=question_weights
+                            )
                     else:
                         st.info("Keine Textantworten für KI-Analyse verfügbar.")
             
             # Datenbasierte Empfehlungen
             st.subheader("📊 Intelligente Handlungsempfehlungen")
             if dashboard.ki_analyzer:
-                recommendations = dashboard.ki_analyzer.generate_smart_recommendations(filtered_data)
+                recommendations = dashboard.ki_analyzer.generate_smart_recommendations(filtered_data, dashboard.get_text_corpus())
             else:
                 recommendations = []
         
@@ -2366,6 +2996,50 @@ def main():
         else:
             st.info("ℹ️ Keine spezifischen Empfehlungen basierend auf den aktuellen Daten.")
         
+        # Themen und Volltextsuche über alle offenen Antworten im Filter
+        open_questions_data = filtered_data[filtered_data['Fragentyp'] == 'Offene Frage']
+        if not open_questions_data.empty:
+            with st.expander("🗂️ Themen in offenen Antworten (Clustering)", expanded=False):
+                dashboard.create_text_topic_analysis(open_questions_data)
+            
+            with st.expander("🔎 Volltextsuche in offenen Antworten", expanded=False):
+                search_index, search_rows = dashboard.get_text_search()
+                index_stats = search_index.stats()
+                storage = ("nur im Arbeitsspeicher" if index_stats['path'] == ':memory:'
+                           else f"gespeichert unter {index_stats['path']}")
+                st.caption(f"Suchindex: {index_stats['sources']} Quellen, "
+                           f"{index_stats['answers']:,} Antworten, {storage}")
+                question_key = 'Frage_ID' if 'Frage_ID' in open_questions_data.columns else 'Fragenummer'
+                question_labels = open_questions_data.groupby(question_key, sort=False)['Frage'].first()
+                
+                col1, col2 = st.columns([2, 1])
+                with col1:
+                    search_text = st.text_input(
+                        "Suchbegriffe", key="text_search_query",
+                        placeholder="z.B. Lärm Pause (alle Begriffe, auch als Wortanfang)"
+                    )
+                with col2:
+                    selected_question = st.selectbox(
+                        "Frage", ["Alle Fragen"] + list(question_labels.index), key="text_search_question",
+                        format_func=lambda key: key if key == "Alle Fragen" else f"{key}: {str(question_labels[key])[:50]}"
+                    )
+                
+                if search_text:
+                    search_data = open_questions_data
+                    if selected_question != "Alle Fragen":
+                        search_data = search_data[search_data[question_key] == selected_question]
+                    row_keys = search_rows[search_rows.index.isin(search_data.index)]
+                    
+                    results = search_index.search(search_text, row_keys)
+                    total = search_index.count(search_text, row_keys) if len(results) else 0
+                    if results.empty:
+                        st.info("Keine Treffer im aktuellen Filter.")
+                    else:
+                        st.caption(f"{total} Treffer" + (f", die besten {len(results)} angezeigt" if total > len(results) else ""))
+                        for _, hit in results.iterrows():
+                            datum = hit['Datum'].strftime('%d.%m.%Y') if pd.notna(hit['Datum']) else ''
+                            st.markdown(f"**{hit['Bildungsgang']} · {datum} · {hit['Fragenummer']}** — {hit['Treffer']}")
+        
         # Detaildaten-Tabelle
         st.header("📋 IQES-Detaildaten")
         with st.expander("Daten anzeigen"):
@@ -13,12 +13,18 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '.'))
 
 from core.iqes_parser import IQESParser
 from core.timeline_analyzer import IQESTimelineAnalyzer
+from core.distribution_stats import IQESDistributionStats
+from core.period_index import IQESPeriodIndex
+from core.categorization import IQESCategorizer
+from core.theme_classifier import IQESThemeClassifier
+from core.question_matching import IQESQuestionMatcher
 from ui.visualizations import IQESVisualizations
 from ui.timeline_visualizations import IQESTimelineVisualizations
 from config.themes import (
     get_theme_for_question, 
-    get_rating_category, 
     BILDUNGSGANG_CONFIG,
+    THEMA_COLOR_RULES,
+    THEMA_COLOR_DEFAULT,
     get_theme_summary
 )
 
@@ -67,6 +73,11 @@ class ModularIQESDashboard:
         self.parser = IQESParser()
         self.visualizations = IQESVisualizations()
         self.timeline_visualizations = IQESTimelineVisualizations()
+        self.distribution_stats = IQESDistributionStats()
+        self.period_index = IQESPeriodIndex()
+        self.categorizer = IQESCategorizer()
+        self.theme_color_classifier = IQESThemeClassifier(THEMA_COLOR_RULES, THEMA_COLOR_DEFAULT)
+        self.question_matcher = IQESQuestionMatcher()
         self.data = pd.DataFrame()
     
     def load_data(self, uploaded_files):
@@ -77,29 +88,23 @@ class ModularIQESDashboard:
             # Zusätzliche Datenaufbereitung für korrekte IQES-Struktur
             if not self.data.empty:
                 # Thema ist jetzt korrekt aus Spalten-Header extrahiert
-                # Farbe für Themen zuweisen (basierend auf echten Themen-Namen)
-                def assign_theme_color(thema):
-                    thema_lower = str(thema).lower()
-                    if 'schulatmosphäre' in thema_lower or 'umgang' in thema_lower or 'unterstützung' in thema_lower:
-                        return '#3498db'  # Blau für Schulatmosphäre
-                    elif 'unterricht' in thema_lower:
-                        return '#e74c3c'  # Rot für Unterricht
-                    elif 'feedback' in thema_lower:
-                        return '#f39c12'  # Orange für Feedback
-                    elif 'beschwerdemanagement' in thema_lower or 'ideen' in thema_lower:
-                        return '#27ae60'  # Grün für Beschwerdemanagement
-                    elif 'stärken' in thema_lower or 'schwächen' in thema_lower:
-                        return '#9b59b6'  # Lila für Stärken/Schwächen
-                    elif 'zufriedenheit' in thema_lower:
-                        return '#2ecc71'  # Grün für Zufriedenheit
-                    else:
-                        return '#95a5a6'  # Grau als Standard
-                
-                self.data['Thema_Farbe'] = self.data['Thema'].apply(assign_theme_color)
+                # Farbe für Themen über die Regeltabelle zuweisen (nur eindeutige Themen werden geprüft)
+                theme_colors = self.theme_color_classifier.assign(self.data['Thema'])
+                self.data['Thema_Farbe'] = theme_colors['color']
+                self.data['Thema_Regel'] = theme_colors['Regel']
                 
-                self.data['Bewertungskategorie'] = self.data['Bewertung'].apply(
-                    lambda x: get_rating_category(x)['category']
+                self.data = self.categorizer.add_category_columns(
+                    self.data, columns=('Bewertungskategorie',)
                 )
+                
+                # Exakte Kennzahlen aus den Antworthäufigkeiten
+                self.data = self.distribution_stats.add_distribution_statistics(self.data)
+                
+                # Zeitraum-Codes einmalig vorberechnen (Bündelung ohne erneutes Datum-Parsing)
+                self.data = self.period_index.add_period_columns(self.data)
+                
+                # Umnummerierte/umformulierte Fragen über alle Zeiträume verknüpfen (Frage_ID)
+                self.data = self.question_matcher.assign_question_ids(self.data)
             
             return True
         except Exception as e:
@@ -264,10 +269,12 @@ class ModularIQESDashboard:
         
         # Detailtabelle
         st.subheader("📊 Alle Daten")
-        display_data = data[[
+        display_columns = [
             'Datum', 'Bildungsgang', 'Thema', 'Fragenummer', 
             'Frage', 'Bewertung', 'Bewertungskategorie'
-        ]].copy()
+        ]
+        display_columns += [col for col in ['Median', 'Zustimmung_Anteil'] if col in data.columns]
+        display_data = data[display_columns].copy()
         
         display_data = display_data.sort_values('Bewertung')
         st.dataframe(display_data, use_container_width=True, hide_index=True)
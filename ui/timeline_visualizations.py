@@ -8,6 +8,8 @@ import pandas as pd
 import plotly.graph_objects as go
 from typing import List, Optional
 from core.timeline_analyzer import IQESTimelineAnalyzer
+from core.forecasting import IQESTrendForecaster
+from core.anomaly_detection import IQESAnomalyDetector
 
 
 class IQESTimelineVisualizations:
@@ -15,6 +17,8 @@ class IQESTimelineVisualizations:
     
     def __init__(self):
         self.analyzer = IQESTimelineAnalyzer()
+        self.forecaster = IQESTrendForecaster()
+        self.anomaly_detector = IQESAnomalyDetector()
     
     def render_timeline_analysis(self, data: pd.DataFrame):
         """
@@ -34,8 +38,18 @@ class IQESTimelineVisualizations:
             st.warning("Keine Antwortskala-Fragen (1-4 Bewertung) für Timeline-Analyse gefunden")
             return
         
+        # Zeitraum-Granularität wählen (mehrere Exporte eines Halbjahres zusammenfassen)
+        granularities = self.analyzer.period_index.granularities
+        granularity = st.selectbox(
+            "Zeiträume bündeln nach:",
+            list(granularities.keys()),
+            format_func=lambda key: granularities[key],
+            key="timeline_granularity"
+        )
+        scale_data = self.analyzer.resample_periods(scale_data, granularity)
+        
         # Prüfe ob mindestens 2 Zeiträume vorhanden
-        if len(scale_data['Datum'].unique()) < 2:
+        if len(scale_data['Datum'].dropna().unique()) < 2:
             st.info("Mindestens 2 Evaluationszeiträume für Timeline-Analyse erforderlich")
             return
         
@@ -44,11 +58,13 @@ class IQESTimelineVisualizations:
         self._render_timeline_insights(insights)
         
         # Tab-Navigation für verschiedene Timeline-Ansichten
-        tab1, tab2, tab3, tab4 = st.tabs([
+        tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
             "🎯 Thematische Trends", 
             "📈 Einzelfragen", 
             "📊 Bildungsgang-Vergleich",
-            "📋 Trend-Übersicht"
+            "📋 Trend-Übersicht",
+            "🔮 Prognose",
+            "🚨 Auffälligkeiten"
         ])
         
         with tab1:
@@ -62,6 +78,12 @@ class IQESTimelineVisualizations:
         
         with tab4:
             self._render_trend_summary_tables(scale_data)
+        
+        with tab5:
+            self._render_forecast(scale_data)
+        
+        with tab6:
+            self._render_anomalies(scale_data)
     
     def _render_timeline_insights(self, insights: dict):
         """Rendert Key-Insights der Timeline-Analyse"""
@@ -139,6 +161,9 @@ class IQESTimelineVisualizations:
             if 'Anzahl_Fragen' in theme_trends.columns:
                 display_cols.insert(1, 'Anzahl_Fragen')
             
+            # Signifikanz-Spalten hinzufügen wenn Antwortverteilungen vorliegen
+            display_cols += [col for col in ['p_Wert', 'KI_Unten', 'KI_Oben'] if col in theme_trends.columns]
+            
             if display_cols:
                 display_df = theme_trends[display_cols].copy()
                 
@@ -149,7 +174,10 @@ class IQESTimelineVisualizations:
                     'Erste_Bewertung': 'Erste Bewertung',
                     'Aktuelle_Bewertung': 'Aktuelle Bewertung',
                     'Trend_Change': 'Trend',
-                    'Trend_Status': 'Entwicklung'
+                    'Trend_Status': 'Entwicklung',
+                    'p_Wert': 'p-Wert',
+                    'KI_Unten': '95%-KI unten',
+                    'KI_Oben': '95%-KI oben'
                 }
                 
                 new_col_names = [col_mapping.get(col, col) for col in display_cols]
@@ -206,26 +234,27 @@ class IQESTimelineVisualizations:
             
             # Trend-Details-Tabelle
             st.markdown("#### 📊 Trend-Details")
-            question_trends = self.analyzer.generate_trend_summary_table(scale_data, 'Fragenummer')
+            key = self.analyzer.question_key(scale_data)
+            question_trends = self.analyzer.generate_trend_summary_table(scale_data, key)
             
             if not question_trends.empty:
                 # Nur ausgewählte Fragen anzeigen
                 selected_trends = question_trends[
-                    question_trends['Fragenummer'].isin(selected_questions)
+                    question_trends[key].isin(selected_questions)
                 ].copy()
                 
                 if not selected_trends.empty:
                     # Frage-Text hinzufügen wenn möglich
                     if 'Frage' in scale_data.columns:
-                        question_texts = scale_data.groupby('Fragenummer')['Frage'].first().reset_index()
-                        selected_trends = selected_trends.merge(question_texts, on='Fragenummer', how='left')
+                        question_texts = scale_data.sort_values('Datum').groupby(key)['Frage'].last().reset_index()
+                        selected_trends = selected_trends.merge(question_texts, on=key, how='left')
                         # Frage-Text kürzen
                         selected_trends['Frage_Kurz'] = selected_trends['Frage'].apply(
                             lambda x: str(x)[:80] + "..." if len(str(x)) > 80 else str(x)
                         )
                     
                     # Spalten für Anzeige (nur die die existieren)
-                    base_cols = ['Fragenummer', 'Erste_Bewertung', 'Aktuelle_Bewertung', 'Trend_Change']
+                    base_cols = [key, 'Erste_Bewertung', 'Aktuelle_Bewertung', 'Trend_Change']
                     display_cols = [col for col in base_cols if col in selected_trends.columns]
                     col_names = ['Frage Nr.', 'Erste Bewertung', 'Aktuelle Bewertung', 'Trend']
                     
@@ -239,6 +268,12 @@ class IQESTimelineVisualizations:
                         display_cols.insert(1, 'Frage_Kurz')
                         col_names.insert(1, 'Fragetext')
                     
+                    # p-Wert und Konfidenzintervall wenn verfügbar
+                    for col, name in [('p_Wert', 'p-Wert'), ('KI_Unten', '95%-KI unten'), ('KI_Oben', '95%-KI oben')]:
+                        if col in selected_trends.columns:
+                            display_cols.append(col)
+                            col_names.append(name)
+                    
                     display_df = selected_trends[display_cols].copy()
                     display_df.columns = col_names
                     
@@ -328,6 +363,114 @@ class IQESTimelineVisualizations:
             else:
                 st.info("Keine Trend-Daten verfügbar")
     
+    def _render_forecast(self, scale_data: pd.DataFrame):
+        """Rendert Prognosen für den nächsten Evaluationszeitraum"""
+        st.markdown("### 🔮 Prognose nächster Zeitraum")
+        st.markdown("*Lineares und gedämpftes Trendmodell über alle Reihen (nur Antwortskala 1-4)*")
+        
+        grouping_options = {
+            "Themenbereich": ['Thema'],
+            "Bildungsgang": ['Bildungsgang'],
+            "Einzelfrage": ['Fragenummer'],
+            "Einzelfrage je Bildungsgang": ['Fragenummer', 'Bildungsgang']
+        }
+        available_options = [
+            label for label, cols in grouping_options.items()
+            if all(col in scale_data.columns for col in cols)
+        ]
+        
+        if not available_options:
+            st.info("Keine Gruppierung für Prognosen verfügbar")
+            return
+        
+        selected = st.selectbox("Prognose je:", available_options, key="forecast_grouping")
+        group_cols = grouping_options[selected]
+        
+        forecast = self.forecaster.forecast(scale_data, group_cols)
+        
+        if forecast.empty:
+            st.info("Für eine Prognose werden mindestens 2 Zeiträume je Reihe benötigt")
+            return
+        
+        next_date = forecast['Prognose_Datum'].iloc[0]
+        st.markdown(f"**{len(forecast)} Reihen** prognostiziert für ca. {next_date.strftime('%m/%Y')}")
+        
+        display_cols = group_cols + [
+            'Anzahl_Zeitraeume', 'Letzte_Bewertung', 'Steigung_pro_Jahr',
+            'Prognose_Linear', 'PI_Linear_Unten', 'PI_Linear_Oben',
+            'Prognose_Gedaempft', 'PI_Gedaempft_Unten', 'PI_Gedaempft_Oben',
+            'Prognose_Veraenderung'
+        ]
+        display_df = forecast[display_cols].sort_values('Prognose_Veraenderung')
+        
+        col_mapping = {
+            'Thema': 'Themenbereich',
+            'Anzahl_Zeitraeume': 'Zeiträume',
+            'Letzte_Bewertung': 'Letzte Bewertung',
+            'Steigung_pro_Jahr': 'Steigung/Jahr',
+            'Prognose_Linear': 'Prognose linear',
+            'PI_Linear_Unten': '95%-PI linear unten',
+            'PI_Linear_Oben': '95%-PI linear oben',
+            'Prognose_Gedaempft': 'Prognose gedämpft',
+            'PI_Gedaempft_Unten': '95%-PI gedämpft unten',
+            'PI_Gedaempft_Oben': '95%-PI gedämpft oben',
+            'Prognose_Veraenderung': 'Erwartete Veränderung'
+        }
+        display_df.columns = [col_mapping.get(col, col) for col in display_cols]
+        
+        st.dataframe(display_df, use_container_width=True, hide_index=True)
+        st.caption("Prognoseintervalle fehlen bei Reihen mit weniger als 3 Zeiträumen")
+    
+    def _render_anomalies(self, scale_data: pd.DataFrame):
+        """Rendert Ausreißer und Strukturbrüche aller Fragen-Reihen"""
+        st.markdown("### 🚨 Auffälligkeiten")
+        st.markdown("*Robuste z-Werte gegen den eigenen Verlauf und die anderen Bildungsgänge, "
+                    "plus Niveauwechsel (alle Fragen, Antwortskala 1-4)*")
+        
+        anomalies = self.anomaly_detector.detect_anomalies(scale_data)
+        
+        if anomalies.empty:
+            st.success("✅ Keine auffälligen Werte oder Strukturbrüche gefunden")
+            return
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.metric("Auffälligkeiten", len(anomalies))
+        
+        with col2:
+            st.metric("Betroffene Fragen", anomalies['Fragenummer'].nunique())
+        
+        with col3:
+            st.metric("Strukturbrüche", int(anomalies['Typ'].str.startswith('Strukturbruch').sum()))
+        
+        type_filter = st.multiselect(
+            "Art der Auffälligkeit:",
+            sorted(anomalies['Typ'].unique()),
+            default=sorted(anomalies['Typ'].unique()),
+            key="anomaly_type_filter"
+        )
+        filtered = anomalies[anomalies['Typ'].isin(type_filter)]
+        
+        display_cols = [col for col in [
+            'Typ', 'Score', 'Fragenummer', 'Bildungsgang', 'Datum', 'Bewertung',
+            'Z_Verlauf', 'Z_Peers', 'Veraenderung', 'Thema', 'Frage'
+        ] if col in filtered.columns]
+        display_df = filtered[display_cols].copy()
+        display_df['Datum'] = display_df['Datum'].dt.strftime('%m/%Y')
+        
+        col_mapping = {
+            'Typ': 'Art',
+            'Z_Verlauf': 'z (Verlauf)',
+            'Z_Peers': 'z (Bildungsgänge)',
+            'Veraenderung': 'Niveauwechsel',
+            'Thema': 'Themenbereich'
+        }
+        display_df.columns = [col_mapping.get(col, col) for col in display_cols]
+        
+        st.dataframe(display_df, use_container_width=True, hide_index=True)
+        st.caption("Spaltenköpfe anklicken zum Sortieren · Strukturbruch-Datum = erster Zeitraum nach dem Wechsel")
+    
     def render_timeline_metrics(self, data: pd.DataFrame) -> dict:
         """
         Rendert Timeline-spezifische Metriken
@@ -8,6 +8,8 @@ import plotly.express as px
 import plotly.graph_objects as go
 from typing import Optional
 
+from core.rankings import IQESRankingEngine
+
 
 class IQESVisualizations:
     """Visualisierungsfunktionen für IQES-Daten"""
@@ -20,6 +22,7 @@ class IQESVisualizations:
             'success': '#27ae60',
             'info': '#3498db'
         }
+        self.ranking_engine = IQESRankingEngine()
     
     def create_rating_chart(self, data: pd.DataFrame, top_n: int = 5) -> go.Figure:
         """
@@ -42,9 +45,8 @@ class IQESVisualizations:
             )
             return fig
         
-        # Top 5 beste und Top 5 schlechteste Bewertungen
-        best_ratings = data.nlargest(top_n, 'Bewertung').copy()
-        worst_ratings = data.nsmallest(top_n, 'Bewertung').copy()
+        # Top 5 beste und Top 5 schlechteste Bewertungen (ein Sortierdurchlauf)
+        worst_ratings, best_ratings = self.ranking_engine.top_bottom(data, k=top_n)
         
         # Kombiniere beide DataFrames
         best_ratings['Kategorie'] = '🟢 Top Bereiche'